@@ -1,36 +1,54 @@
 import logging
+import math
 import os
 import re
+import threading
 from datetime import datetime, timedelta
+from pathlib import Path
 from textwrap import dedent
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import attr
 import dask
 import google
 import mozanalysis
+import numpy as np
+import pyarrow.parquet as pq
 import pytz
 from dask.distributed import Client, LocalCluster
 from google.cloud import bigquery
 from google.cloud.exceptions import Conflict
-from mozanalysis.experiment import AnalysisBasis, TimeLimits
+from mozanalysis.experiment import AnalysisBasis, AnalysisWindow, TimeLimits
 from mozanalysis.utils import add_days
 from pandas import DataFrame
 
 import jetstream.errors as errors
-from jetstream.bigquery_client import BigQueryClient
-from jetstream.config import AnalysisConfiguration
+from jetstream.bigquery_client import (
+    BigQueryClient,
+    BigQueryClientPlugin,
+    arrow_to_dataframe,
+)
+from jetstream.config import AnalysisConfiguration, ExperimentConfiguration
 
 # from jetstream.diagnostics.resource_profiling_plugin import ResourceProfilingPlugin
 # from jetstream.diagnostics.task_monitoring_plugin import TaskMonitoringPlugin
 from jetstream.dryrun import dry_run_query
 from jetstream.logging import LogConfiguration, LogPlugin
+from jetstream.pre_treatment import (
+    RemoveIndefinites,
+    RemoveNulls,
+    ZeroFill,
+    apply_pre_treatments,
+)
 from jetstream.statistics import (
+    BootstrapMean,
     Count,
     StatisticResult,
     StatisticResultCollection,
     Summary,
+    compute_statistics,
 )
+from jetstream.streaming import stream_statistics
 
 from . import AnalysisPeriod, bq_normalize_name
 
@@ -38,8 +56,103 @@ logger = logging.getLogger(__name__)
 
 DASK_DASHBOARD_ADDRESS = "127.0.0.1:8782"
 DASK_N_PROCESSES = int(os.getenv("JETSTREAM_PROCESSES", 0)) or None  # Defaults to number of CPUs
+# directory statistics get written to as Parquet files in addition to BigQuery, for debugging
+STATISTICS_PARQUET_DIRECTORY = os.getenv("JETSTREAM_STATISTICS_PARQUET_DIR")
 
 _dask_cluster = None
+_dask_cluster_lock = threading.Lock()
+
+
+def _num_workers() -> int:
+    """Returns the number of workers of the dask cluster."""
+    return DASK_N_PROCESSES or os.cpu_count() or 1
+
+
+def enrollments_table_name(experiment: ExperimentConfiguration) -> str:
+    """
+    Returns the name of the enrollments table of an experiment.
+
+    Sampled enrollments are kept in a table per sample rate, so changing the
+    `sample_rate` of an experiment doesn't reuse clients sampled at another rate.
+    """
+    normalized_slug = bq_normalize_name(experiment.normandy_slug)
+    sample_rate = experiment.sample_rate
+    if sample_rate is None or sample_rate == 1:
+        return f"enrollments_{normalized_slug}"
+    return f"enrollments_{normalized_slug}_sample_{round(sample_rate * 1000000)}"
+
+
+def _segment_data(
+    metrics_data: DataFrame, rows: Optional[np.ndarray], summaries: List[Summary]
+) -> DataFrame:
+    """
+    Returns the `branch` and metric columns of the summaries for the rows of a segment,
+    given by their positions or None for all rows.
+
+    Only the needed columns of the segment's rows get copied.
+    """
+    if rows is None:
+        return metrics_data
+
+    columns = ["branch"] + [
+        metric
+        for metric in dict.fromkeys(summary.metric.name for summary in summaries)
+        if metric in metrics_data
+    ]
+    return DataFrame(
+        {column: metrics_data[column].array.take(rows) for column in columns},
+        index=metrics_data.index.take(rows),
+    )
+
+
+def _summary_aggregates(summary: Summary, column_type: Optional[str], index: int) -> List[str]:
+    """
+    Returns the SQL aggregations of the sufficient statistics of a summary, applying
+    its pre-treatments to the metric column.
+
+    Returns no aggregations if the metric isn't part of the metrics table.
+    """
+    metric = f"`{summary.metric.name}`"
+    is_null = f"{metric} IS NULL"
+
+    if column_type is None:
+        # counts without pre-treatments don't depend on the metric values
+        if summary.pre_treatments or not isinstance(summary.statistic, Count):
+            return []
+    elif column_type in ("FLOAT", "FLOAT64"):
+        is_null = f"({metric} IS NULL OR IS_NAN({metric}))"
+
+    filters = []
+    for pre_treatment in summary.pre_treatments:
+        if isinstance(pre_treatment, (RemoveNulls, RemoveIndefinites)):
+            filters.append(f"NOT {is_null}")
+            if isinstance(pre_treatment, RemoveIndefinites) and column_type in ("FLOAT", "FLOAT64"):
+                filters.append(f"NOT IS_INF({metric})")
+        elif isinstance(pre_treatment, ZeroFill):
+            if column_type in ("BOOL", "BOOLEAN"):
+                metric = f"IF({is_null}, FALSE, {metric})"
+            elif column_type in ("INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC"):
+                metric = f"IF({is_null}, 0, {metric})"
+            is_null = "FALSE"
+        else:
+            raise ValueError(f"Pre-treatment {pre_treatment.name()} can't be aggregated")
+
+    included = " AND ".join(filters) or "TRUE"
+    if column_type in ("BOOL", "BOOLEAN"):
+        converted = f"{metric} IS TRUE"
+        invalid = is_null
+    elif column_type in ("INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC"):
+        converted = f"{metric} = 1"
+        invalid = f"({is_null} OR {metric} NOT IN (0, 1))"
+    else:
+        converted = "FALSE"
+        invalid = "TRUE"
+
+    return [
+        f"COUNTIF({included}) AS num_enrollments_{index}",
+        f"COUNTIF({included} AND {converted}) AS num_conversions_{index}",
+        f"COUNTIF({included} AND {invalid}) AS num_invalid_{index}",
+    ]
 
 
 @attr.s(auto_attribs=True)
@@ -208,7 +321,6 @@ class Analysis:
         )
 
         res_table_name = self._table_name(period.value, window, analysis_basis=analysis_basis)
-        normalized_slug = bq_normalize_name(self.config.experiment.normandy_slug)
 
         if dry_run:
             logger.info(
@@ -223,7 +335,7 @@ class Analysis:
                 period.value,
             )
 
-            enrollments_table_name = f"enrollments_{normalized_slug}"
+            enrollments_table = enrollments_table_name(self.config.experiment)
             exposure_signal = None
 
             if self.config.experiment.exposure_signal:
@@ -243,7 +355,7 @@ class Analysis:
                     or analysis_basis in m.metric.analysis_bases
                 },
                 last_window_limits,
-                enrollments_table_name,
+                enrollments_table,
                 analysis_basis,
                 exposure_signal,
             )
@@ -253,65 +365,385 @@ class Analysis:
 
         return res_table_name
 
+    @dask.delayed
+    def calculate_backfill_metrics(
+        self,
+        exp: mozanalysis.experiment.Experiment,
+        time_limits: TimeLimits,
+        windows: List[int],
+        period: AnalysisPeriod,
+        analysis_basis: AnalysisBasis,
+        dry_run: bool,
+    ) -> List[str]:
+        """
+        Calculate metrics of several analysis windows in a single query.
+
+        `time_limits` contain the analysis windows with the indexes `windows`. The metrics
+        get split into a table per window, named like the tables of `calculate_metrics`.
+        Returns the BigQuery tables results are written to.
+        """
+        res_table_names = [
+            self._table_name(period.value, window, analysis_basis=analysis_basis)
+            for window in windows
+        ]
+        normalized_slug = bq_normalize_name(self.config.experiment.normandy_slug)
+
+        if dry_run:
+            logger.info(
+                "Dry run; not actually calculating %s metrics for %s",
+                period.value,
+                self.config.experiment.normandy_slug,
+            )
+            return res_table_names
+
+        logger.info(
+            "Executing query for %s (%s), windows %s",
+            self.config.experiment.normandy_slug,
+            period.value,
+            ", ".join(str(window) for window in windows),
+        )
+
+        enrollments_table = enrollments_table_name(self.config.experiment)
+        exposure_signal = None
+
+        if self.config.experiment.exposure_signal:
+            exposure_signal = self.config.experiment.exposure_signal.to_mozanalysis_exposure_signal(
+                time_limits
+            )
+
+        metrics_sql = exp.build_metrics_query(
+            {
+                m.metric.to_mozanalysis_metric()
+                for m in self.config.metrics[period]
+                if m.metric.analysis_bases == analysis_basis
+                or analysis_basis in m.metric.analysis_bases
+            },
+            time_limits,
+            enrollments_table,
+            analysis_basis,
+            exposure_signal,
+        )
+
+        # the combined table must not match the wildcard of the published views
+        backfill_table_name = "_".join(
+            ["backfill", normalized_slug, analysis_basis.value, period.value]
+        )
+        self.bigquery.execute(metrics_sql, backfill_table_name)
+
+        for analysis_window, res_table_name in zip(time_limits.analysis_windows, res_table_names):
+            self.bigquery.execute(
+                self._window_metrics_query(backfill_table_name, analysis_window), res_table_name
+            )
+
+        self.bigquery.delete_table(f"{self.project}.{self.dataset}.{backfill_table_name}")
+        self._publish_view(period, analysis_basis=analysis_basis.value)
+
+        return res_table_names
+
+    def _window_metrics_query(self, metrics_table: str, analysis_window: AnalysisWindow) -> str:
+        """Returns the query selecting the metrics of an analysis window."""
+        return dedent(
+            f"""
+            SELECT *
+            FROM `{self.project}.{self.dataset}.{metrics_table}`
+            WHERE analysis_window_start = {analysis_window.start}
+            AND analysis_window_end = {analysis_window.end}
+            """
+        )
+
     @dask.delayed
     def calculate_statistics(
-        self, metric: Summary, segment_data: DataFrame, segment: str, analysis_basis: AnalysisBasis
+        self,
+        summaries: List[Summary],
+        metrics_data: DataFrame,
+        rows: Optional[np.ndarray],
+        segment: str,
+        analysis_basis: AnalysisBasis,
     ) -> StatisticResultCollection:
         """
-        Run statistics on metric.
+        Run statistics on the metrics of a segment, given by the positions of its rows.
         """
+        segment_data = _segment_data(metrics_data, rows, summaries)
         return (
-            metric.run(segment_data, self.config.experiment)
+            compute_statistics(summaries, segment_data, self.config.experiment)
             .set_segment(segment)
             .set_analysis_basis(analysis_basis)
         )
 
+    @staticmethod
+    def _statistics_batches(summaries: List[Summary], num_workers: int = 1) -> List[List[Summary]]:
+        """
+        Group summaries into the units of work of statistics tasks.
+
+        `BootstrapMean` summaries are split into at most `num_workers` tasks, within
+        which the resampling weights are drawn once per branch. Workers run with a
+        single BLAS thread, so the matrix products of a single task wouldn't use more
+        than one CPU. All other summaries of the same metric are computed by a single
+        task, so that they share the pre-treated metric columns and sorted metric
+        values, see `TreatedColumnCache`.
+        """
+        bootstrap_summaries = [s for s in summaries if isinstance(s.statistic, BootstrapMean)]
+        metric_summaries: Dict[str, List[Summary]] = {}
+        for summary in summaries:
+            if not isinstance(summary.statistic, BootstrapMean):
+                metric_summaries.setdefault(summary.metric.name, []).append(summary)
+
+        batch_size = math.ceil(len(bootstrap_summaries) / max(num_workers, 1))
+        batches = []
+        for start in range(0, len(bootstrap_summaries), batch_size or 1):
+            end = start + batch_size
+            batches.append(bootstrap_summaries[start:end])
+        return batches + list(metric_summaries.values())
+
     @dask.delayed
-    def counts(
-        self, segment_data: DataFrame, segment: str, analysis_basis: AnalysisBasis
+    def prepare_partitioned_statistic(
+        self, summary: Summary, metrics_data: DataFrame, rows: Optional[np.ndarray]
+    ) -> Any:
+        """
+        Prepare the pre-treated metric values of a summary that gets resampled in
+        partitions, see `Summary.supports_partitions`.
+
+        Returns None if the metric isn't part of the data or can't be prepared.
+        """
+        metric = summary.metric.name
+        if metric not in metrics_data:
+            return None
+
+        try:
+            segment_data = _segment_data(metrics_data, rows, [summary])
+            treated = apply_pre_treatments(summary.pre_treatments, segment_data, metric)
+            return summary.statistic.prepare(treated, metric)
+        except Exception as e:
+            summary.statistic._log_exception(metric, e, self.config.experiment)
+            return None
+
+    @dask.delayed
+    def resample_partition(
+        self,
+        summary: Summary,
+        prepared: Any,
+        partition: int,
+        num_partitions: int,
+        seed: np.random.SeedSequence,
+    ) -> Any:
+        """Resample a partition of the prepared metric values of a summary."""
+        if prepared is None:
+            return None
+        return summary.statistic.resample_partition(prepared, partition, num_partitions, seed)
+
+    @dask.delayed
+    def summarize_partitions(
+        self,
+        summary: Summary,
+        partials: List[Any],
+        segment: str,
+        analysis_basis: AnalysisBasis,
     ) -> StatisticResultCollection:
-        """Count and missing count statistics."""
-        metric = "identity"
-        counts = (
-            Count()
-            .transform(segment_data, metric, "*", self.config.experiment.normandy_slug)
+        """Merge the resampled partitions of a summary and compute its results."""
+        if any(partial is None for partial in partials):
+            return StatisticResultCollection([])
+
+        metric = summary.metric.name
+        try:
+            samples = summary.statistic.merge(partials)
+        except Exception as e:
+            summary.statistic._log_exception(metric, e, self.config.experiment)
+            return StatisticResultCollection([])
+
+        return (
+            summary.statistic.apply_samples(samples, metric, self.config.experiment)
             .set_segment(segment)
             .set_analysis_basis(analysis_basis)
-        ).to_dict()["data"]
-
-        return StatisticResultCollection(
-            counts
-            + [
-                StatisticResult(
-                    metric=metric,
-                    statistic="count",
-                    parameter=None,
-                    branch=b.slug,
-                    comparison=None,
-                    comparison_to_branch=None,
-                    ci_width=None,
-                    point=0,
-                    lower=None,
-                    upper=None,
-                    segment=segment,
-                    analysis_basis=analysis_basis,
-                )
-                for b in self.config.experiment.branches
-                if b.slug not in {c["branch"] for c in counts}
-            ]
+        )
+
+    def _partitioned_statistics(
+        self,
+        summary: Summary,
+        metrics_data: DataFrame,
+        rows: Optional[np.ndarray],
+        segment: str,
+        analysis_basis: AnalysisBasis,
+    ):
+        """
+        Returns the delayed results of a summary whose bootstrap is split into
+        partitions, one per worker, so that a single metric can use all workers.
+        """
+        num_partitions = _num_workers()
+        prepared = self.prepare_partitioned_statistic(summary, metrics_data, rows)
+        partials = [
+            self.resample_partition(summary, prepared, partition, num_partitions, seed)
+            for partition, seed in enumerate(np.random.SeedSequence().spawn(num_partitions))
+        ]
+        return self.summarize_partitions(summary, partials, segment, analysis_basis)
+
+    def _aggregates_query(
+        self, metrics_table: str, summaries: List[Summary], columns: Dict[str, str]
+    ) -> str:
+        """
+        Returns the query computing the sufficient statistics of `summaries` for each
+        branch and segment of the metrics table.
+
+        `columns` maps the columns of the metrics table to their BigQuery types.
+        Summaries whose metric isn't part of the metrics table are skipped.
+        """
+        segments = []
+        for segment in self.config.experiment.segments:
+            if segment.name not in columns:
+                raise ValueError(f"Segment {segment.name} not in metrics table")
+            segments.append(f"STRUCT('{segment.name}', COALESCE(`{segment.name}`, FALSE))")
+
+        aggregates = ["COUNT(*) AS num_clients"]
+        for i, summary in enumerate(summaries):
+            aggregates += _summary_aggregates(summary, columns.get(summary.metric.name), i)
+
+        return dedent(
+            """
+            SELECT
+                branch,
+                segment,
+                {aggregates}
+            FROM `{project}.{dataset}.{metrics_table}`
+            CROSS JOIN UNNEST([
+                STRUCT('all' AS segment, TRUE AS included){segments}
+            ])
+            WHERE included
+            GROUP BY branch, segment
+            """
+        ).format(
+            aggregates=",\n    ".join(aggregates),
+            project=self.project,
+            dataset=self.dataset,
+            metrics_table=metrics_table,
+            segments="".join(f",\n    {segment}" for segment in segments),
         )
 
     @dask.delayed
-    def subset_to_segment(self, segment: str, metrics_data: DataFrame) -> DataFrame:
-        """Return metrics data for segment"""
-        if segment != "all":
-            if segment not in metrics_data.columns:
-                raise ValueError(f"Segment {segment} not in metrics table")
-            segment_data = metrics_data[metrics_data[segment].fillna(False)]
-        else:
-            segment_data = metrics_data
+    def calculate_aggregates(self, metrics_table: str, summaries: List[Summary]) -> DataFrame:
+        """
+        Aggregate the metrics table in BigQuery into the per-branch and per-segment
+        sufficient statistics of `summaries`.
+        """
+        columns = self.bigquery.table_columns(metrics_table)
+        return self.bigquery.query_to_dataframe(
+            self._aggregates_query(metrics_table, summaries, columns)
+        )
+
+    @dask.delayed
+    def calculate_aggregate_statistics(
+        self,
+        summaries: List[Summary],
+        aggregates: DataFrame,
+        segment: str,
+        analysis_basis: AnalysisBasis,
+    ) -> StatisticResultCollection:
+        """
+        Run statistics on the aggregates computed by `calculate_aggregates`.
+        """
+        segment_aggregates = aggregates[aggregates["segment"] == segment].set_index("branch")
+        results = StatisticResultCollection([])
+
+        for i, summary in enumerate(summaries):
+            if f"num_enrollments_{i}" not in segment_aggregates:
+                continue
+
+            summary_aggregates = DataFrame(
+                {
+                    column: segment_aggregates[f"{column}_{i}"].astype(int)
+                    for column in ("num_enrollments", "num_conversions", "num_invalid")
+                }
+            )
+            summary_aggregates = summary_aggregates[summary_aggregates["num_enrollments"] > 0]
+            results.extend(summary.run_aggregates(summary_aggregates, self.config.experiment))
+
+        return results.set_segment(segment).set_analysis_basis(analysis_basis)
+
+    @dask.delayed
+    def calculate_streaming_statistics(
+        self,
+        metrics_table: str,
+        summaries: List[Summary],
+        segments: List[str],
+        analysis_basis: AnalysisBasis,
+    ) -> StatisticResultCollection:
+        """
+        Run statistics on metrics read in batches, see `jetstream.streaming`.
+
+        Used for experiments with a population too large to load their metrics at once.
+        """
+        columns = ["branch"] + segments[1:] + [s.metric.name for s in summaries]
+        dtypes = self._metrics_dtypes(summaries)
+        # categories of the branch column would differ between batches
+        del dtypes["branch"]
 
-        return segment_data
+        def read_batches():
+            for batch in self.bigquery.table_to_record_batches(metrics_table, columns):
+                yield arrow_to_dataframe(batch, dtypes)
+
+        return stream_statistics(
+            read_batches, summaries, segments, self.config.experiment
+        ).set_analysis_basis(analysis_basis)
+
+    @dask.delayed
+    def counts_from_aggregates(
+        self, aggregates: DataFrame, segment: str, analysis_basis: AnalysisBasis
+    ) -> StatisticResultCollection:
+        """Count and missing count statistics from the aggregates of `calculate_aggregates`."""
+        segment_aggregates = aggregates[aggregates["segment"] == segment].set_index("branch")
+        return self._counts(
+            DataFrame({"num_enrollments": segment_aggregates["num_clients"].astype(int)}),
+            segment,
+            analysis_basis,
+        )
+
+    def _counts(
+        self, aggregates: DataFrame, segment: str, analysis_basis: AnalysisBasis
+    ) -> StatisticResultCollection:
+        counts = Count().transform_aggregates(aggregates, "identity", "*", self.config.experiment)
+        # branches without any enrolled clients
+        missing = [
+            b.slug
+            for b in self.config.experiment.branches
+            if b.slug not in set(counts.columns["branch"])
+        ]
+        empty = StatisticResultCollection.from_columns(
+            metric="identity", statistic="count", branch=missing, point=0
+        )
+
+        return (
+            StatisticResultCollection.concat([counts, empty])
+            .set_segment(segment)
+            .set_analysis_basis(analysis_basis)
+        )
+
+    def _metrics_dtypes(self, summaries: List[Summary]) -> Dict[str, str]:
+        """
+        Returns compact types for the columns of the metrics table used by `summaries`.
+
+        Segments are represented as booleans and metric values as 32 bit floats if the
+        metric allows for it.
+        """
+        dtypes = {"branch": "category"}
+        dtypes.update({segment.name: "bool" for segment in self.config.experiment.segments})
+        dtypes.update(
+            {
+                summary.metric.name: "float32"
+                for summary in summaries
+                if summary.metric.single_precision
+            }
+        )
+        return dtypes
+
+    @dask.delayed
+    def segment_rows(self, segment: str, metrics_data: DataFrame) -> Optional[np.ndarray]:
+        """
+        Returns the positions of the rows of the metrics data that belong to the
+        segment, or None for all rows.
+        """
+        if segment == "all":
+            return None
+        if segment not in metrics_data.columns:
+            raise ValueError(f"Segment {segment} not in metrics table")
+        return np.flatnonzero(metrics_data[segment].fillna(False).to_numpy(dtype=bool))
 
     def check_runnable(self, current_date: Optional[datetime] = None) -> bool:
         if self.config.experiment.normandy_slug is None:
@@ -321,9 +753,6 @@ class Analysis:
         if self.config.experiment.skip:
             raise errors.ExplicitSkipException(self.config.experiment.normandy_slug)
 
-        if self.config.experiment.is_high_population:
-            raise errors.HighPopulationException(self.config.experiment.normandy_slug)
-
         if not self.config.experiment.proposed_enrollment:
             raise errors.NoEnrollmentPeriodException(self.config.experiment.normandy_slug)
 
@@ -339,6 +768,25 @@ class Analysis:
 
         return True
 
+    def _sample_enrollments(self, enrollments_sql: str) -> str:
+        """
+        Restricts the enrollments query to a sample of clients if the experiment is
+        configured with a `sample_rate`.
+
+        Clients are sampled deterministically based on a hash of their client ID, so the
+        same clients get analysed on every run. Metrics are only computed for enrolled
+        clients, so metrics queries get sampled as well.
+        """
+        sample_rate = self.config.experiment.sample_rate
+        if sample_rate is None or sample_rate == 1:
+            return enrollments_sql
+
+        return (
+            f"SELECT *\nFROM (\n{enrollments_sql}\n)\n"
+            + "WHERE ABS(MOD(FARM_FINGERPRINT(client_id), 1000000)) "
+            + f"< {round(sample_rate * 1000000)}"
+        )
+
     def _app_id_to_bigquery_dataset(self, app_id: str) -> str:
         return re.sub(r"[^a-zA-Z0-9]", "_", app_id).lower()
 
@@ -398,6 +846,7 @@ class Analysis:
             exposure_signal,
             self.config.experiment.segments,
         )
+        enrollments_sql = self._sample_enrollments(enrollments_sql)
 
         dry_run_query(enrollments_sql)
         print(f"Dry running enrollments query for {self.config.experiment.normandy_slug}:")
@@ -438,7 +887,7 @@ class Analysis:
     def save_statistics(
         self,
         period: AnalysisPeriod,
-        segment_results: List[Dict[str, Any]],
+        segment_results: List[StatisticResultCollection],
         metrics_table: str,
     ):
         """Write statistics to BigQuery."""
@@ -446,9 +895,19 @@ class Analysis:
         job_config.schema = StatisticResult.bq_schema
         job_config.write_disposition = bigquery.job.WriteDisposition.WRITE_TRUNCATE
 
-        # wait for the job to complete
-        self.bigquery.load_table_from_json(
-            segment_results, f"statistics_{metrics_table}", job_config=job_config
+        # results of sampled analyses record the rate clients were sampled with
+        results = StatisticResultCollection.concat(segment_results).set_sample_rate(
+            self.config.experiment.sample_rate
+        )
+
+        arrow_table = results.to_arrow()
+        if STATISTICS_PARQUET_DIRECTORY:
+            directory = Path(STATISTICS_PARQUET_DIRECTORY)
+            directory.mkdir(parents=True, exist_ok=True)
+            pq.write_table(arrow_table, directory / f"statistics_{metrics_table}.parquet")
+
+        self.bigquery.load_table_from_arrow(
+            arrow_table, f"statistics_{metrics_table}", job_config=job_config
         )
 
         self.bigquery.add_labels_to_table(
@@ -461,7 +920,6 @@ class Analysis:
         """
         Run analysis using mozanalysis for a specific experiment.
         """
-        global _dask_cluster
         self.start_time = datetime.now(tz=pytz.utc)
         logger.info(
             "Analysis.run invoked for experiment %s at %s",
@@ -473,43 +931,9 @@ class Analysis:
         assert self.config.experiment.start_date is not None  # for mypy
 
         self.ensure_enrollments(current_date)
-
-        # set up dask
-        _dask_cluster = _dask_cluster or LocalCluster(
-            dashboard_address=DASK_DASHBOARD_ADDRESS,
-            processes=True,
-            threads_per_worker=1,
-            n_workers=DASK_N_PROCESSES,
-        )
-        client = Client(_dask_cluster)
-
+        client = self._dask_client(dry_run)
         results = []
 
-        if self.log_config:
-            log_plugin = LogPlugin(self.log_config)
-            client.register_worker_plugin(log_plugin)
-
-            # add profiling plugins
-            # resource_profiling_plugin = ResourceProfilingPlugin(
-            #     scheduler=_dask_cluster.scheduler,
-            #     project_id=self.log_config.log_project_id,
-            #     dataset_id=self.log_config.log_dataset_id,
-            #     table_id=self.log_config.task_profiling_log_table_id,
-            #     experiment=self.config.experiment.normandy_slug,
-            # )
-            # _dask_cluster.scheduler.add_plugin(resource_profiling_plugin)
-
-            # task_monitoring_plugin = TaskMonitoringPlugin(
-            #     scheduler=_dask_cluster.scheduler,
-            #     project_id=self.log_config.log_project_id,
-            #     dataset_id=self.log_config.log_dataset_id,
-            #     table_id=self.log_config.task_monitoring_log_table_id,
-            #     experiment=self.config.experiment.normandy_slug,
-            # )
-            # _dask_cluster.scheduler.add_plugin(task_monitoring_plugin)
-
-        table_to_dataframe = dask.delayed(self.bigquery.table_to_dataframe)
-
         for period in self.config.metrics:
             segment_results = []
             time_limits = self._get_timelimits_if_ready(period, current_date)
@@ -522,23 +946,12 @@ class Analysis:
                 )
                 continue
 
-            exp = mozanalysis.experiment.Experiment(
-                experiment_slug=self.config.experiment.normandy_slug,
-                start_date=self.config.experiment.start_date.strftime("%Y-%m-%d"),
-                app_id=self._app_id_to_bigquery_dataset(self.config.experiment.app_id),
-            )
-
-            analysis_bases = []
-
-            for m in self.config.metrics[period]:
-                for analysis_basis in m.metric.analysis_bases:
-                    analysis_bases.append(analysis_basis)
-
-            analysis_bases = list(set(analysis_bases))
-
+            analysis_bases = self._analysis_bases(period)
             if len(analysis_bases) == 0:
                 continue
 
+            exp = self._mozanalysis_experiment()
+
             for analysis_basis in analysis_bases:
                 metrics_table = self.calculate_metrics(
                     exp, time_limits, period, analysis_basis, dry_run
@@ -546,10 +959,6 @@ class Analysis:
 
                 if dry_run:
                     results.append(metrics_table)
-                else:
-                    metrics_dataframe = table_to_dataframe(metrics_table)
-
-                if dry_run:
                     logger.info(
                         "Not calculating statistics %s (%s); dry run",
                         self.config.experiment.normandy_slug,
@@ -557,20 +966,7 @@ class Analysis:
                     )
                     continue
 
-                segment_labels = ["all"] + [s.name for s in self.config.experiment.segments]
-                for segment in segment_labels:
-                    segment_data = self.subset_to_segment(segment, metrics_dataframe)
-                    for m in self.config.metrics[period]:
-                        segment_results += self.calculate_statistics(
-                            m,
-                            segment_data,
-                            segment,
-                            analysis_basis,
-                        ).to_dict()["data"]
-
-                    segment_results += self.counts(segment_data, segment, analysis_basis).to_dict()[
-                        "data"
-                    ]
+                segment_results += self._statistics(period, metrics_table, analysis_basis)
 
             results.append(
                 self.save_statistics(
@@ -583,6 +979,239 @@ class Analysis:
         result_futures = client.compute(results)
         client.gather(result_futures)  # block until futures have finished
 
+    def backfill(self, dates: List[datetime], dry_run: bool = False) -> None:
+        """
+        Run analysis for every window that became due on any of the dates.
+
+        Instead of querying metrics for each date separately, the metrics of all windows
+        due in a period are calculated in a single query and statistics of all windows
+        get computed in one dask graph.
+        """
+        if not dates:
+            return
+
+        self.start_time = datetime.now(tz=pytz.utc)
+        logger.info(
+            "Analysis.backfill invoked for experiment %s at %s",
+            self.config.experiment.normandy_slug,
+            self.start_time,
+        )
+
+        end_date = self.config.experiment.end_date
+        if end_date:
+            # dates after the end of the experiment have no windows left to analyse,
+            # but must not prevent the earlier dates from being analysed
+            dates = [date for date in dates if date <= end_date] or dates
+
+        last_date = max(dates)
+        self.check_runnable(last_date)
+        assert self.config.experiment.start_date is not None  # for mypy
+
+        self.ensure_enrollments(last_date)
+        client = self._dask_client(dry_run)
+        results = []
+
+        for period in self.config.metrics:
+            time_limits, windows = self._get_backfill_timelimits(period, dates)
+
+            if time_limits is None:
+                logger.info(
+                    "Skipping %s (%s); not ready",
+                    self.config.experiment.normandy_slug,
+                    period.value,
+                )
+                continue
+
+            analysis_bases = self._analysis_bases(period)
+            if len(analysis_bases) == 0:
+                continue
+
+            exp = self._mozanalysis_experiment()
+            segment_results: Dict[int, List] = {window: [] for window in windows}
+
+            for analysis_basis in analysis_bases:
+                metrics_tables = self.calculate_backfill_metrics(
+                    exp, time_limits, windows, period, analysis_basis, dry_run
+                )
+
+                if dry_run:
+                    results.append(metrics_tables)
+                    logger.info(
+                        "Not calculating statistics %s (%s); dry run",
+                        self.config.experiment.normandy_slug,
+                        period.value,
+                    )
+                    continue
+
+                # the tables of the windows are only known once the delayed query ran
+                for i, window in enumerate(windows):
+                    segment_results[window] += self._statistics(
+                        period, metrics_tables[i], analysis_basis
+                    )
+
+            for window in windows:
+                results.append(
+                    self.save_statistics(
+                        period,
+                        segment_results[window],
+                        self._table_name(period.value, window),
+                    )
+                )
+
+        result_futures = client.compute(results)
+        client.gather(result_futures)  # block until futures have finished
+
+    def _get_backfill_timelimits(
+        self, period: AnalysisPeriod, dates: List[datetime]
+    ) -> Tuple[Optional[TimeLimits], List[int]]:
+        """
+        Returns TimeLimits covering all analysis windows of the period that are due on
+        any of the dates, along with the indexes of these windows.
+        """
+        ready = [self._get_timelimits_if_ready(period, date) for date in dates]
+        due = [time_limits for time_limits in ready if time_limits is not None]
+        if not due:
+            return None, []
+
+        # analysis windows of a period are the same up to the number of windows closed
+        latest = max(due, key=lambda time_limits: len(time_limits.analysis_windows))
+        windows = sorted({len(time_limits.analysis_windows) for time_limits in due})
+        analysis_windows = tuple(latest.analysis_windows[window - 1] for window in windows)
+
+        return (
+            attr.evolve(
+                latest,
+                analysis_windows=analysis_windows,
+                first_date_data_required=add_days(
+                    latest.first_enrollment_date,
+                    min(analysis_window.start for analysis_window in analysis_windows),
+                ),
+            ),
+            windows,
+        )
+
+    def _mozanalysis_experiment(self) -> mozanalysis.experiment.Experiment:
+        assert self.config.experiment.start_date is not None  # for mypy
+        return mozanalysis.experiment.Experiment(
+            experiment_slug=self.config.experiment.normandy_slug,
+            start_date=self.config.experiment.start_date.strftime("%Y-%m-%d"),
+            app_id=self._app_id_to_bigquery_dataset(self.config.experiment.app_id),
+        )
+
+    def _analysis_bases(self, period: AnalysisPeriod) -> List[AnalysisBasis]:
+        analysis_bases = []
+
+        for m in self.config.metrics[period]:
+            for analysis_basis in m.metric.analysis_bases:
+                analysis_bases.append(analysis_basis)
+
+        return list(set(analysis_bases))
+
+    def _dask_client(self, dry_run: bool) -> Client:
+        """Returns a client of the dask cluster shared by analyses running concurrently."""
+        global _dask_cluster
+
+        with _dask_cluster_lock:
+            _dask_cluster = _dask_cluster or LocalCluster(
+                dashboard_address=DASK_DASHBOARD_ADDRESS,
+                processes=True,
+                threads_per_worker=1,
+                n_workers=DASK_N_PROCESSES,
+            )
+        client = Client(_dask_cluster)
+
+        if not dry_run:
+            client.register_worker_plugin(BigQueryClientPlugin(self.project))
+
+        if self.log_config:
+            log_plugin = LogPlugin(self.log_config)
+            client.register_worker_plugin(log_plugin)
+
+            # add profiling plugins
+            # resource_profiling_plugin = ResourceProfilingPlugin(
+            #     scheduler=_dask_cluster.scheduler,
+            #     project_id=self.log_config.log_project_id,
+            #     dataset_id=self.log_config.log_dataset_id,
+            #     table_id=self.log_config.task_profiling_log_table_id,
+            #     experiment=self.config.experiment.normandy_slug,
+            # )
+            # _dask_cluster.scheduler.add_plugin(resource_profiling_plugin)
+
+            # task_monitoring_plugin = TaskMonitoringPlugin(
+            #     scheduler=_dask_cluster.scheduler,
+            #     project_id=self.log_config.log_project_id,
+            #     dataset_id=self.log_config.log_dataset_id,
+            #     table_id=self.log_config.task_monitoring_log_table_id,
+            #     experiment=self.config.experiment.normandy_slug,
+            # )
+            # _dask_cluster.scheduler.add_plugin(task_monitoring_plugin)
+
+        return client
+
+    def _statistics(
+        self, period: AnalysisPeriod, metrics_table: str, analysis_basis: AnalysisBasis
+    ) -> List:
+        """Returns the delayed statistics of all segments computed on the metrics table."""
+        segment_results: List = []
+
+        # summaries that only need sufficient statistics get computed from
+        # aggregates calculated in BigQuery, along with the client counts
+        aggregate_summaries = [s for s in self.config.metrics[period] if s.supports_aggregates()]
+        dataframe_summaries = [
+            s for s in self.config.metrics[period] if not s.supports_aggregates()
+        ]
+        aggregates = self.calculate_aggregates(metrics_table, aggregate_summaries)
+
+        segment_labels = ["all"] + [s.name for s in self.config.experiment.segments]
+
+        # only download the per-client metrics if some summaries need them, and
+        # only the columns these summaries need
+        streaming = self.config.experiment.is_high_population
+        if dataframe_summaries and streaming:
+            segment_results.append(
+                self.calculate_streaming_statistics(
+                    metrics_table, dataframe_summaries, segment_labels, analysis_basis
+                )
+            )
+        elif dataframe_summaries:
+            metrics_dataframe = dask.delayed(self.bigquery.table_to_dataframe)(
+                metrics_table,
+                ["branch"] + segment_labels[1:] + [s.metric.name for s in dataframe_summaries],
+                self._metrics_dtypes(dataframe_summaries),
+            )
+
+        for segment in segment_labels:
+            segment_results.append(
+                self.calculate_aggregate_statistics(
+                    aggregate_summaries, aggregates, segment, analysis_basis
+                )
+            )
+            segment_results.append(self.counts_from_aggregates(aggregates, segment, analysis_basis))
+
+            if not dataframe_summaries or streaming:
+                continue
+
+            # tasks share the metrics table and select the rows of the segment
+            # themselves, so segment subsets are never passed between workers
+            rows = self.segment_rows(segment, metrics_dataframe)
+            for summaries in self._statistics_batches(
+                [s for s in dataframe_summaries if not s.supports_partitions()], _num_workers()
+            ):
+                segment_results.append(
+                    self.calculate_statistics(
+                        summaries, metrics_dataframe, rows, segment, analysis_basis
+                    )
+                )
+            for summary in dataframe_summaries:
+                if summary.supports_partitions():
+                    segment_results.append(
+                        self._partitioned_statistics(
+                            summary, metrics_dataframe, rows, segment, analysis_basis
+                        )
+                    )
+
+        return segment_results
+
     def ensure_enrollments(self, current_date: datetime) -> None:
         """Ensure that enrollment tables for experiment are up-to-date or re-create."""
         time_limits = self._get_timelimits_if_ready(AnalysisPeriod.DAY, current_date)
@@ -596,8 +1225,7 @@ class Analysis:
         if self.config.experiment.start_date is None:
             raise errors.NoStartDateException(self.config.experiment.normandy_slug)
 
-        normalized_slug = bq_normalize_name(self.config.experiment.normandy_slug)
-        enrollments_table = f"enrollments_{normalized_slug}"
+        enrollments_table = enrollments_table_name(self.config.experiment)
 
         logger.info(f"Create {enrollments_table}")
         exp = mozanalysis.experiment.Experiment(
@@ -620,6 +1248,7 @@ class Analysis:
             exposure_signal,
             self.config.experiment.segments,
         )
+        enrollments_sql = self._sample_enrollments(enrollments_sql)
 
         try:
             self.bigquery.execute(
@@ -1,17 +1,91 @@
+import io
+import logging
 import re
+import threading
 import time
-from typing import Any, Dict, Iterable, Mapping, Optional
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Union
 
 import attr
+import dask.distributed
 import google.cloud.bigquery
 import google.cloud.bigquery.client
 import google.cloud.bigquery.dataset
 import google.cloud.bigquery.job
 import google.cloud.bigquery.table
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from distributed.diagnostics.plugin import WorkerPlugin
 from google.cloud.bigquery_storage import BigQueryReadClient
 
 from . import AnalysisPeriod, bq_normalize_name
+from .cache import TableCache
+
+logger = logging.getLogger(__name__)
+
+
+def arrow_to_dataframe(
+    data: Union[pa.Table, pa.RecordBatch], dtypes: Optional[Mapping[str, str]] = None
+) -> pd.DataFrame:
+    """
+    Convert Arrow data read from BigQuery to a dataframe.
+
+    `dtypes` maps columns to the types they get converted to, missing values of
+    columns converted to `bool` are considered `False`.
+    """
+    # use nullable types for booleans and integers, like `RowIterator.to_dataframe`
+    df = data.to_pandas(
+        types_mapper={pa.bool_(): pd.BooleanDtype(), pa.int64(): pd.Int64Dtype()}.get
+    )
+
+    for column, dtype in (dtypes or {}).items():
+        if column not in df:
+            continue
+        if dtype == "bool":
+            df[column] = df[column].fillna(False)
+        df[column] = df[column].astype(dtype)
+
+    return df
+
+
+# BigQuery clients shared within the process, by project
+_bigquery_clients: Dict[str, google.cloud.bigquery.client.Client] = {}
+_storage_client: Optional[BigQueryReadClient] = None
+_clients_lock = threading.Lock()
+
+
+def shared_bigquery_client(project: str) -> google.cloud.bigquery.client.Client:
+    """
+    Returns the BigQuery client of the current process for the project.
+
+    Clients are thread-safe, sharing them avoids authenticating and setting up
+    connections for every BigQuery operation.
+    """
+    with _clients_lock:
+        if project not in _bigquery_clients:
+            _bigquery_clients[project] = google.cloud.bigquery.client.Client(project)
+        return _bigquery_clients[project]
+
+
+def shared_storage_client() -> BigQueryReadClient:
+    """Returns the BigQuery Storage API client of the current process."""
+    global _storage_client
+    with _clients_lock:
+        _storage_client = _storage_client or BigQueryReadClient()
+        return _storage_client
+
+
+class BigQueryClientPlugin(WorkerPlugin):
+    """
+    Dask worker plugin for initializing the shared BigQuery clients once per worker.
+    """
+
+    def __init__(self, project: str):
+        self.project = project
+
+    def setup(self, worker: dask.distributed.Worker):
+        shared_bigquery_client(self.project)
+        shared_storage_client()
 
 
 @attr.s(auto_attribs=True, slots=True)
@@ -20,19 +94,83 @@ class BigQueryClient:
     dataset: str
     _client: Optional[google.cloud.bigquery.client.Client] = None
     _storage_client: Optional[BigQueryReadClient] = None
+    cache: Optional[TableCache] = attr.Factory(TableCache.from_environment)
 
     @property
-    def client(self):
-        self._client = self._client or google.cloud.bigquery.client.Client(self.project)
-        return self._client
+    def client(self) -> google.cloud.bigquery.client.Client:
+        return self._client or shared_bigquery_client(self.project)
 
-    def table_to_dataframe(self, table: str) -> pd.DataFrame:
-        """Return all rows of the specified table as a dataframe."""
-        self._storage_client = self._storage_client or BigQueryReadClient()
+    @property
+    def storage_client(self) -> BigQueryReadClient:
+        return self._storage_client or shared_storage_client()
 
+    def table_to_dataframe(
+        self,
+        table: str,
+        columns: Optional[Iterable[str]] = None,
+        dtypes: Optional[Mapping[str, str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Return all rows of the specified table as a dataframe.
+
+        If `columns` is specified, only these columns are read; columns missing from the
+        table are ignored. `dtypes` maps columns to the types they get converted to, missing
+        values of columns converted to `bool` are considered `False`.
+
+        Tables are read from the local cache if one is configured.
+        """
+        table_id = f"{self.project}.{self.dataset}.{table}"
+        table_ref = self.client.get_table(table_id)
+        selected_fields = table_ref.schema
+        if columns is not None:
+            columns = set(columns)
+            selected_fields = [field for field in table_ref.schema if field.name in columns]
+            columns = [field.name for field in selected_fields]
+
+        arrow_table = self.cache.get(table_id, table_ref.modified, columns) if self.cache else None
+        if arrow_table is None:
+            rows = self.client.list_rows(table_ref, selected_fields=selected_fields)
+            arrow_table = rows.to_arrow(bqstorage_client=self.storage_client)
+            if self.cache:
+                try:
+                    self.cache.put(table_id, table_ref.modified, arrow_table, columns)
+                except OSError as e:
+                    logger.warning(f"Error while caching {table_id}: {e}")
+
+        return arrow_to_dataframe(arrow_table, dtypes)
+
+    def table_to_record_batches(
+        self, table: str, columns: Optional[Iterable[str]] = None
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Return the rows of the specified table as a stream of Arrow record batches.
+
+        If `columns` is specified, only these columns are read; columns missing from the
+        table are ignored.
+        """
+        table_ref = self.client.get_table(f"{self.project}.{self.dataset}.{table}")
+        selected_fields = table_ref.schema
+        if columns is not None:
+            columns = set(columns)
+            selected_fields = [field for field in table_ref.schema if field.name in columns]
+
+        rows = self.client.list_rows(table_ref, selected_fields=selected_fields)
+        return rows.to_arrow_iterable(bqstorage_client=self.storage_client)
+
+    def query_to_dataframe(self, query: str) -> pd.DataFrame:
+        """Return the results of the query as a dataframe."""
+        dataset = google.cloud.bigquery.dataset.DatasetReference.from_string(
+            self.dataset,
+            default_project=self.project,
+        )
+        config = google.cloud.bigquery.job.QueryJobConfig(default_dataset=dataset)
+        job = self.client.query(query, config)
+        return job.result().to_dataframe(bqstorage_client=self.storage_client)
+
+    def table_columns(self, table: str) -> Dict[str, str]:
+        """Return a mapping of the top-level column names of the table to their types."""
         table_ref = self.client.get_table(f"{self.project}.{self.dataset}.{table}")
-        rows = self.client.list_rows(table_ref)
-        return rows.to_dataframe(bqstorage_client=self._storage_client)
+        return {field.name: field.field_type for field in table_ref.schema}
 
     def add_labels_to_table(self, table_name: str, labels: Mapping[str, str]) -> None:
         """Adds the provided labels to the table."""
@@ -46,12 +184,25 @@ class BigQueryClient:
         """Returns the current UTC timestamp as a valid BigQuery label."""
         return str(int(time.time()))
 
-    def load_table_from_json(
-        self, results: Iterable[Dict], table: str, job_config: google.cloud.bigquery.LoadJobConfig
+    def load_table_from_arrow(
+        self,
+        arrow_table: pa.Table,
+        table: str,
+        job_config: google.cloud.bigquery.LoadJobConfig,
     ):
+        """
+        Load an Arrow table into BigQuery.
+
+        The table gets uploaded as Parquet file, so BigQuery doesn't need to parse the rows.
+        """
+        job_config.source_format = google.cloud.bigquery.SourceFormat.PARQUET
+        data = io.BytesIO()
+        pq.write_table(arrow_table, data)
+        data.seek(0)
+
         # wait for the job to complete
         destination_table = f"{self.project}.{self.dataset}.{table}"
-        self.client.load_table_from_json(results, destination_table, job_config=job_config).result()
+        self.client.load_table_from_file(data, destination_table, job_config=job_config).result()
 
         # add a label with the current timestamp to the table
         self.add_labels_to_table(
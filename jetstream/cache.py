@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import attr
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRECTORY = os.getenv("JETSTREAM_CACHE_DIR")
+CACHE_MAX_SIZE_GB = float(os.getenv("JETSTREAM_CACHE_MAX_SIZE_GB", 20))
+
+
+@attr.s(auto_attribs=True)
+class TableCache:
+    """
+    On-disk cache of BigQuery tables stored as Parquet files.
+
+    Entries are keyed by the table, its last-modified time and the read columns, so
+    tables that got updated are never served from the cache. The least recently used
+    entries get evicted once the cache exceeds `max_size` bytes.
+    """
+
+    directory: Path
+    max_size: int
+
+    @classmethod
+    def from_environment(cls) -> Optional["TableCache"]:
+        """Returns the cache configured through environment variables, if any."""
+        if not CACHE_DIRECTORY:
+            return None
+        return cls(Path(CACHE_DIRECTORY), int(CACHE_MAX_SIZE_GB * 1024**3))
+
+    def _path(
+        self,
+        table: str,
+        modified: Optional[datetime],
+        columns: Optional[Iterable[str]] = None,
+    ) -> Path:
+        key = "|".join(
+            [
+                table,
+                modified.isoformat() if modified else "",
+                ",".join(sorted(columns)) if columns is not None else "*",
+            ]
+        )
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.parquet"
+
+    def get(
+        self,
+        table: str,
+        modified: Optional[datetime],
+        columns: Optional[Iterable[str]] = None,
+    ) -> Optional[pa.Table]:
+        """Returns the cached table, or None if it isn't cached."""
+        path = self._path(table, modified, columns)
+        try:
+            arrow_table = pq.read_table(path, memory_map=True)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Error while reading {table} from cache: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        # mark entry as recently used
+        path.touch()
+        return arrow_table
+
+    def put(
+        self,
+        table: str,
+        modified: Optional[datetime],
+        arrow_table: pa.Table,
+        columns: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Adds the table to the cache and evicts the least recently used entries."""
+        path = self._path(table, modified, columns)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file first to not expose partially written entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(arrow_table, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits `max_size`."""
+        entries = []
+        for path in self.directory.glob("*.parquet"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries, key=lambda entry: entry[0]):
+            if size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
@@ -1,6 +1,7 @@
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from functools import partial
 from pathlib import Path
@@ -20,15 +21,17 @@ from typing import (
 
 import attr
 import click
+import google.cloud.storage as storage
 import mozanalysis
 import pytz
 import toml
 
-from . import bq_normalize_name, external_config
-from .analysis import Analysis
+from . import external_config
+from .analysis import Analysis, enrollments_table_name
 from .argo import submit_workflow
 from .bigquery_client import BigQueryClient
-from .config import AnalysisConfiguration, AnalysisSpec
+from .config import AnalysisConfiguration, AnalysisSpec, ExperimentConfiguration
+from .config_bundle import ConfigBundle
 from .dryrun import DryRunFailedError
 from .errors import ExplicitSkipException, ValidationException
 from .experimenter import ExperimentCollection
@@ -43,6 +46,9 @@ logger = logging.getLogger(__name__)
 
 RECOGNIZED_EXPERIMENT_TYPES = ("pref", "addon", "message", "v6")
 
+# snapshots shared by Argo pods get deleted once they are older than this
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("JETSTREAM_SNAPSHOT_RETENTION_DAYS", 7))
+
 
 @attr.s
 class AllType:
@@ -66,6 +72,23 @@ class ExecutorStrategy(Protocol):
         ...
 
 
+def _snapshot_path(bucket: str, name: str, extension: str) -> str:
+    """Returns a new path in the bucket to snapshot data shared by Argo pods to."""
+    timestamp = datetime.now(tz=pytz.utc).strftime("%Y%m%d%H%M%S%f")
+    return f"gs://{bucket}/snapshots/{name}_{timestamp}.{extension}"
+
+
+def _delete_expired_snapshots(bucket: str) -> None:
+    """Deletes snapshots written by earlier workflows that exceeded the retention period."""
+    expiration = datetime.now(tz=pytz.utc) - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+    try:
+        for blob in storage.Client().list_blobs(bucket, prefix="snapshots/"):
+            if blob.time_created < expiration:
+                blob.delete()
+    except Exception as e:
+        logger.warning(f"Error while deleting expired snapshots from {bucket}: {e}")
+
+
 @attr.s(auto_attribs=True)
 class ArgoExecutorStrategy:
     project_id: str
@@ -77,6 +100,13 @@ class ArgoExecutorStrategy:
     cluster_ip: Optional[str] = None
     cluster_cert: Optional[str] = None
     experiment_getter: Callable[[], ExperimentCollection] = ExperimentCollection.from_experimenter
+    # path the experiments get snapshotted to, so that pods don't fetch them again
+    experiments_snapshot: Optional[str] = None
+    # path the resolved configs get bundled to, so that pods don't resolve them again
+    config_bundle: Optional[str] = None
+    config_getter: Callable[
+        [], ExternalConfigCollection
+    ] = ExternalConfigCollection.from_github_repo
 
     WORKLFOW_DIR = Path(__file__).parent / "workflows"
     RUN_WORKFLOW = WORKLFOW_DIR / "run.yaml"
@@ -89,6 +119,7 @@ class ArgoExecutorStrategy:
         if configuration_map is not None:
             raise Exception("Custom configurations are not supported when running with Argo")
 
+        worklist = list(worklist)
         experiments_config: Dict[str, List[str]] = {}
         for (config, date) in worklist:
             experiments_config.setdefault(config.experiment.normandy_slug, []).append(
@@ -99,17 +130,39 @@ class ArgoExecutorStrategy:
             {"slug": slug, "dates": dates} for slug, dates in experiments_config.items()
         ]
 
+        parameters = {
+            "experiments": experiments_config_list,
+            "project_id": self.project_id,
+            "dataset_id": self.dataset_id,
+            "bucket": self.bucket,
+        }
+
+        if self.experiments_snapshot or self.config_bundle:
+            experiments = self.experiment_getter()
+
+        snapshots = (self.experiments_snapshot, self.config_bundle)
+        if any(path and path.startswith(f"gs://{self.bucket}/snapshots/") for path in snapshots):
+            _delete_expired_snapshots(self.bucket)
+
+        if self.experiments_snapshot:
+            experiments.save_snapshot(self.experiments_snapshot)
+            parameters["experiments_snapshot"] = self.experiments_snapshot
+
+        if self.config_bundle:
+            ConfigBundle(
+                experiments,
+                self.config_getter(),
+                {config.experiment.normandy_slug: config for config, _ in worklist},
+            ).save(self.config_bundle)
+            _check_config_bundle(self.config_bundle)
+            parameters["config_bundle"] = self.config_bundle
+
         return submit_workflow(
             project_id=self.project_id,
             zone=self.zone,
             cluster_id=self.cluster_id,
             workflow_file=self.RUN_WORKFLOW,
-            parameters={
-                "experiments": experiments_config_list,
-                "project_id": self.project_id,
-                "dataset_id": self.dataset_id,
-                "bucket": self.bucket,
-            },
+            parameters=parameters,
             monitor_status=self.monitor_status,
             cluster_ip=self.cluster_ip,
             cluster_cert=self.cluster_cert,
@@ -127,6 +180,8 @@ class SerialExecutorStrategy:
     config_getter: Callable[
         [], ExternalConfigCollection
     ] = ExternalConfigCollection.from_github_repo
+    # analyse all dates of an experiment at once rather than date by date
+    backfill: bool = False
 
     def execute(
         self,
@@ -134,27 +189,81 @@ class SerialExecutorStrategy:
         configuration_map: Optional[Mapping[str, TextIO]] = None,
     ):
         failed = False
+        if self.backfill:
+            configs: Dict[str, AnalysisConfiguration] = {}
+            experiment_dates: Dict[str, List[datetime]] = {}
+            for config, date in worklist:
+                configs[config.experiment.normandy_slug] = config
+                experiment_dates.setdefault(config.experiment.normandy_slug, []).append(date)
+
+            for slug, dates in experiment_dates.items():
+                if not self._run_analysis(configs[slug], dates):
+                    failed = True
+            return not failed
+
         for config, date in worklist:
-            try:
-                analysis = self.analysis_class(
-                    self.project_id, self.dataset_id, config, self.log_config
-                )
-                analysis.run(date)
-                export_metadata(config, self.bucket, self.project_id, analysis.start_time)
-            except ValidationException as e:
-                # log custom Jetstream exceptions but let the workflow succeed;
-                # this prevents Argo from retrying the analysis unnecessarily
-                # when it is already clear that it won't succeed
-                logger.exception(
-                    str(e), exc_info=e, extra={"experiment": config.experiment.normandy_slug}
-                )
-            except Exception as e:
+            if not self._run_analysis(config, date):
                 failed = True
-                logger.exception(
-                    str(e), exc_info=e, extra={"experiment": config.experiment.normandy_slug}
-                )
         return not failed
 
+    def _run_analysis(
+        self, config: AnalysisConfiguration, date: Union[datetime, List[datetime]]
+    ) -> bool:
+        """
+        Run the analysis of an experiment for a date, or a backfill for a list of dates.
+        Returns False if it failed.
+        """
+        try:
+            analysis = self.analysis_class(
+                self.project_id, self.dataset_id, config, self.log_config
+            )
+            if isinstance(date, list):
+                analysis.backfill(date)
+            else:
+                analysis.run(date)
+            export_metadata(config, self.bucket, self.project_id, analysis.start_time)
+        except ValidationException as e:
+            # log custom Jetstream exceptions but let the workflow succeed;
+            # this prevents Argo from retrying the analysis unnecessarily
+            # when it is already clear that it won't succeed
+            logger.exception(
+                str(e), exc_info=e, extra={"experiment": config.experiment.normandy_slug}
+            )
+        except Exception as e:
+            logger.exception(
+                str(e), exc_info=e, extra={"experiment": config.experiment.normandy_slug}
+            )
+            return False
+        return True
+
+
+@attr.s(auto_attribs=True)
+class ParallelExecutorStrategy(SerialExecutorStrategy):
+    """
+    Analyses several experiments concurrently, sharing the dask cluster.
+
+    While one experiment waits on BigQuery, statistics of others can be computed. The
+    dates of an experiment are analysed one after another, since they share the
+    enrollments table.
+    """
+
+    max_concurrency: int = 4
+
+    def execute(
+        self,
+        worklist: Iterable[Tuple[AnalysisConfiguration, datetime]],
+        configuration_map: Optional[Mapping[str, TextIO]] = None,
+    ):
+        experiment_worklists: Dict[str, List[Tuple[AnalysisConfiguration, datetime]]] = {}
+        for config, date in worklist:
+            experiment_worklists.setdefault(config.experiment.normandy_slug, []).append(
+                (config, date)
+            )
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = executor.map(super().execute, experiment_worklists.values())
+            return all(list(results))
+
 
 @attr.s(auto_attribs=True)
 class AnalysisExecutor:
@@ -165,6 +274,8 @@ class AnalysisExecutor:
     experiment_slugs: Union[Iterable[str], AllType]
     configuration_map: Optional[Mapping[str, TextIO]] = attr.ib(None)
     recreate_enrollments: bool = False
+    # configs resolved ahead of time by `compile-configs`
+    config_bundle: Optional[ConfigBundle] = None
 
     @staticmethod
     def _today() -> datetime:
@@ -210,12 +321,13 @@ class AnalysisExecutor:
 
         return strategy.execute(worklist, self.configuration_map)
 
-    def _delete_enrollment_table(self, experiment: mozanalysis.experiment.Experiment) -> None:
+    def _delete_enrollment_table(self, experiment: ExperimentConfiguration) -> None:
         """Deletes all enrollment table associated with the experiment."""
         print(f"Delete enrollment table for {experiment.normandy_slug}")
         client = BigQueryClient(project=self.project_id, dataset=self.dataset_id)
-        normalized_slug = bq_normalize_name(experiment.normandy_slug)
-        enrollments_table = f"{self.project_id}.{self.dataset_id}.enrollments_{normalized_slug}"
+        enrollments_table = (
+            f"{self.project_id}.{self.dataset_id}.{enrollments_table_name(experiment)}"
+        )
         client.delete_table(enrollments_table)
 
     def _experiments_to_configs(
@@ -227,14 +339,28 @@ class AnalysisExecutor:
     ) -> List[AnalysisConfiguration]:
         """Convert mozanalysis experiments to analysis configs."""
         configs = []
+        external_configs = self.config_bundle.external_configs if self.config_bundle else None
+
+        configuration_map = self.configuration_map or {}
 
         for experiment in experiments:
+            custom_config = experiment.normandy_slug in configuration_map
+            if (
+                not custom_config
+                and self.config_bundle
+                and experiment.normandy_slug in self.config_bundle.configs
+            ):
+                configs.append(self.config_bundle.configs[experiment.normandy_slug])
+                continue
+
             spec = AnalysisSpec.default_for_experiment(experiment)
-            if self.configuration_map and experiment.normandy_slug in self.configuration_map:
-                config_dict = toml.load(self.configuration_map[experiment.normandy_slug])
+            if custom_config:
+                config_dict = toml.load(configuration_map[experiment.normandy_slug])
                 spec.merge(AnalysisSpec.from_dict(config_dict))
             else:
-                external_configs = config_getter()
+                # external configs are shared by all experiments
+                if external_configs is None:
+                    external_configs = config_getter()
                 if external_spec := external_configs.spec_for_experiment(experiment.normandy_slug):
                     spec.merge(external_spec)
 
@@ -252,7 +378,10 @@ class AnalysisExecutor:
         ] = ExternalConfigCollection.from_github_repo,
     ) -> List[AnalysisConfiguration]:
         """Fetch configs of experiments that are to be analysed."""
-        experiments = experiment_getter()
+        if self.config_bundle:
+            experiments = self.config_bundle.experiments
+        else:
+            experiments = experiment_getter()
         run_configs = []
 
         if isinstance(self.experiment_slugs, AllType):
@@ -456,6 +585,14 @@ cluster_cert_option = click.option(
     help="Kubernetes cluster certificate used for authenticating to the cluster",
 )
 
+max_concurrency_option = click.option(
+    "--max_concurrency",
+    "--max-concurrency",
+    type=int,
+    default=1,
+    help="Maximum number of experiments to analyse concurrently",
+)
+
 recreate_enrollments_option = click.option(
     "--recreate_enrollments",
     "--recreate-enrollments",
@@ -464,6 +601,29 @@ recreate_enrollments_option = click.option(
     default=False,
 )
 
+config_bundle_option = click.option(
+    "--config_bundle",
+    "--config-bundle",
+    help="Path or gs:// URI of configs compiled with compile-configs",
+)
+
+
+def _load_config_bundle(path: Optional[str]) -> Optional[ConfigBundle]:
+    """Returns the config bundle at path; configs get resolved again if it can't be loaded."""
+    if not path:
+        return None
+
+    bundle = ConfigBundle.load(path)
+    if bundle is None:
+        logger.error(f"Resolving configs again since config bundle {path} can't be loaded")
+    return bundle
+
+
+def _check_config_bundle(path: str) -> None:
+    """Fails if a bundle that has just been written can't be loaded by analyses."""
+    if ConfigBundle.load(path) is None:
+        raise Exception(f"Config bundle {path} can't be loaded")
+
 
 @cli.command()
 @project_id_option
@@ -479,6 +639,8 @@ recreate_enrollments_option = click.option(
 @bucket_option
 @secret_config_file_option
 @recreate_enrollments_option
+@max_concurrency_option
+@config_bundle_option
 @click.pass_context
 def run(
     ctx,
@@ -489,6 +651,8 @@ def run(
     bucket,
     config_file,
     recreate_enrollments,
+    max_concurrency,
+    config_bundle,
 ):
     """Runs analysis for the provided date."""
     analysis_executor = AnalysisExecutor(
@@ -499,11 +663,20 @@ def run(
         experiment_slugs=[experiment_slug] if experiment_slug else All,
         configuration_map={experiment_slug: config_file} if experiment_slug and config_file else {},
         recreate_enrollments=recreate_enrollments,
+        config_bundle=_load_config_bundle(config_bundle),
     )
 
-    success = analysis_executor.execute(
-        strategy=SerialExecutorStrategy(project_id, dataset_id, bucket, ctx.obj["log_config"])
-    )
+    strategy = SerialExecutorStrategy(project_id, dataset_id, bucket, ctx.obj["log_config"])
+    if max_concurrency > 1:
+        strategy = ParallelExecutorStrategy(
+            project_id,
+            dataset_id,
+            bucket,
+            ctx.obj["log_config"],
+            max_concurrency=max_concurrency,
+        )
+
+    success = analysis_executor.execute(strategy=strategy)
 
     sys.exit(0 if success else 1)
 
@@ -549,6 +722,8 @@ def run_argo(
         monitor_status=monitor_status,
         cluster_ip=cluster_ip,
         cluster_cert=cluster_cert,
+        experiments_snapshot=_snapshot_path(bucket, "experiments", "json"),
+        config_bundle=_snapshot_path(bucket, "configs", "json"),
     )
 
     AnalysisExecutor(
@@ -591,7 +766,9 @@ def rerun(
     recreate_enrollments,
 ):
     """Rerun all available analyses for a specific experiment."""
-    strategy = SerialExecutorStrategy(project_id, dataset_id, bucket, ctx.obj["log_config"])
+    strategy = SerialExecutorStrategy(
+        project_id, dataset_id, bucket, ctx.obj["log_config"], backfill=True
+    )
 
     if argo:
         strategy = ArgoExecutorStrategy(
@@ -603,6 +780,8 @@ def rerun(
             monitor_status=monitor_status,
             cluster_ip=cluster_ip,
             cluster_cert=cluster_cert,
+            experiments_snapshot=_snapshot_path(bucket, "experiments", "json"),
+            config_bundle=_snapshot_path(bucket, "configs", "json"),
         )
 
     AnalysisExecutor(
@@ -676,6 +855,8 @@ def rerun_config_changed(
             monitor_status=monitor_status,
             cluster_ip=cluster_ip,
             cluster_cert=cluster_cert,
+            experiments_snapshot=_snapshot_path(bucket, "experiments", "json"),
+            config_bundle=_snapshot_path(bucket, "configs", "json"),
         )
 
     success = AnalysisExecutor(
@@ -747,8 +928,15 @@ def validate_config(path: Iterable[os.PathLike]):
 @experiment_slug_option
 @secret_config_file_option
 @recreate_enrollments_option
+@config_bundle_option
 def ensure_enrollments(
-    project_id, dataset_id, bucket, experiment_slug, config_file, recreate_enrollments
+    project_id,
+    dataset_id,
+    bucket,
+    experiment_slug,
+    config_file,
+    recreate_enrollments,
+    config_bundle,
 ):
     """Ensure that enrollment tables for experiment are up-to-date or re-create."""
     AnalysisExecutor(
@@ -759,4 +947,21 @@ def ensure_enrollments(
         experiment_slugs=[experiment_slug] if experiment_slug else All,
         configuration_map={experiment_slug: config_file} if config_file else None,
         recreate_enrollments=recreate_enrollments,
+        config_bundle=_load_config_bundle(config_bundle),
     ).ensure_enrollments()
+
+
+@cli.command("compile-configs")
+@click.option(
+    "--output",
+    required=True,
+    help="Path or gs:// URI to write the compiled configs to",
+)
+def compile_configs(output):
+    """Resolve the configs of all launched experiments into a bundle."""
+    ConfigBundle.compile(
+        ExperimentCollection.from_experimenter(),
+        ExternalConfigCollection.from_github_repo(),
+        RECOGNIZED_EXPERIMENT_TYPES,
+    ).save(output)
+    _check_config_bundle(output)
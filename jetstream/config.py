@@ -362,6 +362,10 @@ class ExperimentConfiguration:
     def skip(self) -> bool:
         return self.experiment_spec.skip
 
+    @property
+    def sample_rate(self) -> Optional[float]:
+        return self.experiment_spec.sample_rate
+
     def has_external_config_overrides(self) -> bool:
         """Check whether the external config overrides Experimenter configuration."""
         return (
@@ -389,6 +393,11 @@ def _validate_yyyy_mm_dd(instance: Any, attribute: Any, value: Any) -> None:
     instance.parse_date(value)
 
 
+def _validate_sample_rate(instance: Any, attribute: Any, value: Any) -> None:
+    if value is not None and not 0 < value <= 1:
+        raise ValueError(f"sample_rate must be in (0, 1]; got {value}")
+
+
 def structure_window_limit(value: Any, _klass: Type) -> WindowLimit:
     try:
         return AnalysisWindow(value)
@@ -435,6 +444,8 @@ class ExperimentSpec:
     segments: List[SegmentReference] = attr.Factory(list)
     skip: bool = False
     exposure_signal: Optional[ExposureSignalDefinition] = None
+    # analyse a deterministic sample of clients instead of all enrolled clients
+    sample_rate: Optional[float] = attr.ib(default=None, validator=_validate_sample_rate)
 
     @staticmethod
     def parse_date(yyyy_mm_dd: Optional[str]) -> Optional[dt.datetime]:
@@ -479,6 +490,7 @@ class MetricDefinition:
     description: Optional[str] = None
     bigger_is_better: bool = True
     analysis_bases: Optional[List[mozanalysis.experiment.AnalysisBasis]] = None
+    single_precision: bool = False
 
     @staticmethod
     def generate_select_expression(
@@ -534,6 +546,7 @@ class MetricDefinition:
                 mozanalysis_metric=mozanalysis_metric,
                 analysis_bases=self.analysis_bases
                 or [mozanalysis.experiment.AnalysisBasis.ENROLLMENTS],
+                single_precision=self.single_precision,
             )
         else:
             select_expression = self.generate_select_expression(
@@ -549,6 +562,7 @@ class MetricDefinition:
                 bigger_is_better=self.bigger_is_better,
                 analysis_bases=self.analysis_bases
                 or [mozanalysis.experiment.AnalysisBasis.ENROLLMENTS],
+                single_precision=self.single_precision,
             )
 
         metrics_with_treatments = []
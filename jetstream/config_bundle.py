@@ -0,0 +1,212 @@
+"""
+Bundles of analysis configurations resolved ahead of time.
+
+Resolving configurations requires fetching experiments from Experimenter and the
+external configs from the jetstream-config repository. A bundle gets compiled once,
+for example when deploying an Argo workflow, and is loaded by all processes analysing
+experiments instead of each of them fetching experiments and configs again.
+
+Bundles are stored as JSON. They contain the experiments, the TOML sources of the
+external configs and the slugs of the experiments whose configs could be resolved;
+configs get resolved from them again, without network access, when loading a bundle.
+"""
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Type, Union
+
+import attr
+import cattr
+import pytz
+import toml
+
+from jetstream import default_config, outcomes
+from jetstream.config import AnalysisConfiguration, AnalysisSpec, OutcomeSpec
+from jetstream.experimenter import Experiment, ExperimentCollection
+from jetstream.external_config import (
+    ExternalConfig,
+    ExternalConfigCollection,
+    ExternalDefaultConfig,
+    ExternalOutcome,
+)
+
+from .util import read_file, write_file
+
+logger = logging.getLogger(__name__)
+
+# incremented on incompatible changes to the bundle format
+BUNDLE_VERSION = 2
+
+ExternalEntity = Union[ExternalConfig, ExternalDefaultConfig, ExternalOutcome]
+
+
+def _unstructure_external_entity(entity: ExternalEntity) -> Dict[str, Any]:
+    """Serializes an external config or outcome, with its spec as TOML source."""
+    if entity.source is None:
+        raise ValueError(f"Source of external config {entity.slug} is unknown")
+    fields = attr.asdict(entity, recurse=False, filter=lambda a, _: a.name != "spec")
+    return _bundle_converter.unstructure(fields)
+
+
+def _structure_external_entity(d: Dict[str, Any], cls: Type[ExternalEntity]) -> ExternalEntity:
+    fields = {
+        a.name: _bundle_converter.structure(d[a.name], a.type)
+        for a in attr.fields(cls)
+        if a.name != "spec"
+    }
+    spec = toml.loads(d["source"])
+    if issubclass(cls, ExternalOutcome):
+        return cls(spec=OutcomeSpec.from_dict(spec), **fields)
+    return cls(spec=AnalysisSpec.from_dict(spec), **fields)
+
+
+_bundle_converter = cattr.Converter()
+_bundle_converter.register_unstructure_hook(datetime, datetime.isoformat)
+_bundle_converter.register_structure_hook(datetime, lambda d, _: datetime.fromisoformat(d))
+for _entity_type in (ExternalConfig, ExternalDefaultConfig, ExternalOutcome):
+    _bundle_converter.register_unstructure_hook(_entity_type, _unstructure_external_entity)
+    _bundle_converter.register_structure_hook(_entity_type, _structure_external_entity)
+
+
+def _resolve_config(
+    experiment: Experiment, external_configs: ExternalConfigCollection
+) -> Optional[AnalysisConfiguration]:
+    """Resolve the configuration of an experiment; None if it can't be resolved."""
+    assert experiment.normandy_slug is not None  # for mypy
+    try:
+        spec = AnalysisSpec.default_for_experiment(experiment)
+        if external_spec := external_configs.spec_for_experiment(experiment.normandy_slug):
+            spec.merge(external_spec)
+        return spec.resolve(experiment, external_configs)
+    except Exception as e:
+        logger.exception(
+            f"Error while resolving config: {e}",
+            exc_info=e,
+            extra={"experiment": experiment.normandy_slug},
+        )
+        return None
+
+
+@attr.s(auto_attribs=True, eq=False)
+class _LazyConfigs(Mapping[str, AnalysisConfiguration]):
+    """
+    Configurations of the bundled experiments that get resolved on first lookup.
+
+    Processes of Argo workflows analyse a single experiment, so they only resolve
+    the configuration of that experiment. Configurations that can't be resolved are
+    missing from the mapping.
+    """
+
+    experiments: Dict[str, Experiment]  # by normandy slug
+    external_configs: ExternalConfigCollection
+    _configs: Dict[str, Optional[AnalysisConfiguration]] = attr.ib(factory=dict, init=False)
+    _lock: threading.Lock = attr.ib(factory=threading.Lock, init=False)
+
+    def __getitem__(self, slug: str) -> AnalysisConfiguration:
+        with self._lock:
+            if slug not in self._configs:
+                self._configs[slug] = _resolve_config(self.experiments[slug], self.external_configs)
+            config = self._configs[slug]
+        if config is None:
+            raise KeyError(slug)
+        return config
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.experiments)
+
+    def __len__(self) -> int:
+        return len(self.experiments)
+
+
+@attr.s(auto_attribs=True)
+class ConfigBundle:
+    """Resolved analysis configurations along with the inputs they were resolved from."""
+
+    experiments: ExperimentCollection
+    external_configs: ExternalConfigCollection
+    configs: Mapping[str, AnalysisConfiguration]  # by normandy slug
+    created_at: datetime = attr.Factory(lambda: datetime.now(tz=pytz.utc))
+    version: int = BUNDLE_VERSION
+
+    @classmethod
+    def compile(
+        cls,
+        experiments: ExperimentCollection,
+        external_configs: ExternalConfigCollection,
+        experiment_types: Iterable[str],
+    ) -> "ConfigBundle":
+        """
+        Resolve the configurations of all launched experiments of the given types.
+
+        Experiments whose configuration can't be resolved are left out of the bundle.
+        """
+        default_config.DefaultConfigsResolver.with_external_configs(external_configs)
+
+        configs = {}
+        for experiment in experiments.ever_launched().of_type(experiment_types).experiments:
+            if experiment.normandy_slug is None:
+                continue
+            if config := _resolve_config(experiment, external_configs):
+                configs[experiment.normandy_slug] = config
+
+        return cls(experiments, external_configs, configs)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ConfigBundle"]:
+        """
+        Load a bundle from a local file or a `gs://` URI.
+
+        Configurations get resolved from the bundled experiments and external configs
+        when they are first looked up. Returns None if the bundle can't be loaded, for
+        example because it has been written by an incompatible version.
+        """
+        try:
+            bundle = json.loads(read_file(path))
+        except Exception as e:
+            logger.exception(f"Error while loading config bundle {path}: {e}", exc_info=e)
+            return None
+
+        if not isinstance(bundle, dict) or bundle.get("version") != BUNDLE_VERSION:
+            logger.error(f"Config bundle {path} has an unsupported version")
+            return None
+
+        try:
+            experiments = ExperimentCollection(
+                _bundle_converter.structure(bundle["experiments"], List[Experiment])
+            )
+            external_configs = _bundle_converter.structure(
+                bundle["external_configs"], ExternalConfigCollection
+            )
+            created_at = _bundle_converter.structure(bundle["created_at"], datetime)
+        except Exception as e:
+            logger.exception(f"Error while loading config bundle {path}: {e}", exc_info=e)
+            return None
+
+        # outcomes and defaults are looked up when resolving configs and exporting metadata
+        default_config.DefaultConfigsResolver.with_external_configs(external_configs)
+        outcomes.OutcomesResolver.with_external_configs(external_configs)
+
+        slugs = set(bundle["configs"])
+        bundled = {
+            e.normandy_slug: e
+            for e in experiments.experiments
+            if e.normandy_slug is not None and e.normandy_slug in slugs
+        }
+        configs = _LazyConfigs(bundled, external_configs)
+        return cls(experiments, external_configs, configs, created_at)
+
+    def save(self, path: str) -> None:
+        """
+        Write the bundle to a local file or a `gs://` URI.
+
+        External configs need to have been loaded along with their TOML source.
+        """
+        bundle = {
+            "version": self.version,
+            "created_at": _bundle_converter.unstructure(self.created_at),
+            "experiments": _bundle_converter.unstructure(self.experiments.experiments),
+            "external_configs": _bundle_converter.unstructure(self.external_configs),
+            "configs": sorted(self.configs),
+        }
+        write_file(path, json.dumps(bundle).encode())
@@ -30,11 +30,6 @@ class EnrollmentLongerThanAnalysisException(ValidationException):
         super().__init__(f"{normandy_slug} -> {message}")
 
 
-class HighPopulationException(ValidationException):
-    def __init__(self, normandy_slug, message="Experiment has high population."):
-        super().__init__(f"{normandy_slug} -> {message}")
-
-
 class ExplicitSkipException(ValidationException):
     def __init__(self, normandy_slug, message="Experiment is configured with skip=true."):
         super().__init__(f"{normandy_slug} -> {message}")
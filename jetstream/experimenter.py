@@ -1,16 +1,26 @@
 import datetime as dt
+import hashlib
+import json
 import logging
-from typing import Iterable, List, Optional, Union
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 import attr
 import cattr
 import pytz
 import requests
 
-from .util import retry_get
+from .util import read_file, retry_get, write_file
 
 logger = logging.getLogger(__name__)
 
+EXPERIMENTER_CACHE_DIRECTORY = os.getenv("JETSTREAM_EXPERIMENTER_CACHE_DIR")
+# experiments previously fetched from Experimenter, e.g. shared by all Argo pods of a workflow
+EXPERIMENTS_SNAPSHOT = os.getenv("JETSTREAM_EXPERIMENTS_SNAPSHOT")
+
 
 @attr.s(auto_attribs=True, kw_only=True, slots=True, frozen=True)
 class Variant:
@@ -189,10 +199,95 @@ class ExperimentV6:
         )
 
 
+@attr.s(auto_attribs=True)
+class ExperimenterCache:
+    """
+    On-disk cache of Experimenter API responses.
+
+    Cached responses are revalidated with the ETag and Last-Modified headers they
+    were served with, so unchanged responses don't get downloaded again.
+    """
+
+    directory: Path
+
+    @classmethod
+    def from_environment(cls) -> Optional["ExperimenterCache"]:
+        """Returns the cache configured through environment variables, if any."""
+        if not EXPERIMENTER_CACHE_DIRECTORY:
+            return None
+        return cls(Path(EXPERIMENTER_CACHE_DIRECTORY))
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _load(self, url: str) -> Optional[Any]:
+        try:
+            return json.loads(self._path(url).read_text())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Error while reading cached response of {url}: {e}")
+            return None
+
+    def _store(self, url: str, entry: Any) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first to not expose partially written entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(url))
+
+    def get(
+        self,
+        session: requests.Session,
+        url: str,
+        max_retries: int,
+        user_agent: Optional[str] = None,
+    ) -> Any:
+        """Returns the JSON response of `url`, served from the cache if unchanged."""
+        cached = self._load(url)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        def handle_response(response: requests.Response) -> Any:
+            if cached and response.status_code == 304:
+                return cached["body"]
+
+            response.raise_for_status()
+            body = response.json()
+            try:
+                self._store(
+                    url,
+                    {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "body": body,
+                    },
+                )
+            except OSError as e:
+                logger.warning(f"Error while caching response of {url}: {e}")
+            return body
+
+        return retry_get(session, url, max_retries, user_agent, headers or None, handle_response)
+
+
+_snapshot_converter = cattr.Converter()
+_snapshot_converter.register_unstructure_hook(dt.datetime, dt.datetime.isoformat)
+_snapshot_converter.register_structure_hook(dt.datetime, lambda d, _: dt.datetime.fromisoformat(d))
+
+
 @attr.s(auto_attribs=True)
 class ExperimentCollection:
     experiments: List[Experiment] = attr.Factory(list)
+    # positions of experiments by the value of indexed attributes; built on first lookup
+    _index: Optional[Dict[str, Dict[Any, List[int]]]] = attr.ib(
+        default=None, init=False, repr=False, eq=False
+    )
 
+    INDEXED_ATTRIBUTES = ("experimenter_slug", "normandy_slug", "type", "status")
     MAX_RETRIES = 3
     EXPERIMENTER_API_URL_V1 = "https://experimenter.services.mozilla.com/api/v1/experiments/"
 
@@ -204,10 +299,32 @@ class ExperimentCollection:
 
     @classmethod
     def from_experimenter(cls, session: requests.Session = None) -> "ExperimentCollection":
+        """
+        Fetch experiments from Experimenter.
+
+        If a snapshot of experiments has been configured, see `save_snapshot`,
+        experiments get loaded from it instead.
+        """
+        if EXPERIMENTS_SNAPSHOT:
+            try:
+                return cls.from_snapshot(EXPERIMENTS_SNAPSHOT)
+            except Exception as e:
+                logger.warning(f"Error while loading experiments from {EXPERIMENTS_SNAPSHOT}: {e}")
+
         session = session or requests.Session()
-        legacy_experiments_json = retry_get(
-            session, cls.EXPERIMENTER_API_URL_V1, cls.MAX_RETRIES, cls.USER_AGENT
-        )
+        cache = ExperimenterCache.from_environment()
+
+        def fetch(url: str) -> Any:
+            if cache:
+                return cache.get(session, url, cls.MAX_RETRIES, cls.USER_AGENT)
+            return retry_get(session, url, cls.MAX_RETRIES, cls.USER_AGENT)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            legacy_experiments_future = executor.submit(fetch, cls.EXPERIMENTER_API_URL_V1)
+            nimbus_experiments_future = executor.submit(fetch, cls.EXPERIMENTER_API_URL_V6)
+            legacy_experiments_json = legacy_experiments_future.result()
+            nimbus_experiments_json = nimbus_experiments_future.result()
+
         legacy_experiments = []
 
         for experiment in legacy_experiments_json:
@@ -217,9 +334,6 @@ class ExperimentCollection:
                 except Exception as e:
                     logger.exception(str(e), exc_info=e, extra={"experiment": experiment["slug"]})
 
-        nimbus_experiments_json = retry_get(
-            session, cls.EXPERIMENTER_API_URL_V6, cls.MAX_RETRIES, cls.USER_AGENT
-        )
         nimbus_experiments = []
 
         for experiment in nimbus_experiments_json:
@@ -230,30 +344,47 @@ class ExperimentCollection:
 
         return cls(nimbus_experiments + legacy_experiments)
 
+    @classmethod
+    def from_snapshot(cls, path: str) -> "ExperimentCollection":
+        """Load experiments from a snapshot written by `save_snapshot`."""
+        experiments = json.loads(read_file(path))
+        return cls(_snapshot_converter.structure(experiments, List[Experiment]))
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Write the experiments to a local file or a `gs://` URI.
+
+        Setting the JETSTREAM_EXPERIMENTS_SNAPSHOT environment variable to the path
+        makes `from_experimenter` load experiments from the snapshot.
+        """
+        write_file(path, json.dumps(_snapshot_converter.unstructure(self.experiments)).encode())
+
+    def _positions(self, attribute: str, values: Iterable[Any]) -> List[int]:
+        """Returns the positions of experiments with any of the values of the attribute."""
+        if self._index is None:
+            index: Dict[str, Dict[Any, List[int]]] = {a: {} for a in self.INDEXED_ATTRIBUTES}
+            for position, ex in enumerate(self.experiments):
+                for a, positions in index.items():
+                    positions.setdefault(getattr(ex, a), []).append(position)
+            self._index = index
+
+        return [p for value in values for p in self._index[attribute].get(value, [])]
+
+    def _subset(self, positions: Iterable[int]) -> "ExperimentCollection":
+        cls = type(self)
+        return cls([self.experiments[p] for p in sorted(set(positions))])
+
     def of_type(self, type_or_types: Union[str, Iterable[str]]) -> "ExperimentCollection":
         if isinstance(type_or_types, str):
             type_or_types = (type_or_types,)
-        cls = type(self)
-        return cls([ex for ex in self.experiments if ex.type in type_or_types])
+        return self._subset(self._positions("type", type_or_types))
 
     def ever_launched(self) -> "ExperimentCollection":
-        cls = type(self)
-        return cls(
-            [
-                ex
-                for ex in self.experiments
-                if ex.status in ("Complete", "Live") or ex.status is None
-            ]
-        )
+        return self._subset(self._positions("status", ("Complete", "Live", None)))
 
     def with_slug(self, slug: str) -> "ExperimentCollection":
-        cls = type(self)
-        return cls(
-            [
-                ex
-                for ex in self.experiments
-                if ex.experimenter_slug == slug or ex.normandy_slug == slug
-            ]
+        return self._subset(
+            self._positions("experimenter_slug", [slug]) + self._positions("normandy_slug", [slug])
         )
 
     def started_since(self, since: dt.datetime) -> "ExperimentCollection":
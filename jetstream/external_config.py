@@ -5,8 +5,13 @@ Experiment-specific configuration files are stored in https://github.com/mozilla
 """
 
 import datetime as dt
+import logging
+import os
+import shutil
+import tempfile
+import threading
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import attr
 import toml
@@ -18,13 +23,23 @@ import jetstream.experimenter
 from jetstream.analysis import Analysis
 from jetstream.config import PLATFORM_CONFIGS, AnalysisSpec, OutcomeSpec
 from jetstream.errors import UnexpectedKeyConfigurationException
-from jetstream.util import TemporaryDirectory
 
 from . import bq_normalize_name
 
+logger = logging.getLogger(__name__)
+
 OUTCOMES_DIR = "outcomes"
 DEFAULTS_DIR = "defaults"
 
+CONFIG_MIRROR_DIRECTORY = Path(
+    os.getenv("JETSTREAM_CONFIG_MIRROR_DIR", Path(tempfile.gettempdir()) / "jetstream-config")
+)
+
+# external configs are fetched once per process
+# collection parsed from the mirror, along with the commit it was parsed from
+_external_configs: Optional[Tuple[str, "ExternalConfigCollection"]] = None
+_external_configs_lock = threading.Lock()
+
 
 @attr.s(auto_attribs=True)
 class ExternalConfig:
@@ -33,6 +48,8 @@ class ExternalConfig:
     slug: str
     spec: AnalysisSpec
     last_modified: dt.datetime
+    # TOML the spec has been parsed from; needed to serialize the config
+    source: Optional[str] = attr.ib(default=None, eq=False, repr=False)
 
     def validate(self, experiment: jetstream.experimenter.Experiment) -> None:
         spec = AnalysisSpec.default_for_experiment(experiment)
@@ -126,6 +143,8 @@ class ExternalOutcome:
     spec: OutcomeSpec
     platform: str
     commit_hash: Optional[str]
+    # TOML the spec has been parsed from; needed to serialize the outcome
+    source: Optional[str] = attr.ib(default=None, eq=False, repr=False)
 
     def validate(self) -> None:
         if self.platform not in PLATFORM_CONFIGS:
@@ -161,25 +180,76 @@ def entity_from_path(path: Path) -> Union[ExternalConfig, ExternalOutcome, Exter
 
     validate_config_settings(path)
 
-    config_dict = toml.loads(path.read_text())
+    source = path.read_text()
+    config_dict = toml.loads(source)
 
     if is_outcome:
         platform = path.parent.name
         spec = OutcomeSpec.from_dict(config_dict)
-        return ExternalOutcome(slug=slug, spec=spec, platform=platform, commit_hash=None)
+        return ExternalOutcome(
+            slug=slug, spec=spec, platform=platform, commit_hash=None, source=source
+        )
     elif is_default_config:
         return ExternalDefaultConfig(
             slug=slug,
             spec=AnalysisSpec.from_dict(config_dict),
             last_modified=dt.datetime.fromtimestamp(path.stat().st_mtime, UTC),
+            source=source,
         )
     return ExternalConfig(
         slug=slug,
         spec=AnalysisSpec.from_dict(config_dict),
         last_modified=dt.datetime.fromtimestamp(path.stat().st_mtime, UTC),
+        source=source,
     )
 
 
+def mirror_repo(url: str, directory: Path) -> Repo:
+    """
+    Returns a local mirror of the main branch of a repository.
+
+    An existing mirror is updated by fetching only the commits it is missing. The full
+    history is kept, since the last modified dates of config files are based on it.
+    """
+    if (directory / ".git").exists():
+        try:
+            repo = Repo(directory)
+            repo.remotes.origin.fetch("main")
+            repo.git.reset("--hard", "origin/main")
+            repo.git.clean("-fdx")
+            return repo
+        except Exception as e:
+            logger.warning(f"Error while updating mirror of {url} in {directory}: {e}")
+
+    # remove leftovers of broken mirrors or interrupted clones
+    shutil.rmtree(directory, ignore_errors=True)
+    return Repo.clone_from(url, directory, branch="main")
+
+
+def _last_commits(repo: Repo, rev: str = "main") -> Dict[str, Tuple[int, str]]:
+    """
+    Returns the time and hexsha of the last commit changing each file of the repo.
+
+    Walks the history once instead of once per file.
+    """
+    last_commits: Dict[str, Tuple[int, str]] = {}
+    commit: Optional[Tuple[int, str]] = None
+
+    # paths are NUL-terminated and not quoted; every commit starts with an empty field
+    log = repo.git.log(rev, "--name-only", "-z", "--format=%x00%ct %H")
+    fields = iter(log.split("\0"))
+    for field in fields:
+        if not field:
+            if header := next(fields, None):
+                committed_date, hexsha = header.split(" ")
+                commit = (int(committed_date), hexsha)
+        elif commit:
+            # the log starts with the most recent commits
+            last_commits.setdefault(field.lstrip("\n"), commit)
+
+    return last_commits
+
+
 @attr.s(auto_attribs=True)
 class ExternalConfigCollection:
     """
@@ -195,51 +265,72 @@ class ExternalConfigCollection:
 
     @classmethod
     def from_github_repo(cls) -> "ExternalConfigCollection":
-        """Pull in external config files."""
-        # download files to tmp directory
-        with TemporaryDirectory() as tmp_dir:
-            repo = Repo.clone_from(cls.JETSTREAM_CONFIG_URL, tmp_dir)
-
-            external_configs = []
-
-            for config_file in tmp_dir.glob("*.toml"):
-                last_modified = next(repo.iter_commits("main", paths=config_file)).committed_date
-
-                external_configs.append(
-                    ExternalConfig(
-                        config_file.stem,
-                        AnalysisSpec.from_dict(toml.load(config_file)),
-                        UTC.localize(dt.datetime.utcfromtimestamp(last_modified)),
-                    )
-                )
+        """
+        Pull in external config files.
 
-            outcomes = []
+        The config repository is mirrored locally and only parsed again if the mirror
+        has new commits.
+        """
+        global _external_configs
 
-            for outcome_file in tmp_dir.glob(f"**/{OUTCOMES_DIR}/*/*.toml"):
-                commit_hash = next(repo.iter_commits("main", paths=outcome_file)).hexsha
+        with _external_configs_lock:
+            repo = mirror_repo(cls.JETSTREAM_CONFIG_URL, CONFIG_MIRROR_DIRECTORY)
+            head = repo.head.commit.hexsha
+            if _external_configs is None or _external_configs[0] != head:
+                _external_configs = (head, cls.from_repo(repo))
+            return _external_configs[1]
 
-                outcomes.append(
-                    ExternalOutcome(
-                        slug=outcome_file.stem,
-                        spec=OutcomeSpec.from_dict(toml.load(outcome_file)),
-                        platform=outcome_file.parent.name,
-                        commit_hash=commit_hash,
-                    )
+    @classmethod
+    def from_repo(cls, repo: Repo) -> "ExternalConfigCollection":
+        """Load external config files from a local clone of the config repository."""
+        assert repo.working_tree_dir is not None  # for mypy
+        repo_dir = Path(repo.working_tree_dir)
+        last_commits = _last_commits(repo)
+
+        def last_commit(path: Path) -> Tuple[int, str]:
+            return last_commits[path.relative_to(repo_dir).as_posix()]
+
+        def last_modified(path: Path) -> dt.datetime:
+            return UTC.localize(dt.datetime.utcfromtimestamp(last_commit(path)[0]))
+
+        external_configs = []
+
+        for config_file in repo_dir.glob("*.toml"):
+            source = config_file.read_text()
+            external_configs.append(
+                ExternalConfig(
+                    config_file.stem,
+                    AnalysisSpec.from_dict(toml.loads(source)),
+                    last_modified(config_file),
+                    source,
                 )
+            )
 
-            default_configs = []
-            for default_config_file in tmp_dir.glob(f"**/{DEFAULTS_DIR}/*.toml"):
-                last_modified = next(
-                    repo.iter_commits("main", paths=default_config_file)
-                ).committed_date
-
-                default_configs.append(
-                    ExternalDefaultConfig(
-                        default_config_file.stem,
-                        AnalysisSpec.from_dict(toml.load(default_config_file)),
-                        UTC.localize(dt.datetime.utcfromtimestamp(last_modified)),
-                    )
+        outcomes = []
+
+        for outcome_file in repo_dir.glob(f"**/{OUTCOMES_DIR}/*/*.toml"):
+            source = outcome_file.read_text()
+            outcomes.append(
+                ExternalOutcome(
+                    slug=outcome_file.stem,
+                    spec=OutcomeSpec.from_dict(toml.loads(source)),
+                    platform=outcome_file.parent.name,
+                    commit_hash=last_commit(outcome_file)[1],
+                    source=source,
                 )
+            )
+
+        default_configs = []
+        for default_config_file in repo_dir.glob(f"**/{DEFAULTS_DIR}/*.toml"):
+            source = default_config_file.read_text()
+            default_configs.append(
+                ExternalDefaultConfig(
+                    default_config_file.stem,
+                    AnalysisSpec.from_dict(toml.loads(source)),
+                    last_modified(default_config_file),
+                    source,
+                )
+            )
 
         return cls(external_configs, outcomes, default_configs)
 
@@ -49,6 +49,7 @@ class ExperimentMetadata:
     outcomes: Dict[str, OutcomeMetadata]
     external_config: Optional[ExternalConfigMetadata]
     analysis_start_time: Optional[dt.datetime]
+    sample_rate: Optional[float] = None
     schema_version: int = StatisticResult.SCHEMA_VERSION
 
     @classmethod
@@ -120,6 +121,7 @@ class ExperimentMetadata:
             outcomes=outcomes_metadata,
             external_config=external_config,
             analysis_start_time=analysis_start_time,
+            sample_rate=config.experiment.sample_rate,
         )
 
 
@@ -23,6 +23,8 @@ class Metric:
     analysis_bases: List[mozanalysis.experiment.AnalysisBasis] = [
         mozanalysis.experiment.AnalysisBasis.ENROLLMENTS
     ]
+    # whether metric values may be loaded as 32 bit floats for computing statistics
+    single_precision: bool = False
 
     def __attrs_post_init__(self):
         # Print warning if exposures is used
@@ -47,6 +49,7 @@ class Metric:
         analysis_bases: Optional[List[mozanalysis.experiment.AnalysisBasis]] = [
             mozanalysis.experiment.AnalysisBasis.ENROLLMENTS
         ],
+        single_precision: bool = False,
     ) -> "Metric":
         return cls(
             name=mozanalysis_metric.name,
@@ -56,4 +59,5 @@ class Metric:
             description=mozanalysis_metric.description,
             bigger_is_better=mozanalysis_metric.bigger_is_better,
             analysis_bases=analysis_bases or [mozanalysis.experiment.AnalysisBasis.ENROLLMENTS],
+            single_precision=single_precision,
         )
@@ -1,11 +1,29 @@
 import re
-from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from abc import ABC
+from typing import Any, Dict, Iterable, Optional
 
 import attr
 import numpy as np
-import pandas as pd
-from pandas import DataFrame
+from pandas import DataFrame, Series
+from pandas.api.types import is_float_dtype
+
+
+def _column_values(series: Series) -> np.ndarray:
+    """
+    Returns a copy of the values of a metric column as floats, with NaN for nulls.
+
+    Floating columns keep their precision; other columns are converted to float64.
+    """
+    dtype = getattr(series.dtype, "numpy_dtype", series.dtype)
+    if not is_float_dtype(dtype):
+        dtype = np.float64
+    return np.array(series.to_numpy(dtype=dtype, na_value=np.nan))
+
+
+def _quantile(values: np.ndarray, q: float) -> float:
+    """Returns the quantile of the values that aren't null, like `Series.quantile`."""
+    values = values[~np.isnan(values)]
+    return np.quantile(values, q) if len(values) else np.nan
 
 
 @attr.s(auto_attribs=True)
@@ -20,13 +38,33 @@ class PreTreatment(ABC):
         """Return snake-cased name of the statistic."""
         return re.sub(r"(?<!^)(?=[A-Z])", "_", cls.__name__).lower()
 
-    @abstractmethod
+    def mask(self, values: np.ndarray, keep: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Returns which rows to keep given the metric values of all rows and the rows
+        kept by previous pre-treatments, or None if the pre-treatment keeps all rows.
+        """
+        return None
+
+    def transform(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Returns the transformed metric values, or None if the pre-treatment doesn't
+        change values. The values may be transformed in-place.
+        """
+        return None
+
     def apply(self, df: DataFrame, col: str) -> DataFrame:
         """
         Applies the pre-treatment transformation to a DataFrame and returns
         the resulting DataFrame.
         """
-        raise NotImplementedError
+        values = _column_values(df[col])
+        keep = self.mask(values, np.ones(len(values), dtype=bool))
+        transformed = self.transform(values)
+        if keep is not None:
+            df = df.loc[keep, :]
+        if transformed is not None:
+            df = df.assign(**{col: transformed if keep is None else transformed[keep]})
+        return df
 
     @classmethod
     def from_dict(cls, config_dict: Dict[str, Any]):
@@ -37,16 +75,15 @@ class PreTreatment(ABC):
 class RemoveNulls(PreTreatment):
     """Removes rows with null values."""
 
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
-        return df.dropna(subset=[col])
+    def mask(self, values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        return ~np.isnan(values)
 
 
 class RemoveIndefinites(PreTreatment):
     """Removes null and infinite values."""
 
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
-        with pd.option_context("mode.use_inf_as_na", True):
-            return df.dropna(subset=[col])
+    def mask(self, values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        return np.isfinite(values)
 
 
 @attr.s(auto_attribs=True)
@@ -55,9 +92,8 @@ class CensorHighestValues(PreTreatment):
 
     fraction: float = 1 - 1e-5
 
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
-        mask = df[col] < df[col].quantile(self.fraction)
-        return df.loc[mask, :]
+    def mask(self, values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        return values < _quantile(values[keep], self.fraction)
 
 
 @attr.s(auto_attribs=True)
@@ -66,9 +102,8 @@ class CensorLowestValues(PreTreatment):
 
     fraction: float = 1e-5
 
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
-        mask = df[col] > df[col].quantile(self.fraction)
-        return df.loc[mask, :]
+    def mask(self, values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        return values > _quantile(values[keep], self.fraction)
 
 
 @attr.s(auto_attribs=True)
@@ -77,9 +112,8 @@ class CensorValuesBelowThreshold(PreTreatment):
 
     threshold: float
 
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
-        mask = df[col] > self.threshold
-        return df.loc[mask, :]
+    def mask(self, values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        return values > self.threshold
 
 
 @attr.s(auto_attribs=True)
@@ -88,24 +122,56 @@ class CensorValuesAboveThreshold(PreTreatment):
 
     threshold: float
 
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
-        mask = df[col] < self.threshold
-        return df.loc[mask, :]
+    def mask(self, values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        return values < self.threshold
 
 
 @attr.s(auto_attribs=True)
 class Log(PreTreatment):
     base: Optional[float] = 10.0
 
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
+    def transform(self, values: np.ndarray) -> np.ndarray:
         # Silence divide-by-zero and domain warnings
         with np.errstate(divide="ignore", invalid="ignore"):
-            result = np.log(df[col])
+            np.log(values, out=values)
             if self.base:
-                result /= np.log(self.base)
-        return df.assign(**{col: result})
+                values /= np.log(self.base)
+        return values
 
 
 class ZeroFill(PreTreatment):
-    def apply(self, df: DataFrame, col: str) -> DataFrame:
-        return df.fillna(value={col: 0})
+    def transform(self, values: np.ndarray) -> Optional[np.ndarray]:
+        nulls = np.isnan(values)
+        if not nulls.any():
+            return None
+        values[nulls] = 0
+        return values
+
+
+def apply_pre_treatments(
+    pre_treatments: Iterable[PreTreatment], df: DataFrame, col: str
+) -> DataFrame:
+    """
+    Applies pre-treatments in order to a metric column and returns the `branch`
+    and treated metric columns of the remaining rows.
+
+    Rather than every pre-treatment copying the DataFrame, the metric values are
+    treated as a single array, the rows to remove are combined into a single mask
+    and the remaining rows are selected once.
+    """
+    pre_treatments = list(pre_treatments)
+    if not pre_treatments:
+        return df[["branch", col]]
+
+    values = _column_values(df[col])
+    keep = np.ones(len(values), dtype=bool)
+    for pre_treatment in pre_treatments:
+        mask = pre_treatment.mask(values, keep)
+        if mask is not None:
+            keep &= mask
+        transformed = pre_treatment.transform(values)
+        if transformed is not None:
+            values = transformed
+
+    branch = df["branch"][keep]
+    return DataFrame({"branch": branch, col: values[keep]}, index=branch.index)
@@ -1,33 +1,57 @@
 import logging
 import math
 import numbers
+import os
 import re
 from abc import ABC, abstractmethod
+from collections import Counter
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
 
 import attr
-import cattr
-import mozanalysis.bayesian_stats.bayesian_bootstrap
+import mozanalysis.bayesian_stats
 import mozanalysis.bayesian_stats.binary
-import mozanalysis.frequentist_stats.bootstrap
 import mozanalysis.metrics
 import numpy as np
+import pyarrow as pa
 import statsmodels.api as sm
 from google.cloud import bigquery
 from mozanalysis.experiment import AnalysisBasis
 from pandas import DataFrame, Series
-from statsmodels.distributions.empirical_distribution import ECDF
 
 from .errors import StatisticComputationException
 from .metric import Metric
-from .pre_treatment import PreTreatment
+from .pre_treatment import (
+    CensorHighestValues,
+    CensorLowestValues,
+    PreTreatment,
+    RemoveIndefinites,
+    RemoveNulls,
+    ZeroFill,
+    apply_pre_treatments,
+)
 
 if TYPE_CHECKING:
     import jetstream.config as config
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for the memory used by a block of bootstrap resamples, in bytes.
+BOOTSTRAP_MEMORY_BYTES = int(os.getenv("JETSTREAM_BOOTSTRAP_MEMORY_MB", 256)) * 1024**2
+# Bootstrap statistics resample the counts of distinct values rather than single
+# values if there are at most this many distinct values per value.
+LOW_CARDINALITY_RATIO = 0.05
+
 
 def _maybe_decimal(value) -> Optional[Decimal]:
     if value is None:
@@ -49,11 +73,70 @@ class Summary:
         experiment: "config.ExperimentConfiguration",
     ) -> "StatisticResultCollection":
         """Apply the statistic transformation for data related to the specified metric."""
-        for pre_treatment in self.pre_treatments:
-            data = pre_treatment.apply(data, self.metric.name)
+        if self.metric.name in data:
+            data = apply_pre_treatments(self.pre_treatments, data, self.metric.name)
 
         return self.statistic.apply(data, self.metric.name, experiment)
 
+    def run_aggregates(
+        self,
+        aggregates: DataFrame,
+        experiment: "config.ExperimentConfiguration",
+    ) -> "StatisticResultCollection":
+        """
+        Apply the statistic transformation to per-branch aggregates of the metric.
+
+        Pre-treatments are expected to have been applied when computing the aggregates.
+        """
+        return self.statistic.apply_aggregates(aggregates, self.metric.name, experiment)
+
+    def supports_streaming(self) -> bool:
+        """
+        Whether the summary can be computed incrementally on batches of per-client data,
+        see `jetstream.streaming`.
+        """
+        return (
+            isinstance(self.statistic, (BootstrapMean, Binomial, Count))
+            or self.supports_value_counts()
+        ) and not any(
+            isinstance(pre_treatment, (CensorHighestValues, CensorLowestValues))
+            for pre_treatment in self.pre_treatments
+        )
+
+    def supports_value_counts(self) -> bool:
+        """
+        Whether the summary can be computed from the distinct metric values of each
+        branch and how often they occur, such as the buckets of a `QuantileSketch`.
+        """
+        return isinstance(self.statistic, (Deciles, EmpiricalCDF, PoissonBootstrapDeciles))
+
+    def supports_sorted_values(self) -> bool:
+        """
+        Whether the summary can be computed from the sorted metric values of each
+        branch, see `TreatedColumnCache`.
+        """
+        return isinstance(
+            self.statistic,
+            (Deciles, EmpiricalCDF, KernelDensityEstimate, PoissonBootstrapDeciles),
+        )
+
+    def supports_partitions(self) -> bool:
+        """
+        Whether the bootstrap of the summary can be split into partitions that are
+        resampled independently, see `PoissonBootstrapMean`.
+        """
+        return isinstance(self.statistic, (PoissonBootstrapMean, PoissonBootstrapDeciles))
+
+    def supports_aggregates(self) -> bool:
+        """
+        Whether the summary can be computed from per-branch aggregates instead of
+        per-client data, see `Statistic.apply_aggregates`.
+        """
+        return isinstance(self.statistic, (Binomial, Count)) and all(
+            isinstance(pre_treatment, (RemoveNulls, RemoveIndefinites, ZeroFill))
+            for pre_treatment in self.pre_treatments
+        )
+
 
 @attr.s(auto_attribs=True, kw_only=True)
 class StatisticResult:
@@ -62,7 +145,7 @@ class StatisticResult:
     to metric data.
     """
 
-    SCHEMA_VERSION = 4
+    SCHEMA_VERSION = 5
 
     metric: str
     statistic: str
@@ -76,9 +159,10 @@ class StatisticResult:
     upper: Optional[float] = None
     segment: Optional[str] = None
     analysis_basis: Optional[str] = None
+    sample_rate: Optional[float] = None
 
     def __attrs_post_init__(self):
-        for k in ("ci_width", "point", "lower", "upper"):
+        for k in ("ci_width", "point", "lower", "upper", "sample_rate"):
             v = getattr(self, k)
             if v is None:
                 continue
@@ -98,40 +182,165 @@ class StatisticResult:
         bigquery.SchemaField("upper", "FLOAT64"),
         bigquery.SchemaField("segment", "STRING"),
         bigquery.SchemaField("analysis_basis", "STRING"),
+        bigquery.SchemaField("sample_rate", "FLOAT64"),
     )
 
 
-@attr.s(auto_attribs=True)
+def _normalize_decimal(value: float) -> str:
+    return str(round(Decimal(value), 6).normalize())
+
+
+def _numeric_column(name: str, values: Any, length: int) -> np.ndarray:
+    """Returns the values of a numeric field as floats, with NaN for missing values."""
+    array = np.asarray(values)
+    if array.dtype.kind not in "biuf":
+        for v in array.ravel():
+            if v is not None and not isinstance(v, numbers.Number):
+                raise ValueError(f"Expected a number for {name}; got {repr(v)}")
+        array = np.array([np.nan if v is None else float(v) for v in array.ravel()]).reshape(
+            array.shape
+        )
+    return np.broadcast_to(array.astype(float), (length,)).copy()
+
+
+def _string_column(values: Any, length: int) -> np.ndarray:
+    array = np.empty(length, dtype=object)
+    array[:] = values if np.ndim(values) else [values] * length
+    return array
+
+
+def _column(name: str, values: Any, length: int) -> np.ndarray:
+    """Returns the values of a `StatisticResult` field as an array of `length` values."""
+    if name in StatisticResultCollection.NUMERIC_FIELDS:
+        return _numeric_column(name, values, length)
+    return _string_column(values, length)
+
+
 class StatisticResultCollection:
     """
     Represents a set of statistics result data.
+
+    Results are stored column-wise, as an array per field of `StatisticResult`:
+    numeric fields as floats with NaN for missing values and string fields as object
+    arrays. `data` provides `StatisticResult` views of the rows.
     """
 
-    data: List[StatisticResult] = attr.Factory(list)
+    FIELDS = tuple(field.name for field in attr.fields(StatisticResult))
+    NUMERIC_FIELDS = ("parameter", "ci_width", "point", "lower", "upper", "sample_rate")
 
-    converter = cattr.Converter()
-    _normalize_decimal: Callable[[Decimal], str] = lambda x: str(round(x, 6).normalize())
-    converter.register_unstructure_hook(Decimal, _normalize_decimal)
-    _suppress_infinites: Callable[[float], Optional[float]] = (
-        lambda x: x if math.isfinite(x) else None
-    )
-    converter.register_unstructure_hook(float, _suppress_infinites)
+    columns: Dict[str, np.ndarray]
+
+    def __init__(self, data: Iterable[StatisticResult] = ()):
+        self.data = list(data)
+
+    @classmethod
+    def from_columns(cls, **columns: Any) -> "StatisticResultCollection":
+        """
+        Build a collection from arrays of field values.
+
+        Scalar values are repeated for all results; fields that aren't given are empty.
+        """
+        unknown = set(columns) - set(cls.FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown fields {', '.join(sorted(unknown))}")
+
+        lengths = {len(values) for values in columns.values() if np.ndim(values)}
+        if len(lengths) > 1:
+            raise ValueError("Columns have different lengths")
+        length = lengths.pop() if lengths else 1
+
+        collection = cls()
+        collection.columns = {name: _column(name, columns.get(name), length) for name in cls.FIELDS}
+        return collection
+
+    @classmethod
+    def concat(
+        cls, collections: Iterable["StatisticResultCollection"]
+    ) -> "StatisticResultCollection":
+        """Concatenate the results of several collections."""
+        collections = list(collections)
+        result = cls()
+        if collections:
+            result.columns = {
+                name: np.concatenate([c.columns[name] for c in collections]) for name in cls.FIELDS
+            }
+        return result
+
+    def extend(self, other: "StatisticResultCollection") -> "StatisticResultCollection":
+        """Appends the results of another collection in-place."""
+        self.columns = {
+            name: np.concatenate([self.columns[name], other.columns[name]]) for name in self.FIELDS
+        }
+        return self
+
+    def __len__(self) -> int:
+        return len(self.columns["metric"])
+
+    @property
+    def data(self) -> List[StatisticResult]:
+        """Return statistic results as `StatisticResult` rows."""
+        rows = []
+        for row in zip(*(self.columns[name].tolist() for name in self.FIELDS)):
+            fields: Dict[str, Any] = {
+                name: None if name in self.NUMERIC_FIELDS and math.isnan(value) else value
+                for name, value in zip(self.FIELDS, row)
+            }
+            rows.append(StatisticResult(**fields))
+        return rows
+
+    @data.setter
+    def data(self, data: List[StatisticResult]) -> None:
+        self.columns = {
+            name: _column(name, [getattr(r, name) for r in data], len(data)) for name in self.FIELDS
+        }
+
+    def _values(self, name: str) -> List[Any]:
+        """Returns the values of a field in their exported representation."""
+        values = self.columns[name].tolist()
+        if name == "parameter":
+            return [None if math.isnan(v) else _normalize_decimal(v) for v in values]
+        if name in self.NUMERIC_FIELDS:
+            return [v if math.isfinite(v) else None for v in values]
+        return values
 
     def to_dict(self) -> Dict[str, Any]:
         """Return statistic results as dict."""
-        return self.converter.unstructure(self)
+        columns = [self._values(name) for name in self.FIELDS]
+        return {"data": [dict(zip(self.FIELDS, row)) for row in zip(*columns)]}
+
+    def to_arrow(self) -> pa.Table:
+        """Return statistic results as Arrow table matching `StatisticResult.bq_schema`."""
+        arrays = []
+        for field in StatisticResult.bq_schema:
+            column = self.columns[field.name]
+            if field.name == "parameter":
+                arrays.append(
+                    pa.array(
+                        [None if math.isnan(v) else round(Decimal(v), 6) for v in column.tolist()],
+                        type=pa.decimal128(38, 9),
+                    )
+                )
+            elif field.name in self.NUMERIC_FIELDS:
+                arrays.append(pa.array(column, mask=~np.isfinite(column), type=pa.float64()))
+            else:
+                arrays.append(pa.array(column, type=pa.string(), from_pandas=True))
+        return pa.Table.from_arrays(arrays, names=[f.name for f in StatisticResult.bq_schema])
+
+    def _set(self, name: str, value: Any) -> "StatisticResultCollection":
+        self.columns[name] = _column(name, value, len(self))
+        return self
 
     def set_segment(self, segment: str) -> "StatisticResultCollection":
         """Sets the `segment` field in-place on all children."""
-        for result in self.data:
-            result.segment = segment
-        return self
+        return self._set("segment", segment)
 
     def set_analysis_basis(self, analysis_basis: AnalysisBasis) -> "StatisticResultCollection":
         """Sets the `analysis_basis` field in-place on all children."""
-        for result in self.data:
-            result.analysis_basis = analysis_basis.value
-        return self
+        return self._set("analysis_basis", analysis_basis.value)
+
+    def set_sample_rate(self, sample_rate: Optional[float]) -> "StatisticResultCollection":
+        """Sets the `sample_rate` field in-place on all children."""
+        return self._set("sample_rate", sample_rate)
 
 
 @attr.s(auto_attribs=True)
@@ -160,41 +369,128 @@ class Statistic(ABC):
         """
         Run statistic on data provided by a DataFrame and return a collection
         of statistic results.
+
+        Bootstrap statistics resample every branch once and compare the samples to
+        every reference branch, see `apply_samples`.
         """
 
         statistic_result_collection = StatisticResultCollection([])
 
         if metric in df:
-            branch_list = df.branch.unique()
-            reference_branch = experiment.reference_branch
-            if reference_branch and reference_branch not in branch_list:
-                logger.warning(
-                    f"Branch {reference_branch} not in {branch_list} for {self.name()}.",
-                    extra={"experiment": experiment.normandy_slug},
+            try:
+                samples = self.bootstrap(df, metric)
+            except Exception as e:
+                self._log_exception(metric, e, experiment)
+                return statistic_result_collection
+            if samples is not None:
+                return self.apply_samples(samples, metric, experiment)
+
+            ref_branch_list = self._reference_branches(df.branch.unique(), experiment)
+
+            for ref_branch in ref_branch_list:
+                try:
+                    statistic_result_collection.extend(
+                        self.transform(df, metric, ref_branch, experiment)
+                    )
+                except Exception as e:
+                    self._log_exception(metric, e, experiment)
+
+                df = df[df.branch != ref_branch]
+
+        return statistic_result_collection
+
+    def _reference_branches(
+        self, branch_list: np.ndarray, experiment: "config.ExperimentConfiguration"
+    ) -> List[str]:
+        """
+        Return the branches that results get compared against, in order.
+
+        If the experiment has no reference branch, every branch is used as reference
+        for the branches following it.
+        """
+        reference_branch = experiment.reference_branch
+        if reference_branch and reference_branch not in branch_list:
+            logger.warning(
+                f"Branch {reference_branch} not in {branch_list} for {self.name()}.",
+                extra={"experiment": experiment.normandy_slug},
+            )
+            return []
+
+        if reference_branch is None:
+            return list(branch_list)
+        return [reference_branch]
+
+    def _log_exception(
+        self, metric: str, e: Exception, experiment: "config.ExperimentConfiguration"
+    ) -> None:
+        logger.exception(
+            f"Error while computing statistic {self.name()} " + f"for metric {metric}: {e}",
+            exc_info=StatisticComputationException(
+                f"Error while computing statistic {self.name()} " + f"for metric {metric}: {e}"
+            ),
+            extra={"experiment": experiment.normandy_slug},
+        )
+
+    def apply_aggregates(
+        self,
+        aggregates: DataFrame,
+        metric: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> "StatisticResultCollection":
+        """
+        Run statistic on per-branch aggregates, indexed by branch and with
+        `num_enrollments` and `num_conversions` columns. An optional `num_invalid`
+        column counts clients whose value isn't 0 or 1.
+
+        Only implemented by statistics that can be computed from these sufficient statistics.
+        """
+        statistic_result_collection = StatisticResultCollection([])
+        ref_branch_list = self._reference_branches(aggregates.index.unique(), experiment)
+
+        for ref_branch in ref_branch_list:
+            try:
+                statistic_result_collection.extend(
+                    self.transform_aggregates(aggregates, metric, ref_branch, experiment)
                 )
-            else:
-                if reference_branch is None:
-                    ref_branch_list = branch_list
-                else:
-                    ref_branch_list = [reference_branch]
-
-                for ref_branch in ref_branch_list:
-                    try:
-                        statistic_result_collection.data += self.transform(
-                            df, metric, ref_branch, experiment
-                        ).data
-                    except Exception as e:
-                        logger.exception(
-                            f"Error while computing statistic {self.name()} "
-                            + f"for metric {metric}: {e}",
-                            exc_info=StatisticComputationException(
-                                f"Error while computing statistic {self.name()} "
-                                + f"for metric {metric}: {e}"
-                            ),
-                            extra={"experiment": experiment.normandy_slug},
-                        )
-
-                    df = df[df.branch != ref_branch]
+            except Exception as e:
+                self._log_exception(metric, e, experiment)
+
+            aggregates = aggregates.drop(ref_branch)
+
+        return statistic_result_collection
+
+    def apply_sorted(
+        self,
+        sorted_values: Dict[str, np.ndarray],
+        metric: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> "StatisticResultCollection":
+        """
+        Run statistic on the sorted metric values of each branch, see `TreatedColumnCache`.
+
+        Only implemented by statistics describing the distribution of metrics.
+        """
+        statistic_result_collection = StatisticResultCollection([])
+        try:
+            samples = self.bootstrap_sorted(sorted_values)
+        except Exception as e:
+            self._log_exception(metric, e, experiment)
+            return statistic_result_collection
+        if samples is not None:
+            return self.apply_samples(samples, metric, experiment)
+
+        sorted_values = dict(sorted_values)
+        ref_branch_list = self._reference_branches(np.array(list(sorted_values)), experiment)
+
+        for ref_branch in ref_branch_list:
+            try:
+                statistic_result_collection.extend(
+                    self.transform_sorted(sorted_values, metric, ref_branch, experiment)
+                )
+            except Exception as e:
+                self._log_exception(metric, e, experiment)
+
+            sorted_values.pop(ref_branch)
 
         return statistic_result_collection
 
@@ -208,33 +504,107 @@ class Statistic(ABC):
     ) -> "StatisticResultCollection":
         return NotImplemented
 
+    def transform_aggregates(
+        self,
+        aggregates: DataFrame,
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> "StatisticResultCollection":
+        raise NotImplementedError(f"{self.name()} can't be computed from aggregates")
+
+    def transform_sorted(
+        self,
+        sorted_values: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> "StatisticResultCollection":
+        raise NotImplementedError(f"{self.name()} can't be computed from sorted values")
+
+    def bootstrap(
+        self, df: DataFrame, metric: str, seed: Optional[int] = None
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns the bootstrap samples of each branch, or None if the statistic isn't
+        computed by bootstrapping.
+        """
+        return None
+
+    def bootstrap_sorted(
+        self, sorted_values: Dict[str, np.ndarray], seed: Optional[int] = None
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns the bootstrap samples of each branch from its sorted metric values, or
+        None if the statistic isn't computed by bootstrapping them.
+        """
+        return None
+
+    def apply_samples(
+        self,
+        samples: Dict[str, np.ndarray],
+        metric: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> "StatisticResultCollection":
+        """
+        Summarize the bootstrap samples of each branch, comparing them to every
+        reference branch without resampling.
+
+        Only implemented by bootstrap statistics.
+        """
+        statistic_result_collection = StatisticResultCollection([])
+        samples = dict(samples)
+        ref_branch_list = self._reference_branches(np.array(list(samples)), experiment)
+
+        for ref_branch in ref_branch_list:
+            try:
+                statistic_result_collection.extend(self._summarize(samples, metric, ref_branch))
+            except Exception as e:
+                self._log_exception(metric, e, experiment)
+
+            samples.pop(ref_branch)
+
+        return statistic_result_collection
+
+    def _summarize(
+        self,
+        samples: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+    ) -> "StatisticResultCollection":
+        raise NotImplementedError(f"{self.name()} isn't a bootstrap statistic")
+
+    def _transform_samples(
+        self,
+        samples: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+    ) -> "StatisticResultCollection":
+        if reference_branch not in samples:
+            raise ValueError(f"Branch label '{reference_branch}' not in branch list")
+        return self._summarize(samples, metric, reference_branch)
+
+    def prepare(self, df: DataFrame, metric: str) -> Any:
+        raise NotImplementedError(f"{self.name()} can't be resampled in partitions")
+
+    def resample_partition(
+        self,
+        prepared: Any,
+        partition: int,
+        num_partitions: int,
+        seed: np.random.SeedSequence,
+    ) -> Any:
+        raise NotImplementedError(f"{self.name()} can't be resampled in partitions")
+
+    def merge(self, partials: List[Any]) -> Dict[str, np.ndarray]:
+        raise NotImplementedError(f"{self.name()} can't be resampled in partitions")
+
     @classmethod
     def from_dict(cls, config_dict: Dict[str, Any]):
         """Create a class instance with the specified config parameters."""
         return cls(**config_dict)  # type: ignore
 
 
-def _extract_ci(
-    series: Series, quantile: float, threshold: float = 1e-5
-) -> Tuple[Optional[float], Optional[float]]:
-    # floating point arithmetic was a mistake
-    lower_index, upper_index = None, None
-    low_quantile, high_quantile = quantile, 1 - quantile
-    for i in series.index:
-        try:
-            f = float(i)
-        except ValueError:
-            continue
-        if abs(f - low_quantile) < threshold:
-            lower_index = i
-        if abs(f - high_quantile) < threshold:
-            upper_index = i
-    return (
-        series[lower_index] if lower_index else None,
-        series[upper_index] if upper_index else None,
-    )
-
-
 def flatten_simple_compare_branches_result(
     *,
     ma_result: dict,
@@ -244,9 +614,11 @@ def flatten_simple_compare_branches_result(
     ci_width: float,
 ) -> StatisticResultCollection:
     critical_point = (1 - ci_width) / 2
+    # mozanalysis labels summaries by the string representation of the quantiles
+    lower_label, upper_label = str(critical_point), str(1 - critical_point)
     statlist = []
     for branch, branch_result in ma_result["individual"].items():
-        lower, upper = _extract_ci(branch_result, critical_point)
+        lower, upper = branch_result[lower_label], branch_result[upper_label]
         statlist.append(
             StatisticResult(
                 metric=metric_name,
@@ -261,7 +633,8 @@ def flatten_simple_compare_branches_result(
         )
 
     for branch, branch_result in ma_result["comparative"].items():
-        lower_abs, upper_abs = _extract_ci(branch_result["abs_uplift"], critical_point)
+        abs_uplift = branch_result["abs_uplift"]
+        lower_abs, upper_abs = abs_uplift[lower_label], abs_uplift[upper_label]
         statlist.append(
             StatisticResult(
                 metric=metric_name,
@@ -271,13 +644,14 @@ def flatten_simple_compare_branches_result(
                 comparison="difference",
                 comparison_to_branch=reference_branch,
                 ci_width=ci_width,
-                point=branch_result["abs_uplift"]["exp"],
+                point=abs_uplift["exp"],
                 lower=lower_abs,
                 upper=upper_abs,
             )
         )
 
-        lower_rel, upper_rel = _extract_ci(branch_result["rel_uplift"], critical_point)
+        rel_uplift = branch_result["rel_uplift"]
+        lower_rel, upper_rel = rel_uplift[lower_label], rel_uplift[upper_label]
         statlist.append(
             StatisticResult(
                 metric=metric_name,
@@ -287,7 +661,7 @@ def flatten_simple_compare_branches_result(
                 comparison="relative_uplift",
                 comparison_to_branch=reference_branch,
                 ci_width=ci_width,
-                point=branch_result["rel_uplift"]["exp"],
+                point=rel_uplift["exp"],
                 lower=lower_rel,
                 upper=upper_rel,
             )
@@ -296,57 +670,451 @@ def flatten_simple_compare_branches_result(
     return StatisticResultCollection(statlist)
 
 
+def _sample_blocks(num_samples: int, bytes_per_sample: int) -> Iterator[slice]:
+    """
+    Splits bootstrap resamples into blocks that are computed at once.
+
+    `bytes_per_sample` is the size of the temporary arrays needed per resample;
+    blocks are sized to use at most `BOOTSTRAP_MEMORY_BYTES`, so the peak memory
+    usage of a bootstrap doesn't depend on the number of resamples.
+    """
+    block_size = max(1, min(num_samples, BOOTSTRAP_MEMORY_BYTES // max(1, bytes_per_sample)))
+    for start in range(0, num_samples, block_size):
+        yield slice(start, min(start + block_size, num_samples))
+
+
+def _resample_means(
+    branches: np.ndarray,
+    columns: List[Tuple[np.ndarray, np.ndarray, Optional[float]]],
+    num_samples: int,
+    rng: np.random.Generator,
+) -> Dict[str, np.ndarray]:
+    """
+    Bayesian bootstrap of the means of several metric columns.
+
+    `branches` holds the branch of every row. Each column is given as the row
+    positions it has values for, the values and an optional threshold quantile
+    above which values of a branch are discarded.
+
+    The resampling weights of a branch are drawn once as independent Exp(1) variates
+    and shared by all columns: normalizing them over the rows a column keeps yields
+    Dirichlet(1, ..., 1) weights over exactly those rows, so the resampled means of
+    all columns are evaluated with matrix products. The weights are drawn in blocks
+    of samples and rows that use at most `BOOTSTRAP_MEMORY_BYTES`.
+
+    Columns with few distinct values are resampled on their own: summing the
+    Dirichlet weights of the rows with the same value yields Dirichlet weights over
+    the distinct values with their counts as parameters, which are drawn directly.
+
+    Returns a `num_samples` x `len(columns)` array of resampled means per branch.
+    """
+    result = {}
+    for branch in np.unique(branches):
+        branch_rows = np.flatnonzero(branches == branch)
+        n = len(branch_rows)
+        samples = np.empty((num_samples, len(columns)))
+
+        dense = []
+        for j, (positions, column_values, threshold_quantile) in enumerate(columns):
+            in_branch = branches[positions] == branch
+            rows = np.searchsorted(branch_rows, positions[in_branch])
+            branch_values = column_values[in_branch]
+            if len(branch_values) == 0:
+                raise ValueError(f"No data for branch {branch}")
+            if threshold_quantile:
+                keep = branch_values <= np.quantile(branch_values, threshold_quantile)
+                rows, branch_values = rows[keep], branch_values[keep]
+
+            value_counts = _value_counts(np.sort(branch_values))
+            if value_counts is None:
+                dense.append((j, rows, branch_values))
+                continue
+            distinct, counts = value_counts
+            for block in _sample_blocks(num_samples, 8 * len(counts)):
+                weights = rng.standard_gamma(counts, (block.stop - block.start, len(counts)))
+                samples[block, j] = weights @ distinct / weights.sum(axis=1)
+
+        if dense:
+            values = np.zeros((n, len(dense)))
+            kept = np.zeros((n, len(dense)))
+            for i, (_, rows, branch_values) in enumerate(dense):
+                values[rows, i] = branch_values
+                kept[rows, i] = 1
+            columns_index = [j for j, _, _ in dense]
+
+            # the weights of a block of samples are drawn for as many rows at once
+            # as fit into the memory budget
+            for block in _sample_blocks(num_samples, 8 * n):
+                size = block.stop - block.start
+                row_block_size = max(1, BOOTSTRAP_MEMORY_BYTES // (8 * size))
+                sums = np.zeros((size, len(dense)))
+                kept_totals = np.zeros((size, len(dense)))
+                for start in range(0, n, row_block_size):
+                    rows = slice(start, min(start + row_block_size, n))
+                    weights = rng.standard_exponential((size, rows.stop - start))
+                    sums += weights @ values[rows]
+                    kept_totals += weights @ kept[rows]
+                samples[block, columns_index] = sums / kept_totals
+        result[branch] = samples
+    return result
+
+
+def _threshold_quantile(drop_highest: float) -> Optional[float]:
+    threshold_quantile = 1 - drop_highest
+    if threshold_quantile and (threshold_quantile > 1 or threshold_quantile < 0.5):
+        raise ValueError("'threshold_quantile' should be close to, and <= 1")
+    return threshold_quantile or None
+
+
+def _metric_values(series: Series) -> np.ndarray:
+    values = np.array(series.to_numpy(dtype="float", na_value=np.nan))
+    if np.isnan(values).any():
+        raise ValueError("'data' contains null values")
+    return values
+
+
+def _value_counts(sorted_values: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Returns the distinct values of the sorted values and how often they occur, if
+    there are few enough distinct values for resampling their counts, see
+    `LOW_CARDINALITY_RATIO`.
+    """
+    starts = np.flatnonzero(np.diff(sorted_values, prepend=np.nan) != 0)
+    if len(starts) > LOW_CARDINALITY_RATIO * len(sorted_values):
+        return None
+    return sorted_values[starts], np.diff(starts, append=len(sorted_values))
+
+
+def _sorted_branch_values(df: DataFrame, metric: str) -> Dict[str, np.ndarray]:
+    """Returns the sorted metric values of each branch."""
+    values = _metric_values(df[metric])
+    branches = df.branch.to_numpy()
+    return {branch: np.sort(values[branches == branch]) for branch in df.branch.unique()}
+
+
+def _treatment_key(summary: Summary) -> Tuple[str, str]:
+    return summary.metric.name, repr(summary.pre_treatments)
+
+
+@attr.s(auto_attribs=True)
+class TreatedColumnCache:
+    """
+    Pre-treated metric columns of one segment, shared by the summaries of a metric
+    with the same pre-treatments so these only get applied once. Summaries describing
+    the distribution of a metric also share the sorted values of each branch.
+
+    Entries are evicted once all `summaries` using them are marked as done.
+    """
+
+    data: DataFrame
+    summaries: List[Summary]
+    _columns: Dict[Tuple[str, str], DataFrame] = attr.Factory(dict)
+    _sorted_values: Dict[Tuple[str, str], Dict[str, np.ndarray]] = attr.Factory(dict)
+    _pending: Counter = attr.Factory(
+        lambda self: Counter(map(_treatment_key, self.summaries)), takes_self=True
+    )
+
+    def get(self, summary: Summary) -> DataFrame:
+        """Returns the `branch` and pre-treated metric columns of the summary."""
+        key = _treatment_key(summary)
+        if key not in self._columns:
+            self._columns[key] = apply_pre_treatments(
+                summary.pre_treatments, self.data, summary.metric.name
+            )
+        return self._columns[key]
+
+    def sorted_values(self, summary: Summary) -> Dict[str, np.ndarray]:
+        """Returns the sorted pre-treated metric values of each branch."""
+        key = _treatment_key(summary)
+        if key not in self._sorted_values:
+            self._sorted_values[key] = _sorted_branch_values(self.get(summary), key[0])
+        return self._sorted_values[key]
+
+    def done(self, summary: Summary) -> None:
+        """Marks a summary as computed, evicting entries no other summary uses."""
+        key = _treatment_key(summary)
+        self._pending[key] -= 1
+        if self._pending[key] <= 0:
+            self._columns.pop(key, None)
+            self._sorted_values.pop(key, None)
+
+
+def _summarize_samples(
+    samples: Dict[str, np.ndarray],
+    metric: str,
+    statistic_name: str,
+    reference_branch: str,
+    confidence_interval: float,
+    parameters: Optional[np.ndarray] = None,
+) -> StatisticResultCollection:
+    """
+    Summarizes the bootstrap samples of each branch and compares them to the reference.
+
+    Samples are given as an array per branch, with a column per parameter if the
+    statistic has `parameters`. Like `mozanalysis.bayesian_stats.compare_samples`,
+    results hold the mean and the confidence interval of the samples of every branch
+    and of their absolute and relative differences to the reference; all of them
+    are computed at once on the stacked samples.
+    """
+    critical_point = (1 - confidence_interval) / 2
+    reference = samples[reference_branch]
+    branches = list(samples)
+    focus_branches = [branch for branch in branches if branch != reference_branch]
+
+    values = np.stack([samples[branch] for branch in branches])
+    # the last reference branch of experiments without a reference has nothing to
+    # be compared to, but its individual results are still reported
+    if focus_branches:
+        focus = np.stack([samples[branch] for branch in focus_branches])
+        # relative uplifts over zero are infinite or NaN and get exported as missing
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.concatenate([values, focus - reference, focus / reference - 1])
+    lower, upper = np.quantile(values, [critical_point, 1 - critical_point], axis=1)
+
+    num_parameters = 1 if parameters is None else len(parameters)
+    comparisons = (
+        [None] * len(branches)
+        + ["difference"] * len(focus_branches)
+        + ["relative_uplift"] * len(focus_branches)
+    )
+    return StatisticResultCollection.from_columns(
+        metric=metric,
+        statistic=statistic_name,
+        parameter=None if parameters is None else np.tile(parameters, len(values)),
+        branch=np.repeat(branches + focus_branches * 2, num_parameters),
+        comparison=np.repeat(np.array(comparisons, dtype=object), num_parameters),
+        comparison_to_branch=np.repeat(
+            [None if c is None else reference_branch for c in comparisons], num_parameters
+        ),
+        ci_width=confidence_interval,
+        point=values.mean(axis=1).ravel(),
+        lower=lower.ravel(),
+        upper=upper.ravel(),
+    )
+
+
 @attr.s(auto_attribs=True)
 class BootstrapMean(Statistic):
     num_samples: int = 10000
     drop_highest: float = 0.005
     confidence_interval: float = 0.95
 
+    def _summarize(
+        self,
+        samples: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+    ) -> StatisticResultCollection:
+        return _summarize_samples(
+            samples, metric, "mean", reference_branch, self.confidence_interval
+        )
+
+    def bootstrap(
+        self, df: DataFrame, metric: str, seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        column = (
+            np.arange(len(df)),
+            _metric_values(df[metric]),
+            _threshold_quantile(self.drop_highest),
+        )
+        samples = _resample_means(
+            df.branch.to_numpy(), [column], self.num_samples, np.random.default_rng(seed)
+        )
+        return {branch: samples[branch][:, 0] for branch in df.branch.unique()}
+
     def transform(
         self,
         df: DataFrame,
         metric: str,
         reference_branch: str,
         experiment: "config.ExperimentConfiguration",
+        seed: Optional[int] = None,
     ) -> StatisticResultCollection:
-        critical_point = (1 - self.confidence_interval) / 2
-        summary_quantiles = (critical_point, 1 - critical_point)
+        return self._transform_samples(self.bootstrap(df, metric, seed), metric, reference_branch)
 
-        ma_result = mozanalysis.bayesian_stats.bayesian_bootstrap.compare_branches(
-            df,
-            col_label=metric,
-            ref_branch_label=reference_branch,
-            num_samples=self.num_samples,
-            individual_summary_quantiles=summary_quantiles,
-            threshold_quantile=1 - self.drop_highest,
-        )
 
-        return flatten_simple_compare_branches_result(
-            ma_result=ma_result,
-            metric_name=metric,
-            statistic_name="mean",
-            reference_branch=reference_branch,
-            ci_width=self.confidence_interval,
+def bootstrap_means(
+    data: DataFrame,
+    summaries: List[Summary],
+    experiment: "config.ExperimentConfiguration",
+    seed: Optional[int] = None,
+    treated_columns: Optional[TreatedColumnCache] = None,
+) -> StatisticResultCollection:
+    """
+    Compute several `BootstrapMean` summaries on the same data in one pass.
+
+    Pre-treatments are applied per summary, or taken from `treated_columns` of the
+    same data; the resampling weights are drawn once per branch for all summaries
+    with the same number of samples.
+    """
+    results = StatisticResultCollection([])
+    rng = np.random.default_rng(seed)
+
+    if not data.index.is_unique:
+        data = data.reset_index(drop=True)
+        treated_columns = None
+    if treated_columns is None:
+        treated_columns = TreatedColumnCache(data, summaries)
+    branches = data.branch.to_numpy()
+    branch_list = data.branch.unique()
+
+    columns: Dict[int, List[Tuple[Summary, Tuple[np.ndarray, np.ndarray, Optional[float]]]]] = {}
+    for summary in summaries:
+        statistic = summary.statistic
+        assert isinstance(statistic, BootstrapMean)
+        metric = summary.metric.name
+        if metric not in data:
+            continue
+
+        try:
+            treated = treated_columns.get(summary)
+            column = (
+                data.index.get_indexer(treated.index),
+                _metric_values(treated[metric]),
+                _threshold_quantile(statistic.drop_highest),
+            )
+        except Exception as e:
+            statistic._log_exception(metric, e, experiment)
+            continue
+
+        columns.setdefault(statistic.num_samples, []).append((summary, column))
+
+    for num_samples, group in columns.items():
+        try:
+            samples = _resample_means(branches, [column for _, column in group], num_samples, rng)
+        except Exception as e:
+            for summary, _ in group:
+                summary.statistic._log_exception(summary.metric.name, e, experiment)
+            continue
+
+        for j, (summary, _) in enumerate(group):
+            statistic = summary.statistic
+            assert isinstance(statistic, BootstrapMean)
+            metric = summary.metric.name
+            metric_samples = {branch: samples[branch][:, j] for branch in branch_list}
+            results.extend(statistic.apply_samples(metric_samples, metric, experiment))
+
+    return results
+
+
+def compute_statistics(
+    summaries: List[Summary],
+    data: DataFrame,
+    experiment: "config.ExperimentConfiguration",
+) -> StatisticResultCollection:
+    """
+    Run several summaries on the same data.
+
+    `BootstrapMean` summaries are batched by `bootstrap_means`; all other summaries
+    are run one by one. Summaries of a metric with the same pre-treatments share the
+    pre-treated metric column, see `TreatedColumnCache`.
+    """
+    results = StatisticResultCollection([])
+
+    if not data.index.is_unique:
+        data = data.reset_index(drop=True)
+    treated_columns = TreatedColumnCache(data, [s for s in summaries if s.metric.name in data])
+
+    bootstrap_summaries = [s for s in summaries if isinstance(s.statistic, BootstrapMean)]
+    if bootstrap_summaries:
+        results.extend(
+            bootstrap_means(data, bootstrap_summaries, experiment, treated_columns=treated_columns)
         )
+        for summary in bootstrap_summaries:
+            treated_columns.done(summary)
+
+    for summary in summaries:
+        if isinstance(summary.statistic, BootstrapMean):
+            continue
+
+        metric = summary.metric.name
+        if metric not in data:
+            # counts don't depend on the metric values
+            results.extend(summary.run(data, experiment))
+            continue
+
+        try:
+            if summary.supports_sorted_values():
+                results.extend(
+                    summary.statistic.apply_sorted(
+                        treated_columns.sorted_values(summary), metric, experiment
+                    )
+                )
+            else:
+                results.extend(
+                    summary.statistic.apply(treated_columns.get(summary), metric, experiment)
+                )
+        except Exception as e:
+            summary.statistic._log_exception(metric, e, experiment)
+        finally:
+            treated_columns.done(summary)
+
+    return results
 
 
 @attr.s(auto_attribs=True)
 class Binomial(Statistic):
     confidence_interval: float = 0.95
 
+    @staticmethod
+    def _aggregates(df: DataFrame, metric: str) -> DataFrame:
+        if not df[metric].isin([0, 1]).all():
+            raise ValueError(f"All values in column '{metric}' must be 0 or 1.")
+
+        grouped = df.groupby("branch", observed=True, sort=False)[metric]
+        return DataFrame(
+            {
+                "num_enrollments": grouped.size(),
+                "num_conversions": grouped.sum().astype(int),
+            }
+        )
+
+    def apply(
+        self,
+        df: DataFrame,
+        metric: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> StatisticResultCollection:
+        """Aggregates the metric once for all reference branches, see `apply_aggregates`."""
+        if metric not in df:
+            return StatisticResultCollection([])
+
+        try:
+            aggregates = self._aggregates(df, metric)
+        except Exception as e:
+            self._log_exception(metric, e, experiment)
+            return StatisticResultCollection([])
+        return self.apply_aggregates(aggregates, metric, experiment)
+
     def transform(
         self,
         df: DataFrame,
         metric: str,
         reference_branch: str,
         experiment: "config.ExperimentConfiguration",
+    ) -> StatisticResultCollection:
+        return self.transform_aggregates(
+            self._aggregates(df, metric), metric, reference_branch, experiment
+        )
+
+    def transform_aggregates(
+        self,
+        aggregates: DataFrame,
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
     ) -> StatisticResultCollection:
         critical_point = (1 - self.confidence_interval) / 2
         summary_quantiles = (critical_point, 1 - critical_point)
 
-        ma_result = mozanalysis.bayesian_stats.binary.compare_branches(
-            df,
-            col_label=metric,
+        if "num_invalid" in aggregates and aggregates["num_invalid"].any():
+            raise ValueError(f"All values in column '{metric}' must be 0 or 1.")
+
+        if reference_branch not in aggregates.index:
+            raise ValueError(f"Branch label '{reference_branch}' not in branch list")
+
+        ma_result = mozanalysis.bayesian_stats.binary.compare_branches_from_agg(
+            aggregates,
             ref_branch_label=reference_branch,
             individual_summary_quantiles=summary_quantiles,
             comparative_summary_quantiles=summary_quantiles,
@@ -361,20 +1129,275 @@ class Binomial(Statistic):
         )
 
 
+def _resample_quantiles(
+    sorted_values: np.ndarray,
+    quantiles: np.ndarray,
+    num_samples: int,
+    rng: np.random.Generator,
+    counts: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Bootstrap of quantiles of the values, which are expected to be sorted.
+
+    Rather than sorting every resample, the k-th smallest value of a resample is
+    looked up in the cumulative counts of how often each value has been drawn.
+    Quantiles are interpolated linearly like `np.quantile`.
+
+    For values with few distinct values, the counts of the distinct values get
+    resampled from a multinomial distribution instead of drawing every value, which
+    yields the same distribution of resamples. If `counts` are given, the values are
+    distinct and occur that many times.
+
+    Returns a `num_samples` x `len(quantiles)` array of resampled quantiles.
+    """
+    if counts is None:
+        n = len(sorted_values)
+        value_counts = _value_counts(sorted_values)
+    else:
+        n = int(counts.sum())
+        value_counts = (sorted_values, counts)
+    if n == 0:
+        raise ValueError("No data")
+
+    values = sorted_values if value_counts is None else value_counts[0]
+    k = len(values)
+
+    positions = (n - 1) * np.asarray(quantiles)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, n - 1)
+    fraction = positions - lower
+
+    samples = np.empty((num_samples, len(positions)))
+    # the draws, the counts and the cumulative counts of the values
+    for block in _sample_blocks(num_samples, 24 * n if value_counts is None else 16 * k):
+        size = block.stop - block.start
+        resample = np.arange(size)[:, None]
+        if value_counts is None:
+            draws = rng.integers(0, n, (size, n)) + resample * n
+            counts = np.bincount(draws.ravel(), minlength=size * n)
+        else:
+            counts = rng.multinomial(n, value_counts[1] / n, size=size).ravel()
+
+        # the counts of every resample sum up to n, so the cumulative counts of
+        # the block are increasing and can be searched at once
+        cumulative = counts.cumsum()
+        targets = np.concatenate([lower, upper])[None, :] + resample * n
+        indexes = np.searchsorted(cumulative, targets.ravel(), side="right")
+        resampled = values[indexes.reshape(targets.shape) - resample * k]
+        low, high = np.split(resampled, 2, axis=1)
+        samples[block] = low + fraction * (high - low)
+    return samples
+
+
 @attr.s(auto_attribs=True)
 class Deciles(Statistic):
     confidence_interval: float = 0.95
     num_samples: int = 10000
 
-    @staticmethod
-    def _decilize(arr):
-        deciles = np.arange(1, 10) * 0.1
-        arr_quantiles = np.quantile(arr, deciles)
+    DECILES = np.arange(1, 10) / 10
+
+    def transform(
+        self,
+        df: DataFrame,
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+        seed: Optional[int] = None,
+    ) -> StatisticResultCollection:
+        return self.transform_sorted(
+            _sorted_branch_values(df, metric), metric, reference_branch, experiment, seed
+        )
 
-        arr_dict = {
-            f"{label:.1}": arr_quantile for label, arr_quantile in zip(deciles, arr_quantiles)
+    def transform_sorted(
+        self,
+        sorted_values: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+        seed: Optional[int] = None,
+    ) -> StatisticResultCollection:
+        return self._transform_samples(
+            self.bootstrap_sorted(sorted_values, seed), metric, reference_branch
+        )
+
+    def bootstrap(
+        self, df: DataFrame, metric: str, seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        return self.bootstrap_sorted(_sorted_branch_values(df, metric), seed)
+
+    def bootstrap_sorted(
+        self, sorted_values: Dict[str, np.ndarray], seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        rng = np.random.default_rng(seed)
+        return {
+            branch: _resample_quantiles(values, self.DECILES, self.num_samples, rng)
+            for branch, values in sorted_values.items()
         }
-        return arr_dict
+
+    def bootstrap_value_counts(
+        self, value_counts: Dict[str, Tuple[np.ndarray, np.ndarray]], seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns the bootstrap samples of each branch from its sorted distinct metric
+        values and how often they occur, see `jetstream.streaming`.
+        """
+        rng = np.random.default_rng(seed)
+        return {
+            branch: _resample_quantiles(values, self.DECILES, self.num_samples, rng, counts)
+            for branch, (values, counts) in value_counts.items()
+        }
+
+    def _summarize(
+        self,
+        samples: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+    ) -> StatisticResultCollection:
+        return _summarize_samples(
+            samples, metric, "deciles", reference_branch, self.confidence_interval, Deciles.DECILES
+        )
+
+
+def _poisson_resample_quantiles(
+    sorted_values: np.ndarray,
+    quantiles: np.ndarray,
+    num_samples: int,
+    rng: np.random.Generator,
+    counts: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Poisson bootstrap of quantiles of the values, which are expected to be sorted.
+
+    Every value is drawn a Poisson(1) distributed number of times; equal values are
+    drawn Poisson(count) times at once. Quantiles are interpolated linearly like
+    `np.quantile` on the resampled values. If `counts` are given, the values are
+    distinct and occur that many times.
+
+    Returns a `num_samples` x `len(quantiles)` array of resampled quantiles.
+    """
+    if counts is None:
+        value_counts = _value_counts(sorted_values)
+        values, counts = value_counts or (sorted_values, np.ones(len(sorted_values)))
+    else:
+        values = sorted_values
+    if counts.sum() == 0:
+        raise ValueError("No data")
+
+    k = len(values)
+    quantiles = np.asarray(quantiles)
+
+    samples = np.empty((num_samples, len(quantiles)))
+    # the weights and the cumulative weights of the values
+    for block in _sample_blocks(num_samples, 16 * k):
+        size = block.stop - block.start
+        cumulative = rng.poisson(counts, (size, k)).cumsum(axis=1)
+        totals = cumulative[:, -1]
+
+        positions = (totals[:, None] - 1) * quantiles[None, :]
+        lower = np.floor(positions).astype(int)
+        upper = np.minimum(lower + 1, totals[:, None] - 1)
+        fraction = positions - lower
+
+        # offset every resample by the number of values drawn before, so the
+        # cumulative weights of the block are increasing and can be searched at once
+        offsets = (totals.cumsum() - totals)[:, None]
+        targets = np.concatenate([lower, upper], axis=1) + offsets
+        indexes = np.searchsorted((cumulative + offsets).ravel(), targets.ravel(), side="right")
+        resampled = values[
+            np.minimum(indexes.reshape(targets.shape) - np.arange(size)[:, None] * k, k - 1)
+        ]
+        low, high = np.split(resampled, 2, axis=1)
+        block_samples = low + fraction * (high - low)
+        block_samples[totals == 0] = np.nan
+        samples[block] = block_samples
+    return samples
+
+
+@attr.s(auto_attribs=True)
+class PoissonBootstrapMean(Statistic):
+    """
+    Bootstrap of the mean drawing every client a Poisson(1) distributed number of
+    times, instead of drawing exactly as many clients as there are.
+
+    As the weights of clients are independent, the clients can be split into
+    partitions that are resampled separately and whose weighted sums get merged.
+    `Analysis` uses this to split the bootstrap of a metric between workers.
+    """
+
+    num_samples: int = 10000
+    drop_highest: float = 0.005
+    confidence_interval: float = 0.95
+
+    def prepare(self, df: DataFrame, metric: str) -> Dict[str, np.ndarray]:
+        """Returns the metric values of each branch that get resampled."""
+        values = _metric_values(df[metric])
+        branches = df.branch.to_numpy()
+        threshold_quantile = _threshold_quantile(self.drop_highest)
+
+        prepared = {}
+        for branch in df.branch.unique():
+            branch_values = values[branches == branch]
+            if threshold_quantile:
+                threshold = np.quantile(branch_values, threshold_quantile)
+                branch_values = branch_values[branch_values <= threshold]
+            prepared[branch] = branch_values
+        return prepared
+
+    def resample_partition(
+        self,
+        prepared: Dict[str, np.ndarray],
+        partition: int,
+        num_partitions: int,
+        seed: np.random.SeedSequence,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Resamples a partition of the values of each branch.
+
+        Returns the weighted sums and the sums of weights of all resamples as
+        2 x `num_samples` array per branch.
+        """
+        rng = np.random.default_rng(seed)
+        partials = {}
+        for branch, branch_values in prepared.items():
+            values = np.sort(np.array_split(branch_values, num_partitions)[partition])
+            value_counts = _value_counts(values)
+            values, counts = value_counts or (values, np.ones(len(values)))
+
+            sums = np.zeros((2, self.num_samples))
+            block_size = max(1, BOOTSTRAP_MEMORY_BYTES // (8 * self.num_samples))
+            for start in range(0, len(values), block_size):
+                block = slice(start, start + block_size)
+                weights = rng.poisson(counts[block], (self.num_samples, len(counts[block])))
+                sums[0] += weights @ values[block]
+                sums[1] += weights.sum(axis=1)
+            partials[branch] = sums
+        return partials
+
+    def merge(self, partials: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Returns the resampled means of each branch from the results of all partitions."""
+        samples = {}
+        for branch in partials[0]:
+            sums = np.sum([partial[branch] for partial in partials], axis=0)
+            if not sums[1].all():
+                raise ValueError(f"No data for branch {branch}")
+            samples[branch] = sums[0] / sums[1]
+        return samples
+
+    def _summarize(
+        self,
+        samples: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+    ) -> StatisticResultCollection:
+        return _summarize_samples(
+            samples, metric, "mean", reference_branch, self.confidence_interval
+        )
+
+    def bootstrap(
+        self, df: DataFrame, metric: str, seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        prepared = self.prepare(df, metric)
+        return self.merge([self.resample_partition(prepared, 0, 1, np.random.SeedSequence(seed))])
 
     def transform(
         self,
@@ -382,76 +1405,108 @@ class Deciles(Statistic):
         metric: str,
         reference_branch: str,
         experiment: "config.ExperimentConfiguration",
+        seed: Optional[int] = None,
     ) -> StatisticResultCollection:
-        stats_results = StatisticResultCollection([])
+        return self._transform_samples(self.bootstrap(df, metric, seed), metric, reference_branch)
 
-        critical_point = (1 - self.confidence_interval) / 2
-        summary_quantiles = (critical_point, 1 - critical_point)
 
-        ma_result = mozanalysis.frequentist_stats.bootstrap.compare_branches(
-            df,
-            stat_fn=self._decilize,
-            col_label=metric,
-            ref_branch_label=reference_branch,
-            num_samples=self.num_samples,
-            individual_summary_quantiles=summary_quantiles,
-            comparative_summary_quantiles=summary_quantiles,
+@attr.s(auto_attribs=True)
+class PoissonBootstrapDeciles(Statistic):
+    """
+    Bootstrap of the deciles drawing every client a Poisson(1) distributed number of
+    times, see `PoissonBootstrapMean`.
+
+    The resamples are split into partitions that are computed separately.
+    """
+
+    num_samples: int = 10000
+    confidence_interval: float = 0.95
+
+    def prepare(self, df: DataFrame, metric: str) -> Dict[str, np.ndarray]:
+        """Returns the sorted metric values of each branch that get resampled."""
+        return _sorted_branch_values(df, metric)
+
+    def resample_partition(
+        self,
+        prepared: Dict[str, np.ndarray],
+        partition: int,
+        num_partitions: int,
+        seed: np.random.SeedSequence,
+    ) -> Dict[str, np.ndarray]:
+        """Computes a partition of the resamples, as array with a column per decile."""
+        rng = np.random.default_rng(seed)
+        num_samples = len(np.array_split(np.arange(self.num_samples), num_partitions)[partition])
+        return {
+            branch: _poisson_resample_quantiles(values, Deciles.DECILES, num_samples, rng)
+            for branch, values in prepared.items()
+        }
+
+    def bootstrap_value_counts(
+        self, value_counts: Dict[str, Tuple[np.ndarray, np.ndarray]], seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns the bootstrap samples of each branch from its sorted distinct metric
+        values and how often they occur, see `jetstream.streaming`.
+        """
+        rng = np.random.default_rng(seed)
+        return {
+            branch: _poisson_resample_quantiles(
+                values, Deciles.DECILES, self.num_samples, rng, counts
+            )
+            for branch, (values, counts) in value_counts.items()
+        }
+
+    def merge(self, partials: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Returns the resampled deciles of each branch from the results of all partitions."""
+        return {
+            branch: np.concatenate([partial[branch] for partial in partials])
+            for branch in partials[0]
+        }
+
+    def _summarize(
+        self,
+        samples: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+    ) -> StatisticResultCollection:
+        return _summarize_samples(
+            samples, metric, "deciles", reference_branch, self.confidence_interval, Deciles.DECILES
         )
 
-        for branch, branch_result in ma_result["individual"].items():
-            for param, decile_result in branch_result.iterrows():
-                lower, upper = _extract_ci(decile_result, critical_point)
-                stats_results.data.append(
-                    StatisticResult(
-                        metric=metric,
-                        statistic="deciles",
-                        parameter=param,
-                        branch=branch,
-                        ci_width=self.confidence_interval,
-                        point=decile_result["mean"],
-                        lower=lower,
-                        upper=upper,
-                    )
-                )
+    def transform(
+        self,
+        df: DataFrame,
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+        seed: Optional[int] = None,
+    ) -> StatisticResultCollection:
+        return self.transform_sorted(
+            self.prepare(df, metric), metric, reference_branch, experiment, seed
+        )
 
-        for branch, branch_result in ma_result["comparative"].items():
-            abs_uplift = branch_result["abs_uplift"]
-            for param, decile_result in abs_uplift.iterrows():
-                lower_abs, upper_abs = _extract_ci(decile_result, critical_point)
-                stats_results.data.append(
-                    StatisticResult(
-                        metric=metric,
-                        statistic="deciles",
-                        parameter=param,
-                        branch=branch,
-                        comparison="difference",
-                        comparison_to_branch=reference_branch,
-                        ci_width=self.confidence_interval,
-                        point=decile_result["exp"],
-                        lower=lower_abs,
-                        upper=upper_abs,
-                    )
-                )
+    def transform_sorted(
+        self,
+        sorted_values: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+        seed: Optional[int] = None,
+    ) -> StatisticResultCollection:
+        return self._transform_samples(
+            self.bootstrap_sorted(sorted_values, seed), metric, reference_branch
+        )
 
-            rel_uplift = branch_result["rel_uplift"]
-            for param, decile_result in rel_uplift.iterrows():
-                lower_rel, upper_rel = _extract_ci(decile_result, critical_point)
-                stats_results.data.append(
-                    StatisticResult(
-                        metric=metric,
-                        statistic="deciles",
-                        parameter=param,
-                        branch=branch,
-                        comparison="relative_uplift",
-                        comparison_to_branch=reference_branch,
-                        ci_width=self.confidence_interval,
-                        point=decile_result["exp"],
-                        lower=lower_rel,
-                        upper=upper_rel,
-                    )
-                )
+    def bootstrap(
+        self, df: DataFrame, metric: str, seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        return self.bootstrap_sorted(self.prepare(df, metric), seed)
 
-        return stats_results
+    def bootstrap_sorted(
+        self, sorted_values: Dict[str, np.ndarray], seed: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        seed_sequence = np.random.SeedSequence(seed)
+        return self.merge([self.resample_partition(sorted_values, 0, 1, seed_sequence)])
 
 
 class Count(Statistic):
@@ -465,6 +1520,16 @@ class Count(Statistic):
             df, metric, experiment.reference_branch or "control", experiment.normandy_slug
         )
 
+    def apply_aggregates(
+        self,
+        aggregates: DataFrame,
+        metric: str,
+        experiment: "config.ExperimentConfiguration",
+    ):
+        return self.transform_aggregates(
+            aggregates, metric, experiment.reference_branch or "control", experiment
+        )
+
     def transform(
         self,
         df: DataFrame,
@@ -472,24 +1537,26 @@ class Count(Statistic):
         reference_branch: str,
         experiment: "config.ExperimentConfiguration",
     ) -> StatisticResultCollection:
-        results = []
-        counts = df.groupby("branch").size()
-        for branch, n in counts.items():
-            results.append(
-                StatisticResult(
-                    metric="identity",
-                    statistic="count",
-                    parameter=None,
-                    branch=branch,
-                    comparison=None,
-                    comparison_to_branch=None,
-                    ci_width=None,
-                    point=n,
-                    lower=None,
-                    upper=None,
-                )
-            )
-        return StatisticResultCollection(results)
+        return self.transform_aggregates(
+            DataFrame({"num_enrollments": df.groupby("branch", observed=True).size()}),
+            metric,
+            reference_branch,
+            experiment,
+        )
+
+    def transform_aggregates(
+        self,
+        aggregates: DataFrame,
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> StatisticResultCollection:
+        return StatisticResultCollection.from_columns(
+            metric="identity",
+            statistic="count",
+            branch=aggregates.index,
+            point=aggregates["num_enrollments"],
+        )
 
 
 @attr.s(auto_attribs=True)
@@ -499,8 +1566,9 @@ class MakeGridResult:
     message: Optional[str]
 
 
-def _make_grid(values: Series, size: int, attempt_geometric: bool) -> MakeGridResult:
-    start, stop = values.min(), values.max()
+def _make_grid(sorted_values: np.ndarray, size: int, attempt_geometric: bool) -> MakeGridResult:
+    """Returns a grid spanning the values, which are expected to be sorted."""
+    start, stop = sorted_values[0], sorted_values[-1]
     message = None
     geometric = attempt_geometric
     if geometric and (start < 0 or stop <= 0):
@@ -509,7 +1577,7 @@ def _make_grid(values: Series, size: int, attempt_geometric: bool) -> MakeGridRe
         )
         geometric = False
     if geometric and start == 0:
-        start = values.drop_duplicates().nsmallest(2).iloc[1]
+        start = sorted_values[np.searchsorted(sorted_values, 0, side="right")]
         assert start != 0
     f: Any = np.geomspace if geometric else np.linspace
     return MakeGridResult(
@@ -533,49 +1601,42 @@ class KernelDensityEstimate(Statistic):
         metric: str,
         reference_branch: str,
         experiment: "config.ExperimentConfiguration",
+    ) -> StatisticResultCollection:
+        return self.transform_sorted(
+            _sorted_branch_values(df, metric), metric, reference_branch, experiment
+        )
+
+    def transform_sorted(
+        self,
+        sorted_values: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
     ) -> StatisticResultCollection:
         results = []
-        for branch, group in df.groupby("branch"):
-            kde = sm.nonparametric.KDEUnivariate(group[metric])
+        for branch, values in sorted_values.items():
+            kde = sm.nonparametric.KDEUnivariate(values)
             kde.fit(bw=self.bandwidth, adjust=self.adjust, kernel=self.kernel)
-            grid = _make_grid(group[metric], self.grid_size, self.log_space)
+            grid = _make_grid(values, self.grid_size, self.log_space)
             if grid.message:
                 logger.warning(
                     f"KernelDensityEstimate for metric {metric}, branch {branch}: {grid.message}",
                     extra={"experiment": experiment.normandy_slug},
                 )
-            result = kde.evaluate(grid.grid)
-            if group[metric].min() == 0 and grid.geometric:
-                results.append(
-                    StatisticResult(
-                        metric=metric,
-                        statistic="kernel_density_estimate",
-                        parameter=0,
-                        branch=branch,
-                        comparison=None,
-                        comparison_to_branch=None,
-                        ci_width=None,
-                        point=kde.evaluate(0)[0],
-                        lower=None,
-                        upper=None,
-                    )
-                )
-            for x, y in zip(grid.grid, result):
-                results.append(
-                    StatisticResult(
-                        metric=metric,
-                        statistic="kernel_density_estimate",
-                        parameter=x,
-                        branch=branch,
-                        comparison=None,
-                        comparison_to_branch=None,
-                        ci_width=None,
-                        point=y,
-                        lower=None,
-                        upper=None,
-                    )
+            parameters, points = grid.grid, kde.evaluate(grid.grid)
+            if values[0] == 0 and grid.geometric:
+                parameters = np.concatenate([[0], parameters])
+                points = np.concatenate([kde.evaluate(0), points])
+            results.append(
+                StatisticResultCollection.from_columns(
+                    metric=metric,
+                    statistic="kernel_density_estimate",
+                    branch=branch,
+                    parameter=parameters,
+                    point=points,
                 )
-        return StatisticResultCollection(results)
+            )
+        return StatisticResultCollection.concat(results)
 
 
 @attr.s(auto_attribs=True)
@@ -590,44 +1651,59 @@ class EmpiricalCDF(Statistic):
         reference_branch: str,
         experiment: "config.ExperimentConfiguration",
     ) -> StatisticResultCollection:
+        return self.transform_sorted(
+            _sorted_branch_values(df, metric), metric, reference_branch, experiment
+        )
+
+    def transform_sorted(
+        self,
+        sorted_values: Dict[str, np.ndarray],
+        metric: str,
+        reference_branch: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> StatisticResultCollection:
+        return self.transform_value_counts(
+            {branch: (values, None) for branch, values in sorted_values.items()},
+            metric,
+            experiment,
+        )
+
+    def transform_value_counts(
+        self,
+        value_counts: Mapping[str, Tuple[np.ndarray, Optional[np.ndarray]]],
+        metric: str,
+        experiment: "config.ExperimentConfiguration",
+    ) -> StatisticResultCollection:
+        """
+        Compute the ECDF of each branch from its sorted distinct metric values and how
+        often they occur, see `jetstream.streaming`. Without counts, every value
+        occurs once.
+        """
         results = []
-        for branch, group in df.groupby("branch"):
-            f = ECDF(group[metric])
-            grid = _make_grid(group[metric], self.grid_size, self.log_space)
+        for branch, (values, counts) in value_counts.items():
+            grid = _make_grid(values, self.grid_size, self.log_space)
             if grid.message:
                 logger.warning(
                     f"EmpiricalCDF for metric {metric}, branch {branch}: {grid.message}",
                     extra={"experiment": experiment.normandy_slug},
                 )
-            if group[metric].min() == 0 and grid.geometric:
-                results.append(
-                    StatisticResult(
-                        metric=metric,
-                        statistic="empirical_cdf",
-                        parameter=0,
-                        branch=branch,
-                        comparison=None,
-                        comparison_to_branch=None,
-                        ci_width=None,
-                        point=f(0),
-                        lower=None,
-                        upper=None,
-                    )
-                )
-            cdf = f(grid.grid)
-            for x, y in zip(grid.grid, cdf):
-                results.append(
-                    StatisticResult(
-                        metric=metric,
-                        statistic="empirical_cdf",
-                        parameter=x,
-                        branch=branch,
-                        comparison=None,
-                        comparison_to_branch=None,
-                        ci_width=None,
-                        point=y,
-                        lower=None,
-                        upper=None,
-                    )
+            parameters = grid.grid
+            if values[0] == 0 and grid.geometric:
+                parameters = np.concatenate([[0], parameters])
+            # fraction of values less than or equal to each parameter
+            below = np.searchsorted(values, parameters, side="right")
+            if counts is None:
+                points = below / len(values)
+            else:
+                cumulative = np.concatenate([[0], counts.cumsum()])
+                points = cumulative[below] / cumulative[-1]
+            results.append(
+                StatisticResultCollection.from_columns(
+                    metric=metric,
+                    statistic="empirical_cdf",
+                    branch=branch,
+                    parameter=parameters,
+                    point=points,
                 )
-        return StatisticResultCollection(results)
+            )
+        return StatisticResultCollection.concat(results)
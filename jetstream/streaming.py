@@ -0,0 +1,419 @@
+"""
+Incremental computation of statistics on metrics tables that are read as a stream
+of record batches, for experiments whose metrics don't fit into memory at once.
+"""
+import logging
+import math
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+import attr
+import numpy as np
+from pandas import DataFrame
+
+from .pre_treatment import apply_pre_treatments
+from .statistics import (
+    BOOTSTRAP_MEMORY_BYTES,
+    BootstrapMean,
+    Count,
+    Deciles,
+    EmpiricalCDF,
+    PoissonBootstrapDeciles,
+    StatisticResultCollection,
+    Summary,
+    _metric_values,
+    _threshold_quantile,
+)
+
+if TYPE_CHECKING:
+    import jetstream.config as config
+
+logger = logging.getLogger(__name__)
+
+
+@attr.s(auto_attribs=True)
+class QuantileSketch:
+    """
+    Mergeable sketch of a distribution for estimating its quantiles.
+
+    Values are counted in logarithmically sized buckets, so estimated quantiles are
+    within `relative_accuracy` of the actual values (see DDSketch, Masson et al. 2019)
+    while the size of the sketch only depends on the range of values.
+    """
+
+    relative_accuracy: float = 0.001
+    positive: Dict[int, int] = attr.Factory(dict)
+    negative: Dict[int, int] = attr.Factory(dict)
+    zeros: int = 0
+
+    @property
+    def _gamma(self) -> float:
+        return (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+
+    @property
+    def count(self) -> int:
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zeros
+
+    def _add_buckets(self, buckets: Dict[int, int], values: np.ndarray) -> None:
+        indexes = np.ceil(np.log(values) / math.log(self._gamma)).astype(int)
+        for index, count in zip(*np.unique(indexes, return_counts=True)):
+            buckets[int(index)] = buckets.get(int(index), 0) + int(count)
+
+    def add(self, values: np.ndarray) -> None:
+        """Adds values to the sketch. Missing and infinite values are not counted."""
+        values = values[np.isfinite(values)]
+        self._add_buckets(self.positive, values[values > 0])
+        self._add_buckets(self.negative, -values[values < 0])
+        self.zeros += int((values == 0).sum())
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Adds the values counted by another sketch with the same accuracy."""
+        assert self.relative_accuracy == other.relative_accuracy
+        for buckets, other_buckets in [
+            (self.positive, other.positive),
+            (self.negative, other.negative),
+        ]:
+            for index, count in other_buckets.items():
+                buckets[index] = buckets.get(index, 0) + count
+        self.zeros += other.zeros
+
+    def value_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the estimated values of the non-empty buckets in ascending order and
+        how many values each bucket counted.
+        """
+        negative = sorted(self.negative, reverse=True)
+        positive = sorted(self.positive)
+        indexes = np.array(negative + positive, dtype=float)
+        values = 2 * self._gamma**indexes / (self._gamma + 1)
+        values[: len(negative)] *= -1
+        counts = [self.negative[i] for i in negative] + [self.positive[i] for i in positive]
+
+        values = np.insert(values, len(negative), 0.0)
+        counts.insert(len(negative), self.zeros)
+        nonempty = np.array(counts) > 0
+        return values[nonempty], np.array(counts)[nonempty]
+
+    def quantile(self, q: float) -> float:
+        """Returns an estimate of the `q` quantile of the values."""
+        if self.count == 0:
+            raise ValueError("Empty sketch")
+
+        values, counts = self.value_counts()
+        rank = q * (self.count - 1)
+        index = int(np.searchsorted(counts.cumsum(), rank, side="right"))
+        return float(values[min(index, len(values) - 1)])
+
+
+def _pre_treated(summary: Summary, data: DataFrame) -> Optional[DataFrame]:
+    """Returns the pre-treated metric column of the summary, if part of the data."""
+    metric = summary.metric.name
+    if metric not in data:
+        return None
+
+    return apply_pre_treatments(summary.pre_treatments, data, metric)
+
+
+@attr.s(auto_attribs=True)
+class _AggregatesStream:
+    """Running per-branch sufficient statistics of a `Binomial` or `Count` summary."""
+
+    summary: Summary
+    aggregates: Optional[DataFrame] = None
+    error: Optional[Exception] = None
+
+    needs_observing = False
+
+    def update(self, data: DataFrame) -> None:
+        if self.error:
+            return
+
+        try:
+            treated = _pre_treated(self.summary, data)
+            if treated is None:
+                if self.summary.pre_treatments or not isinstance(self.summary.statistic, Count):
+                    return
+                # counts without pre-treatments don't depend on the metric values
+                treated = data[["branch"]].assign(**{self.summary.metric.name: 0})
+
+            values = treated[self.summary.metric.name]
+            valid = values.isin([0, 1])
+            batch_aggregates = (
+                DataFrame(
+                    {
+                        "branch": treated["branch"],
+                        "num_enrollments": 1,
+                        "num_conversions": values.where(valid, 0).astype(int),
+                        "num_invalid": (~valid).astype(int),
+                    }
+                )
+                .groupby("branch", observed=True)
+                .sum()
+            )
+        except Exception as e:
+            self.error = e
+            return
+
+        if self.aggregates is None:
+            self.aggregates = batch_aggregates
+        else:
+            self.aggregates = self.aggregates.add(batch_aggregates, fill_value=0)
+
+    def results(self, experiment: "config.ExperimentConfiguration") -> StatisticResultCollection:
+        if self.error:
+            self.summary.statistic._log_exception(self.summary.metric.name, self.error, experiment)
+            return StatisticResultCollection([])
+        if self.aggregates is None:
+            return StatisticResultCollection([])
+        return self.summary.run_aggregates(self.aggregates.astype(int), experiment)
+
+
+@attr.s(auto_attribs=True)
+class _BootstrapMeansStream:
+    """
+    Streaming Bayesian bootstrap of `BootstrapMean` summaries with the same number
+    of samples.
+
+    The resampling weights are drawn as independent Exp(1) variates for every row
+    as it gets read; accumulating the weighted sums and the sums of weights of the
+    kept rows yields the same resampled means as `bootstrap_means`. The thresholds
+    for discarding the highest values are estimated from sketches of the values,
+    which requires observing the stream once before.
+    """
+
+    summaries: List[Summary]
+    num_samples: int
+    rng: np.random.Generator
+    branches: List[str] = attr.Factory(list)
+    sketches: Dict[int, Dict[str, QuantileSketch]] = attr.Factory(dict)
+    thresholds: Dict[int, Dict[str, float]] = attr.Factory(dict)
+    sums: Dict[str, np.ndarray] = attr.Factory(dict)
+    weights: Dict[str, np.ndarray] = attr.Factory(dict)
+    errors: Dict[int, Exception] = attr.Factory(dict)
+
+    @property
+    def needs_observing(self) -> bool:
+        return any(self._threshold_quantile(s) for s in self.summaries)
+
+    @staticmethod
+    def _threshold_quantile(summary: Summary) -> Optional[float]:
+        assert isinstance(summary.statistic, BootstrapMean)
+        return _threshold_quantile(summary.statistic.drop_highest)
+
+    def _columns(self, data: DataFrame) -> Dict[int, DataFrame]:
+        """Returns the pre-treated metric column of every summary that hasn't failed."""
+        columns = {}
+        for j, summary in enumerate(self.summaries):
+            if j in self.errors:
+                continue
+            try:
+                treated = _pre_treated(summary, data)
+                if treated is not None:
+                    _metric_values(treated[summary.metric.name])
+                    columns[j] = treated
+            except Exception as e:
+                self.errors[j] = e
+        return columns
+
+    def observe(self, data: DataFrame) -> None:
+        for j, treated in self._columns(data).items():
+            if not self._threshold_quantile(self.summaries[j]):
+                continue
+            for branch, group in treated.groupby("branch", observed=True):
+                sketch = self.sketches.setdefault(j, {}).setdefault(branch, QuantileSketch())
+                sketch.add(_metric_values(group[self.summaries[j].metric.name]))
+
+    def finish_observing(self) -> None:
+        for j, branch_sketches in self.sketches.items():
+            threshold_quantile = self._threshold_quantile(self.summaries[j])
+            assert threshold_quantile
+            self.thresholds[j] = {
+                branch: sketch.quantile(threshold_quantile)
+                for branch, sketch in branch_sketches.items()
+            }
+
+    def update(self, data: DataFrame) -> None:
+        columns = self._columns(data)
+        m = len(self.summaries)
+
+        for branch in data["branch"].unique():
+            if branch not in self.branches:
+                self.branches.append(branch)
+                self.sums[branch] = np.zeros((self.num_samples, m))
+                self.weights[branch] = np.zeros((self.num_samples, m))
+
+            branch_index = data.index[data["branch"] == branch]
+            n = len(branch_index)
+            values = np.zeros((n, m))
+            kept = np.zeros((n, m))
+            for j, treated in columns.items():
+                treated = treated[treated["branch"] == branch]
+                rows = branch_index.get_indexer(treated.index)
+                branch_values = _metric_values(treated[self.summaries[j].metric.name])
+                keep = branch_values <= self.thresholds.get(j, {}).get(branch, np.inf)
+                values[rows[keep], j] = branch_values[keep]
+                kept[rows[keep], j] = 1
+
+            block_size = max(1, BOOTSTRAP_MEMORY_BYTES // (8 * self.num_samples))
+            for start in range(0, n, block_size):
+                block = slice(start, min(start + block_size, n))
+                weights = self.rng.standard_exponential((self.num_samples, block.stop - start))
+                self.sums[branch] += weights @ values[block]
+                self.weights[branch] += weights @ kept[block]
+
+    def results(self, experiment: "config.ExperimentConfiguration") -> StatisticResultCollection:
+        results = StatisticResultCollection([])
+        for j, summary in enumerate(self.summaries):
+            statistic = summary.statistic
+            assert isinstance(statistic, BootstrapMean)
+            metric = summary.metric.name
+
+            if j in self.errors:
+                statistic._log_exception(metric, self.errors[j], experiment)
+                continue
+
+            empty = [b for b in self.branches if not self.weights[b][:, j].all()]
+            if len(empty) == len(self.branches):
+                # metric isn't part of the metrics table
+                continue
+            if empty:
+                statistic._log_exception(
+                    metric, ValueError(f"No data for branch {empty[0]}"), experiment
+                )
+                continue
+
+            samples = {b: self.sums[b][:, j] / self.weights[b][:, j] for b in self.branches}
+            results.extend(statistic.apply_samples(samples, metric, experiment))
+        return results
+
+
+@attr.s(auto_attribs=True)
+class _ValueCountsStream:
+    """
+    Sketches of the metric values of each branch for summaries computed from value
+    counts, like `Deciles` and `EmpiricalCDF`.
+
+    The summaries are computed from the buckets of the sketches, so results are
+    within the relative accuracy of the sketches of the results on all values.
+    This includes the grid of `EmpiricalCDF`, which spans the values of the lowest
+    and highest buckets rather than the exact extremes, so its parameters slightly
+    differ from the ones computed on all values.
+    """
+
+    summary: Summary
+    rng: np.random.Generator
+    sketches: Dict[str, QuantileSketch] = attr.Factory(dict)
+    error: Optional[Exception] = None
+
+    needs_observing = False
+
+    def update(self, data: DataFrame) -> None:
+        if self.error:
+            return
+
+        try:
+            treated = _pre_treated(self.summary, data)
+            if treated is None:
+                return
+            for branch, group in treated.groupby("branch", observed=True):
+                sketch = self.sketches.setdefault(branch, QuantileSketch())
+                sketch.add(_metric_values(group[self.summary.metric.name]))
+        except Exception as e:
+            self.error = e
+
+    def results(self, experiment: "config.ExperimentConfiguration") -> StatisticResultCollection:
+        statistic = self.summary.statistic
+        metric = self.summary.metric.name
+        if not self.sketches and not self.error:
+            return StatisticResultCollection([])
+
+        try:
+            if self.error:
+                raise self.error
+            value_counts = {
+                branch: sketch.value_counts() for branch, sketch in self.sketches.items()
+            }
+            if isinstance(statistic, EmpiricalCDF):
+                return statistic.transform_value_counts(value_counts, metric, experiment)
+            assert isinstance(statistic, (Deciles, PoissonBootstrapDeciles))
+            seed = int(self.rng.integers(2**32))
+            samples = statistic.bootstrap_value_counts(value_counts, seed)
+        except Exception as e:
+            statistic._log_exception(metric, e, experiment)
+            return StatisticResultCollection([])
+        return statistic.apply_samples(samples, metric, experiment)
+
+
+def _streams(summaries: List[Summary], rng: np.random.Generator) -> List:
+    bootstrap_summaries: Dict[int, List[Summary]] = {}
+    streams: List = []
+    for summary in summaries:
+        if isinstance(summary.statistic, BootstrapMean):
+            bootstrap_summaries.setdefault(summary.statistic.num_samples, []).append(summary)
+        elif summary.supports_value_counts():
+            streams.append(_ValueCountsStream(summary, rng))
+        else:
+            streams.append(_AggregatesStream(summary))
+
+    for num_samples, group in bootstrap_summaries.items():
+        streams.append(_BootstrapMeansStream(group, num_samples, rng))
+    return streams
+
+
+def stream_statistics(
+    read_batches: Callable[[], Iterable[DataFrame]],
+    summaries: List[Summary],
+    segments: List[str],
+    experiment: "config.ExperimentConfiguration",
+    seed: Optional[int] = None,
+) -> StatisticResultCollection:
+    """
+    Compute summaries for each segment on metrics read in batches.
+
+    `read_batches` returns an iterable over the batches of the metrics table and is
+    called once for every pass over the table. Memory usage is bounded by the size of
+    the batches rather than the number of clients. Summaries that can't be computed
+    incrementally, see `Summary.supports_streaming`, fail with an error.
+    """
+    rng = np.random.default_rng(seed)
+    for summary in summaries:
+        if not summary.supports_streaming():
+            summary.statistic._log_exception(
+                summary.metric.name,
+                ValueError("Not supported for experiments whose metrics are streamed"),
+                experiment,
+            )
+
+    streams = {
+        segment: _streams([s for s in summaries if s.supports_streaming()], rng)
+        for segment in segments
+    }
+
+    def segment_batches():
+        for batch in read_batches():
+            for segment in segments:
+                if segment == "all":
+                    yield segment, batch
+                elif segment not in batch.columns:
+                    raise ValueError(f"Segment {segment} not in metrics table")
+                else:
+                    yield segment, batch[batch[segment].fillna(False).astype(bool)]
+
+    if any(stream.needs_observing for s in streams.values() for stream in s):
+        for segment, batch in segment_batches():
+            for stream in streams[segment]:
+                if stream.needs_observing:
+                    stream.observe(batch)
+        for segment_streams in streams.values():
+            for stream in segment_streams:
+                if stream.needs_observing:
+                    stream.finish_observing()
+
+    for segment, batch in segment_batches():
+        for stream in streams[segment]:
+            stream.update(batch)
+
+    results = StatisticResultCollection([])
+    for segment, segment_streams in streams.items():
+        for stream in segment_streams:
+            results.extend(stream.results(experiment).set_segment(segment))
+    return results
@@ -1,25 +1,43 @@
 import datetime as dt
 import json
 import logging
+import os
 import re
+import time
 from datetime import timedelta
 from textwrap import dedent
 from unittest.mock import Mock
 
+import dask
 import mozanalysis.segments
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
 import pytest
 import pytz
 import toml
+from dask.distributed import Client, LocalCluster
+from mozanalysis.experiment import AnalysisBasis
 
 import jetstream.analysis
-from jetstream.analysis import Analysis, AnalysisPeriod
+from jetstream.analysis import Analysis, AnalysisPeriod, enrollments_table_name
 from jetstream.config import AnalysisSpec
 from jetstream.errors import (
     ExplicitSkipException,
-    HighPopulationException,
     NoEnrollmentPeriodException,
 )
 from jetstream.experimenter import ExperimentV1
+from jetstream.metric import Metric
+from jetstream.statistics import (
+    Binomial,
+    BootstrapMean,
+    Count,
+    Deciles,
+    EmpiricalCDF,
+    PoissonBootstrapMean,
+    StatisticResultCollection,
+    Summary,
+)
 
 logger = logging.getLogger("TEST_ANALYSIS")
 
@@ -58,6 +76,72 @@ def test_get_timelimits_if_ready(experiments):
     assert analysis._get_timelimits_if_ready(AnalysisPeriod.DAYS_28, date)
 
 
+def test_get_backfill_timelimits(experiments):
+    config = AnalysisSpec().resolve(experiments[0])
+    analysis = Analysis("test", "test", config)
+
+    start = dt.datetime(2019, 12, 1, tzinfo=pytz.utc)
+    dates = [start + timedelta(days=i) for i in range(15)]
+
+    time_limits, windows = analysis._get_backfill_timelimits(AnalysisPeriod.DAY, dates)
+    assert windows == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert len(time_limits.analysis_windows) == 8
+    assert time_limits.first_date_data_required == "2019-12-01"
+    latest = analysis._get_timelimits_if_ready(AnalysisPeriod.DAY, dates[-1])
+    assert time_limits.analysis_windows == tuple(latest.analysis_windows)
+
+    time_limits, windows = analysis._get_backfill_timelimits(AnalysisPeriod.WEEK, dates)
+    assert windows == [1]
+    assert time_limits.analysis_windows[0].start == 0
+
+    time_limits, windows = analysis._get_backfill_timelimits(AnalysisPeriod.DAY, dates[10:])
+    assert windows == [4, 5, 6, 7, 8]
+    assert time_limits.analysis_windows[0].start == 3
+    assert time_limits.first_date_data_required == "2019-12-04"
+
+    assert analysis._get_backfill_timelimits(AnalysisPeriod.OVERALL, dates) == (None, [])
+
+
+def test_calculate_backfill_metrics(experiments, monkeypatch):
+    config = AnalysisSpec().resolve(experiments[0])
+    analysis = Analysis("test", "test", config)
+    bigquery = Mock()
+    monkeypatch.setattr(Analysis, "bigquery", bigquery)
+
+    dates = [dt.datetime(2019, 12, 1, tzinfo=pytz.utc) + timedelta(days=i) for i in range(10)]
+    time_limits, windows = analysis._get_backfill_timelimits(AnalysisPeriod.DAY, dates)
+    exp = analysis._mozanalysis_experiment()
+
+    delayed_tables = analysis.calculate_backfill_metrics(
+        exp, time_limits, windows, AnalysisPeriod.DAY, AnalysisBasis.ENROLLMENTS, False
+    )
+    # the query only runs as part of the dask graph, in parallel to other periods
+    bigquery.execute.assert_not_called()
+    tables = delayed_tables.compute(scheduler="synchronous")
+
+    assert tables == [
+        "normandy_test_slug_enrollments_day_1",
+        "normandy_test_slug_enrollments_day_2",
+        "normandy_test_slug_enrollments_day_3",
+    ]
+
+    metrics_sql, destination = bigquery.execute.call_args_list[0].args
+    assert destination == "backfill_normandy_test_slug_enrollments_day"
+    assert metrics_sql.count("AS analysis_window_start") == 3
+
+    for call, table, analysis_window in zip(
+        bigquery.execute.call_args_list[1:4], tables, time_limits.analysis_windows
+    ):
+        sql, destination = call.args
+        assert destination == table
+        assert "backfill_normandy_test_slug_enrollments_day" in sql
+        assert f"analysis_window_start = {analysis_window.start}" in sql
+
+    bigquery.delete_table.assert_called_once_with(
+        "test.test.backfill_normandy_test_slug_enrollments_day"
+    )
+
+
 def test_regression_20200320():
     experiment_json = r"""
         {
@@ -186,12 +270,270 @@ def test_analysis_doesnt_choke_on_segments(experiments, monkeypatch):
     )
 
 
-def test_is_high_population_check(experiments):
+def test_aggregates_query(experiments):
+    conf = dedent(
+        """
+        [experiment]
+        segments = ["regular_users_v3"]
+
+        [metrics]
+        weekly = ["active", "searches"]
+
+        [metrics.active]
+        select_expression = "TRUE"
+        data_source = "clients_daily"
+
+        [metrics.active.statistics.binomial]
+        pre_treatments = ["remove_nulls"]
+
+        [metrics.searches]
+        select_expression = "1"
+        data_source = "clients_daily"
+
+        [metrics.searches.statistics.binomial]
+        """
+    )
+    spec = AnalysisSpec.from_dict(toml.loads(conf))
+    configured = spec.resolve(experiments[0])
+    summaries = [
+        s
+        for s in configured.metrics[AnalysisPeriod.WEEK]
+        if s.metric.name in ("active", "searches")
+    ]
+    assert all(s.supports_aggregates() for s in summaries)
+
+    analysis = Analysis("spam", "eggs", configured)
+    sql = analysis._aggregates_query(
+        "metrics_table",
+        summaries,
+        {"branch": "STRING", "active": "BOOLEAN", "regular_users_v3": "BOOLEAN"},
+    )
+    assert "FROM `spam.eggs.metrics_table`" in sql
+    assert "COALESCE(`regular_users_v3`, FALSE)" in sql
+    active = [s.metric.name for s in summaries].index("active")
+    assert f"COUNTIF(NOT `active` IS NULL) AS num_enrollments_{active}" in sql
+    assert f"num_enrollments_{1 - active}" not in sql
+
+    with pytest.raises(ValueError):
+        analysis._aggregates_query("metrics_table", summaries, {"branch": "STRING"})
+
+
+def test_metrics_dtypes(experiments):
+    conf = dedent(
+        """
+        [experiment]
+        segments = ["regular_users_v3"]
+
+        [metrics]
+        weekly = ["spam"]
+
+        [metrics.spam]
+        select_expression = "1"
+        data_source = "clients_daily"
+        single_precision = true
+
+        [metrics.spam.statistics.bootstrap_mean]
+        """
+    )
+    spec = AnalysisSpec.from_dict(toml.loads(conf))
+    configured = spec.resolve(experiments[0])
+    summaries = configured.metrics[AnalysisPeriod.WEEK]
+
+    dtypes = Analysis("spam", "eggs", configured)._metrics_dtypes(summaries)
+    assert dtypes["branch"] == "category"
+    assert dtypes["regular_users_v3"] == "bool"
+    assert dtypes["spam"] == "float32"
+    assert len([s for s in summaries if s.metric.name in dtypes]) == 1
+
+
+def test_calculate_aggregate_statistics(experiments):
+    config = AnalysisSpec().resolve(experiments[0])
+    analysis = Analysis("spam", "eggs", config)
+    summaries = [
+        Summary(Metric("active", None, ""), Binomial()),
+        Summary(Metric("active", None, ""), Count()),
+    ]
+    aggregates = pd.DataFrame(
+        {
+            "branch": ["a", "b", "a"],
+            "segment": ["all", "all", "new_users"],
+            "num_clients": [10, 12, 2],
+            "num_enrollments_0": [10, 12, 2],
+            "num_conversions_0": [4, 6, 1],
+            "num_invalid_0": [0, 0, 0],
+            "num_enrollments_1": [10, 12, 2],
+            "num_conversions_1": [0, 0, 0],
+            "num_invalid_1": [0, 0, 0],
+        }
+    )
+
+    result = analysis.calculate_aggregate_statistics(
+        summaries, aggregates, "all", AnalysisBasis.ENROLLMENTS
+    ).compute()
+    assert {r.statistic for r in result.data} == {"binomial", "count"}
+    assert {r.segment for r in result.data} == {"all"}
+
+    counts = analysis.counts_from_aggregates(
+        aggregates, "new_users", AnalysisBasis.ENROLLMENTS
+    ).compute()
+    assert {r["branch"]: r["point"] for r in counts.to_dict()["data"]} == {"a": 2, "b": 0}
+
+
+def test_statistics_batches():
+    active, ash = Metric("active", None, ""), Metric("ash", None, "")
+    summaries = [
+        Summary(active, Deciles()),
+        Summary(active, BootstrapMean()),
+        Summary(ash, Binomial()),
+        Summary(active, EmpiricalCDF()),
+        Summary(ash, Deciles()),
+        Summary(ash, BootstrapMean()),
+    ]
+
+    assert Analysis._statistics_batches(summaries) == [
+        [summaries[1], summaries[5]],
+        [summaries[0], summaries[3]],
+        [summaries[2], summaries[4]],
+    ]
+    assert Analysis._statistics_batches(summaries, num_workers=4) == [
+        [summaries[1]],
+        [summaries[5]],
+        [summaries[0], summaries[3]],
+        [summaries[2], summaries[4]],
+    ]
+    bootstrap_summaries = [Summary(active, BootstrapMean(num_samples=i)) for i in (1, 2, 3)]
+    assert Analysis._statistics_batches(bootstrap_summaries, num_workers=2) == [
+        bootstrap_summaries[:2],
+        bootstrap_summaries[2:],
+    ]
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="Needs several CPUs")
+def test_bootstrap_batches_wall_time(experiments):
+    """Splitting `BootstrapMean` summaries between workers doesn't slow statistics down."""
+    config = AnalysisSpec().resolve(experiments[0])
+    analysis = Analysis("test", "test", config)
+    rng = np.random.default_rng(0)
+    n, num_metrics = 50_000, 16
+    data = pd.DataFrame(
+        {
+            "branch": rng.choice(["a", "b"], n),
+            **{f"metric_{i}": rng.exponential(1, n) for i in range(num_metrics)},
+        }
+    )
+    summaries = [
+        Summary(Metric(f"metric_{i}", None, ""), BootstrapMean(num_samples=1000))
+        for i in range(num_metrics)
+    ]
+
+    def compute(num_workers):
+        metrics_data = dask.delayed(data, pure=True)
+        tasks = [
+            analysis.calculate_statistics(
+                batch, metrics_data, None, "all", AnalysisBasis.ENROLLMENTS
+            )
+            for batch in Analysis._statistics_batches(summaries, num_workers)
+        ]
+        start = time.perf_counter()
+        results = dask.compute(*tasks)
+        return time.perf_counter() - start, StatisticResultCollection.concat(results)
+
+    # workers of the cluster run with a single BLAS thread, like in production
+    with LocalCluster(n_workers=2, threads_per_worker=1, processes=True) as cluster:
+        with Client(cluster):
+            compute(2)
+            single_task, expected = compute(1)
+            split, results = compute(2)
+
+    assert len(results.data) == len(expected.data)
+    assert split <= 1.1 * single_task
+
+
+def test_segment_statistics(experiments):
+    config = AnalysisSpec().resolve(experiments[0])
+    analysis = Analysis("test", "test", config)
+    data = pd.DataFrame(
+        {
+            "branch": pd.Categorical(["a", "b"] * 50),
+            "active": pd.array(range(100), dtype="Int64"),
+            "ash": 1.0,
+            "regular_users": [True, None, False, True] * 25,
+        }
+    )
+    summaries = [Summary(Metric("active", None, ""), BootstrapMean(num_samples=10))]
+
+    rows = analysis.segment_rows("regular_users", data).compute(scheduler="synchronous")
+    assert rows.tolist() == [i for i in range(100) if i % 4 in (0, 3)]
+    assert analysis.segment_rows("all", data).compute(scheduler="synchronous") is None
+    with pytest.raises(ValueError):
+        analysis.segment_rows("spam", data).compute(scheduler="synchronous")
+
+    segment_data = jetstream.analysis._segment_data(data, rows, summaries)
+    assert list(segment_data.columns) == ["branch", "active"]
+    pd.testing.assert_frame_equal(segment_data, data.loc[data.index[rows], ["branch", "active"]])
+
+    results = analysis.calculate_statistics(
+        summaries, data, rows, "regular_users", AnalysisBasis.ENROLLMENTS
+    ).compute(scheduler="synchronous")
+    assert {r.segment for r in results.data} == {"regular_users"}
+    assert {r.statistic for r in results.data} == {"mean"}
+
+
+def test_partitioned_statistics(experiments, monkeypatch):
+    config = AnalysisSpec().resolve(experiments[0])
+    analysis = Analysis("test", "test", config)
+    monkeypatch.setattr(jetstream.analysis, "DASK_N_PROCESSES", 3)
+
+    data = pd.DataFrame({"branch": ["a", "b"] * 50, "active": range(100)})
+    summary = Summary(Metric("active", None, ""), PoissonBootstrapMean(num_samples=100))
+    assert summary.supports_partitions()
+    results = analysis._partitioned_statistics(
+        summary, data, None, "all", AnalysisBasis.ENROLLMENTS
+    ).compute(scheduler="synchronous")
+
+    assert {r.statistic for r in results.data} == {"mean"}
+    assert {r.segment for r in results.data} == {"all"}
+    assert {(r.branch, r.comparison) for r in results.data} == {
+        ("a", None),
+        ("b", None),
+        ("a", "difference"),
+        ("a", "relative_uplift"),
+    }
+
+
+def test_save_statistics(experiments, monkeypatch, tmp_path):
+    config = AnalysisSpec().resolve(experiments[0])
+    analysis = Analysis("test", "test", config)
+    bigquery = Mock()
+    monkeypatch.setattr(Analysis, "bigquery", bigquery)
+    monkeypatch.setattr(jetstream.analysis, "STATISTICS_PARQUET_DIRECTORY", str(tmp_path))
+
+    results = [
+        StatisticResultCollection.from_columns(
+            metric="active", statistic="count", branch=["a", "b"], point=[10, 12]
+        ),
+        StatisticResultCollection.from_columns(
+            metric="active", statistic="binomial", branch="a", point=0.4
+        ),
+    ]
+    analysis.save_statistics(AnalysisPeriod.DAY, results, "normandy_test_slug_day_1").compute(
+        scheduler="synchronous"
+    )
+
+    arrow_table, table = bigquery.load_table_from_arrow.call_args.args
+    assert table == "statistics_normandy_test_slug_day_1"
+    assert arrow_table["point"].to_pylist() == [10, 12, 0.4]
+    assert arrow_table["sample_rate"].null_count == 3
+    assert pq.read_table(tmp_path / "statistics_normandy_test_slug_day_1.parquet").equals(
+        arrow_table
+    )
+
+
+def test_high_population_experiments_are_runnable(experiments):
     x = experiments[3]
     config = AnalysisSpec.default_for_experiment(x).resolve(x)
 
-    with pytest.raises(HighPopulationException):
-        Analysis("spam", "eggs", config).check_runnable()
+    assert Analysis("spam", "eggs", config).check_runnable()
 
 
 def test_skip_works(experiments):
@@ -209,6 +551,36 @@ def test_skip_works(experiments):
         )
 
 
+def test_sample_enrollments(experiments):
+    config = AnalysisSpec().resolve(experiments[0])
+    assert Analysis("spam", "eggs", config)._sample_enrollments("SELECT 1") == "SELECT 1"
+
+    spec = AnalysisSpec.from_dict(toml.loads("[experiment]\nsample_rate = 0.01"))
+    config = spec.resolve(experiments[0])
+    sql = Analysis("spam", "eggs", config)._sample_enrollments("SELECT 1")
+    assert "FROM (\nSELECT 1\n)" in sql
+    assert "ABS(MOD(FARM_FINGERPRINT(client_id), 1000000)) < 10000" in sql
+
+
+def test_enrollments_table_name_of_sample_rate(experiments, monkeypatch):
+    config = AnalysisSpec().resolve(experiments[0])
+    assert enrollments_table_name(config.experiment) == "enrollments_normandy_test_slug"
+
+    bigquery = Mock()
+    monkeypatch.setattr(Analysis, "bigquery", bigquery)
+    for sample_rate in (0.01, 0.1):
+        spec = AnalysisSpec.from_dict(toml.loads(f"[experiment]\nsample_rate = {sample_rate}"))
+        Analysis("spam", "eggs", spec.resolve(experiments[0])).ensure_enrollments(
+            dt.datetime(2020, 1, 1, tzinfo=pytz.utc)
+        )
+
+    # enrollments sampled at another rate don't get reused
+    assert [call.args[1] for call in bigquery.execute.call_args_list] == [
+        "enrollments_normandy_test_slug_sample_10000",
+        "enrollments_normandy_test_slug_sample_100000",
+    ]
+
+
 def test_fenix_experiments_use_right_datasets(fenix_experiments, monkeypatch):
     for experiment in fenix_experiments:
         called = 0
@@ -0,0 +1,51 @@
+from unittest.mock import Mock
+
+import google.cloud.bigquery
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import jetstream.bigquery_client
+from jetstream.bigquery_client import (
+    BigQueryClient,
+    BigQueryClientPlugin,
+    shared_bigquery_client,
+)
+
+
+def test_clients_are_shared(monkeypatch):
+    client_class = Mock(side_effect=lambda project: Mock(project=project))
+    monkeypatch.setattr("google.cloud.bigquery.client.Client", client_class)
+    monkeypatch.setattr(jetstream.bigquery_client, "_bigquery_clients", {})
+
+    assert shared_bigquery_client("spam") is shared_bigquery_client("spam")
+    assert shared_bigquery_client("eggs").project == "eggs"
+    assert BigQueryClient("spam", "dataset").client is shared_bigquery_client("spam")
+    assert client_class.call_count == 2
+
+
+def test_worker_plugin_initializes_clients(monkeypatch):
+    storage_client_class = Mock()
+    monkeypatch.setattr("google.cloud.bigquery.client.Client", Mock())
+    monkeypatch.setattr(jetstream.bigquery_client, "BigQueryReadClient", storage_client_class)
+    monkeypatch.setattr(jetstream.bigquery_client, "_bigquery_clients", {})
+    monkeypatch.setattr(jetstream.bigquery_client, "_storage_client", None)
+
+    BigQueryClientPlugin("spam").setup(Mock())
+
+    assert "spam" in jetstream.bigquery_client._bigquery_clients
+    assert BigQueryClient("spam", "dataset").storage_client is storage_client_class.return_value
+    storage_client_class.assert_called_once()
+
+
+def test_load_table_from_arrow():
+    client = Mock()
+    bigquery = BigQueryClient("spam", "eggs", client=client)
+    arrow_table = pa.table({"branch": ["a", "b"], "point": [1.0, None]})
+    job_config = google.cloud.bigquery.LoadJobConfig()
+
+    bigquery.load_table_from_arrow(arrow_table, "statistics", job_config=job_config)
+
+    data, destination = client.load_table_from_file.call_args.args
+    assert destination == "spam.eggs.statistics"
+    assert pq.read_table(data).equals(arrow_table)
+    assert job_config.source_format == google.cloud.bigquery.SourceFormat.PARQUET
@@ -0,0 +1,62 @@
+import datetime as dt
+import os
+
+import pyarrow as pa
+
+from jetstream.cache import TableCache
+
+MODIFIED = dt.datetime(2022, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def _table(n=10):
+    return pa.table({"branch": ["a", "b"] * n, "value": list(range(2 * n))})
+
+
+class TestTableCache:
+    def test_roundtrip(self, tmp_path):
+        cache = TableCache(tmp_path, 1024**3)
+        assert cache.get("p.d.t", MODIFIED) is None
+
+        cache.put("p.d.t", MODIFIED, _table())
+        assert cache.get("p.d.t", MODIFIED).equals(_table())
+
+    def test_keys(self, tmp_path):
+        cache = TableCache(tmp_path, 1024**3)
+        cache.put("p.d.t", MODIFIED, _table(), ["branch", "value"])
+
+        assert cache.get("p.d.t", MODIFIED, ["value", "branch"]) is not None
+        assert cache.get("p.d.t", MODIFIED, ["branch"]) is None
+        assert cache.get("p.d.t", MODIFIED) is None
+        assert cache.get("p.d.other", MODIFIED, ["branch", "value"]) is None
+        assert cache.get("p.d.t", MODIFIED + dt.timedelta(hours=1), ["branch", "value"]) is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = TableCache(tmp_path, 1024**3)
+        cache.put("p.d.t1", MODIFIED, _table())
+        cache.put("p.d.t2", MODIFIED, _table())
+        entry_size = cache._path("p.d.t1", MODIFIED).stat().st_size
+
+        os.utime(cache._path("p.d.t1", MODIFIED), (0, 0))
+        os.utime(cache._path("p.d.t2", MODIFIED), (1, 1))
+        cache.get("p.d.t1", MODIFIED)
+
+        cache.max_size = 2 * entry_size
+        cache.put("p.d.t3", MODIFIED, _table())
+
+        assert cache.get("p.d.t1", MODIFIED) is not None
+        assert cache.get("p.d.t2", MODIFIED) is None
+        assert cache.get("p.d.t3", MODIFIED) is not None
+
+    def test_corrupt_entry(self, tmp_path):
+        cache = TableCache(tmp_path, 1024**3)
+        cache._path("p.d.t", MODIFIED).write_text("spam")
+        assert cache.get("p.d.t", MODIFIED) is None
+        assert not cache._path("p.d.t", MODIFIED).exists()
+
+    def test_from_environment(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("jetstream.cache.CACHE_DIRECTORY", None)
+        assert TableCache.from_environment() is None
+
+        monkeypatch.setattr("jetstream.cache.CACHE_DIRECTORY", str(tmp_path))
+        monkeypatch.setattr("jetstream.cache.CACHE_MAX_SIZE_GB", 1)
+        assert TableCache.from_environment() == TableCache(tmp_path, 1024**3)
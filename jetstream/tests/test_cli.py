@@ -12,6 +12,7 @@ from pytz import UTC
 
 from jetstream import cli, experimenter, external_config
 from jetstream.config import AnalysisSpec
+from jetstream.config_bundle import ConfigBundle
 
 
 @pytest.fixture(name="cli_experiments")
@@ -172,6 +173,32 @@ class TestAnalysisExecutor:
         assert strategy.worklist[0][1] == dt.datetime(2020, 10, 28, tzinfo=UTC)
         assert bigquery_mock_client.called is False
 
+    def test_config_bundle(self):
+        experiments = cli_experiments()
+        config = AnalysisSpec().resolve(experiments.experiments[0])
+        bundle = ConfigBundle(
+            experiments,
+            external_config.ExternalConfigCollection(),
+            {"my_cool_experiment": config},
+        )
+        executor = cli.AnalysisExecutor(
+            project_id="project",
+            dataset_id="dataset",
+            bucket="bucket",
+            date=dt.datetime(2020, 10, 28, tzinfo=UTC),
+            experiment_slugs=["my_cool_experiment"],
+            config_bundle=bundle,
+        )
+
+        strategy = DummyExecutorStrategy("project", "dataset")
+        success = executor.execute(
+            experiment_getter=Mock(side_effect=Exception("Experimenter shouldn't be called")),
+            config_getter=Mock(side_effect=Exception("Configs shouldn't be fetched")),
+            strategy=strategy,
+        )
+        assert success
+        assert strategy.worklist == [(config, dt.datetime(2020, 10, 28, tzinfo=UTC))]
+
     def test_recreate_enrollments(self, monkeypatch):
         executor = cli.AnalysisExecutor(
             project_id="project",
@@ -423,6 +450,145 @@ class TestSerialExecutorStrategy:
         fake_analysis.assert_called_once_with("spam", "eggs", config, None)
         fake_analysis().run.assert_called_once_with(run_date)
 
+    def test_backfill_workflow(self, cli_experiments, monkeypatch):
+        monkeypatch.setattr("jetstream.cli.export_metadata", Mock())
+        fake_analysis = Mock()
+        experiment = cli_experiments.experiments[0]
+        spec = AnalysisSpec.default_for_experiment(experiment)
+        strategy = cli.SerialExecutorStrategy(
+            project_id="spam",
+            dataset_id="eggs",
+            bucket="bucket",
+            analysis_class=fake_analysis,
+            experiment_getter=lambda: cli_experiments,
+            config_getter=external_config.ExternalConfigCollection,
+            backfill=True,
+        )
+        config = spec.resolve(experiment)
+        run_dates = [dt.datetime(2020, 10, 30, tzinfo=UTC), dt.datetime(2020, 10, 31, tzinfo=UTC)]
+        strategy.execute([(config, date) for date in run_dates])
+        fake_analysis.assert_called_once_with("spam", "eggs", config, None)
+        fake_analysis().backfill.assert_called_once_with(run_dates)
+        fake_analysis().run.assert_not_called()
+
+    def test_backfill_of_ended_experiment(self, monkeypatch):
+        monkeypatch.setattr("jetstream.cli.export_metadata", Mock())
+        calculate_backfill_metrics = Mock(
+            side_effect=lambda exp, time_limits, windows, *args: [f"t_{w}" for w in windows]
+        )
+        monkeypatch.setattr(cli.Analysis, "ensure_enrollments", Mock())
+        monkeypatch.setattr(cli.Analysis, "_dask_client", Mock())
+        monkeypatch.setattr(cli.Analysis, "calculate_backfill_metrics", calculate_backfill_metrics)
+        monkeypatch.setattr(cli.Analysis, "_statistics", Mock(return_value=[]))
+        monkeypatch.setattr(cli.Analysis, "save_statistics", Mock())
+
+        experiment = experimenter.Experiment(
+            experimenter_slug=None,
+            normandy_slug="ended_experiment",
+            type="v6",
+            status="Complete",
+            branches=[
+                experimenter.Branch(slug="treatment", ratio=1),
+                experimenter.Branch(slug="control", ratio=1),
+            ],
+            start_date=dt.datetime(2020, 1, 1, tzinfo=UTC),
+            end_date=dt.datetime(2020, 2, 1, tzinfo=UTC),
+            proposed_enrollment=7,
+            reference_branch="control",
+            is_high_population=False,
+            app_name="firefox_desktop",
+            app_id="firefox-desktop",
+        )
+        conf = dedent(
+            """
+            [metrics]
+            daily = ["active"]
+            weekly = ["active"]
+            overall = ["active"]
+
+            [metrics.active]
+            select_expression = "1"
+            data_source = "clients_daily"
+
+            [metrics.active.statistics.bootstrap_mean]
+            """
+        )
+        experiments = experimenter.ExperimentCollection([experiment])
+        bundle = ConfigBundle(
+            experiments,
+            external_config.ExternalConfigCollection(),
+            {"ended_experiment": AnalysisSpec.from_dict(toml.loads(conf)).resolve(experiment)},
+        )
+        executor = cli.AnalysisExecutor(
+            project_id="spam",
+            dataset_id="eggs",
+            bucket="bucket",
+            date=cli.All,
+            experiment_slugs=["ended_experiment"],
+            config_bundle=bundle,
+        )
+        strategy = cli.SerialExecutorStrategy(
+            project_id="spam", dataset_id="eggs", bucket="bucket", backfill=True
+        )
+        success = executor.execute(strategy, today=dt.datetime(2021, 1, 1, tzinfo=UTC))
+
+        assert success
+        periods = {call.args[3].value for call in calculate_backfill_metrics.call_args_list}
+        assert periods == {"day", "week", "overall"}
+
+
+class TestParallelExecutorStrategy:
+    def test_simple_workflow(self, cli_experiments, monkeypatch):
+        monkeypatch.setattr("jetstream.cli.export_metadata", Mock())
+        fake_analysis = Mock()
+        strategy = cli.ParallelExecutorStrategy(
+            project_id="spam",
+            dataset_id="eggs",
+            bucket="bucket",
+            analysis_class=fake_analysis,
+            experiment_getter=lambda: cli_experiments,
+            config_getter=external_config.ExternalConfigCollection,
+            max_concurrency=2,
+        )
+        configs = [
+            AnalysisSpec.default_for_experiment(experiment).resolve(experiment)
+            for experiment in cli_experiments.experiments
+        ]
+        run_dates = [dt.datetime(2020, 10, 30, tzinfo=UTC), dt.datetime(2020, 10, 31, tzinfo=UTC)]
+        worklist = [(config, date) for config in configs for date in run_dates]
+
+        assert strategy.execute(worklist)
+        assert fake_analysis.call_count == len(worklist)
+        for config in configs:
+            fake_analysis.assert_any_call("spam", "eggs", config, None)
+        assert fake_analysis().run.call_count == len(worklist)
+
+    def test_reports_failures(self, cli_experiments, monkeypatch):
+        monkeypatch.setattr("jetstream.cli.export_metadata", Mock())
+        failing_slug = cli_experiments.experiments[0].normandy_slug
+
+        def fake_analysis(project, dataset, config, log_config):
+            analysis = Mock()
+            if config.experiment.normandy_slug == failing_slug:
+                analysis.run.side_effect = Exception("boom")
+            return analysis
+
+        strategy = cli.ParallelExecutorStrategy(
+            project_id="spam",
+            dataset_id="eggs",
+            bucket="bucket",
+            analysis_class=fake_analysis,
+            max_concurrency=2,
+        )
+        worklist = [
+            (
+                AnalysisSpec.default_for_experiment(experiment).resolve(experiment),
+                dt.datetime(2020, 10, 31, tzinfo=UTC),
+            )
+            for experiment in cli_experiments.experiments
+        ]
+        assert not strategy.execute(worklist)
+
 
 class TestArgoExecutorStrategy:
     def test_simple_workflow(self, cli_experiments):
@@ -460,3 +626,65 @@ class TestArgoExecutorStrategy:
                 cluster_ip=None,
                 cluster_cert=None,
             )
+
+    def test_experiments_snapshot(self, cli_experiments, tmp_path):
+        experiment = cli_experiments.experiments[0]
+        config = AnalysisSpec.default_for_experiment(experiment).resolve(experiment)
+        snapshot = str(tmp_path / "experiments.json")
+
+        with mock.patch("jetstream.cli.submit_workflow") as submit_workflow_mock:
+            strategy = cli.ArgoExecutorStrategy(
+                "spam",
+                "eggs",
+                "bucket",
+                "zone",
+                "cluster_id",
+                False,
+                experiment_getter=lambda: cli_experiments,
+                experiments_snapshot=snapshot,
+            )
+            strategy.execute([(config, dt.datetime(2020, 10, 31, tzinfo=UTC))])
+
+            parameters = submit_workflow_mock.call_args.kwargs["parameters"]
+            assert parameters["experiments_snapshot"] == snapshot
+            assert experimenter.ExperimentCollection.from_snapshot(snapshot) == cli_experiments
+
+    def test_deletes_expired_snapshots(self, cli_experiments):
+        config = AnalysisSpec().resolve(cli_experiments.experiments[0])
+        now = dt.datetime.now(tz=UTC)
+        expired = Mock(time_created=now - dt.timedelta(days=cli.SNAPSHOT_RETENTION_DAYS + 1))
+        recent = Mock(time_created=now - dt.timedelta(hours=1))
+        experiments = Mock()
+
+        with mock.patch("jetstream.cli.submit_workflow"), mock.patch(
+            "google.cloud.storage.Client"
+        ) as storage_client:
+            storage_client.return_value.list_blobs.return_value = [expired, recent]
+            strategy = cli.ArgoExecutorStrategy(
+                "spam",
+                "eggs",
+                "bucket",
+                "zone",
+                "cluster_id",
+                False,
+                experiment_getter=lambda: experiments,
+                experiments_snapshot=cli._snapshot_path("bucket", "experiments", "json"),
+            )
+            strategy.execute([(config, dt.datetime(2020, 10, 31, tzinfo=UTC))])
+
+        storage_client.return_value.list_blobs.assert_called_once_with(
+            "bucket", prefix="snapshots/"
+        )
+        expired.delete.assert_called_once()
+        recent.delete.assert_not_called()
+        experiments.save_snapshot.assert_called_once()
+
+    def test_unloadable_config_bundle(self, tmp_path, caplog):
+        path = str(tmp_path / "configs.json")
+        (tmp_path / "configs.json").write_text('{"version": 0}')
+
+        with pytest.raises(Exception, match="can't be loaded"):
+            cli._check_config_bundle(path)
+        assert cli._load_config_bundle(path) is None
+        assert "Resolving configs again" in caplog.text
+        assert all(r.levelname == "ERROR" for r in caplog.records)
@@ -682,6 +682,23 @@ class TestExperimentSpec:
         configured = spec.resolve(experiments[0])
         assert configured.experiment.reference_branch == "a"
 
+    def test_sample_rate(self, experiments):
+        trivial = config.AnalysisSpec().resolve(experiments[0])
+        assert trivial.experiment.sample_rate is None
+
+        conf = dedent(
+            """
+            [experiment]
+            sample_rate = 0.1
+            """
+        )
+        spec = config.AnalysisSpec.from_dict(toml.loads(conf))
+        configured = spec.resolve(experiments[0])
+        assert configured.experiment.sample_rate == 0.1
+
+        with pytest.raises(ValueError):
+            config.AnalysisSpec.from_dict(toml.loads("[experiment]\nsample_rate = 2"))
+
     def test_recognizes_segments(self, experiments):
         conf = dedent(
             """
@@ -0,0 +1,119 @@
+import datetime as dt
+import json
+from unittest.mock import Mock
+
+import attr
+import toml
+
+import jetstream.config_bundle
+from jetstream import default_config
+from jetstream.config import AnalysisSpec
+from jetstream.config_bundle import ConfigBundle
+from jetstream.experimenter import ExperimentCollection
+from jetstream.external_config import (
+    ExternalConfig,
+    ExternalConfigCollection,
+    ExternalDefaultConfig,
+)
+
+
+def _external_configs(experiment):
+    source = "[experiment]\nenrollment_period = 3\n"
+    spec = AnalysisSpec.from_dict(toml.loads(source))
+    return ExternalConfigCollection(
+        configs=[ExternalConfig(experiment.normandy_slug, spec, dt.datetime(2022, 1, 1), source)],
+        defaults=[
+            ExternalDefaultConfig(
+                "firefox_desktop", AnalysisSpec.from_dict({}), dt.datetime(2022, 1, 1), ""
+            )
+        ],
+    )
+
+
+class TestConfigBundle:
+    def test_compile(self, experiments, monkeypatch, fake_outcome_resolver):
+        monkeypatch.setattr(
+            "jetstream.default_config.DefaultConfigsResolver",
+            default_config._DefaultConfigsResolver(),
+        )
+        external_configs = _external_configs(experiments[0])
+
+        bundle = ConfigBundle.compile(
+            ExperimentCollection(experiments), external_configs, ["pref", "v6"]
+        )
+
+        launched = [
+            e.normandy_slug
+            for e in ExperimentCollection(experiments)
+            .ever_launched()
+            .of_type(["pref", "v6"])
+            .experiments
+        ]
+        assert set(bundle.configs) == set(launched)
+        config = bundle.configs[experiments[0].normandy_slug]
+        assert config.experiment.proposed_enrollment == 3
+
+    def test_save_and_load(self, experiments, monkeypatch, tmp_path):
+        monkeypatch.setattr(
+            "jetstream.default_config.DefaultConfigsResolver",
+            default_config._DefaultConfigsResolver(),
+        )
+        external_configs = _external_configs(experiments[0])
+        bundle = ConfigBundle.compile(
+            ExperimentCollection(experiments[:1]), external_configs, [experiments[0].type]
+        )
+        assert bundle.configs
+
+        path = str(tmp_path / "configs.json")
+        bundle.save(path)
+        assert json.loads((tmp_path / "configs.json").read_text())["configs"] == [
+            experiments[0].normandy_slug
+        ]
+        loaded = ConfigBundle.load(path)
+
+        assert loaded.configs == bundle.configs
+        assert loaded.experiments == bundle.experiments
+        assert loaded.external_configs == external_configs
+        assert loaded.created_at == bundle.created_at
+        assert default_config.DefaultConfigsResolver.external_configs == external_configs
+
+    def test_load_resolves_configs_lazily(
+        self, experiments, monkeypatch, tmp_path, fake_outcome_resolver
+    ):
+        monkeypatch.setattr(
+            "jetstream.default_config.DefaultConfigsResolver",
+            default_config._DefaultConfigsResolver(),
+        )
+        external_configs = _external_configs(experiments[0])
+        other = attr.evolve(experiments[0], normandy_slug="other-slug")
+        bundle = ConfigBundle.compile(
+            ExperimentCollection([experiments[0], other]), external_configs, ["pref"]
+        )
+        assert len(bundle.configs) == 2
+        path = str(tmp_path / "configs.json")
+        bundle.save(path)
+
+        resolve_config = Mock(wraps=jetstream.config_bundle._resolve_config)
+        monkeypatch.setattr("jetstream.config_bundle._resolve_config", resolve_config)
+        loaded = ConfigBundle.load(path)
+        assert set(loaded.configs) == set(bundle.configs)
+        resolve_config.assert_not_called()
+
+        slug = experiments[0].normandy_slug
+        assert loaded.configs[slug] == bundle.configs[slug]
+        assert slug in loaded.configs
+        assert "unknown-slug" not in loaded.configs
+        resolve_config.assert_called_once()
+
+    def test_load_unsupported_bundle(self, tmp_path, monkeypatch):
+        path = tmp_path / "configs.json"
+        assert ConfigBundle.load(str(path)) is None
+
+        path.write_bytes(b"\x80\x04pickled")
+        assert ConfigBundle.load(str(path)) is None
+
+        bundle = ConfigBundle(ExperimentCollection(), ExternalConfigCollection(), {})
+        bundle.save(str(path))
+        assert ConfigBundle.load(str(path)) is not None
+        monkeypatch.setattr("jetstream.config_bundle.BUNDLE_VERSION", 3)
+        assert ConfigBundle.load(str(path)) is None
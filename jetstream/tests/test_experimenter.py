@@ -12,6 +12,7 @@ from jetstream.experimenter import (
     Branch,
     Experiment,
     ExperimentCollection,
+    ExperimenterCache,
     ExperimentV1,
     ExperimentV6,
     Outcome,
@@ -512,6 +513,27 @@ def test_with_slug(experiment_collection):
     assert len(experiments.experiments) == 0
 
 
+def test_indexed_lookups_match_scans(experiment_collection):
+    experiments = experiment_collection.experiments
+
+    for ex in experiments:
+        for slug in (ex.experimenter_slug, ex.normandy_slug):
+            assert experiment_collection.with_slug(slug).experiments == [
+                e for e in experiments if slug in (e.experimenter_slug, e.normandy_slug)
+            ]
+
+    assert experiment_collection.of_type(("v6", "addon")).experiments == [
+        e for e in experiments if e.type in ("v6", "addon")
+    ]
+    assert experiment_collection.ever_launched().experiments == [
+        e for e in experiments if e.status in ("Complete", "Live", None)
+    ]
+    assert (
+        experiment_collection.ever_launched().of_type("v6").experiments
+        == experiment_collection.of_type("v6").ever_launched().experiments
+    )
+
+
 def test_convert_experiment_v1_to_experiment():
     experiment_v1 = ExperimentV1(
         slug="test-slug",
@@ -618,3 +640,69 @@ def test_focus_android_app_name():
     assert x.appId == "org.mozilla.focus"
     assert x.outcomes == []
     assert x.to_experiment().outcomes == []
+
+
+class FakeResponse:
+    def __init__(self, body=None, status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+
+def test_experimenter_cache_revalidates(tmp_path):
+    url = ExperimentCollection.EXPERIMENTER_API_URL_V6
+    cache = ExperimenterCache(tmp_path)
+    session = MagicMock()
+
+    session.get.return_value = FakeResponse([{"slug": "a"}], headers={"ETag": '"v1"'})
+    assert cache.get(session, url, 3) == [{"slug": "a"}]
+    session.get.assert_called_once_with(url)
+
+    session.get.reset_mock()
+    session.get.return_value = FakeResponse(status_code=304)
+    assert cache.get(session, url, 3) == [{"slug": "a"}]
+    session.get.assert_called_once_with(url, headers={"If-None-Match": '"v1"'})
+
+    session.get.return_value = FakeResponse([{"slug": "b"}], headers={"ETag": '"v2"'})
+    assert cache.get(session, url, 3) == [{"slug": "b"}]
+    assert cache.get(MagicMock(get=lambda *args, **kwargs: FakeResponse(status_code=304)), url, 1)
+
+
+def test_from_experimenter_with_cache(mock_session, monkeypatch, tmp_path):
+    monkeypatch.setattr("jetstream.experimenter.EXPERIMENTER_CACHE_DIRECTORY", str(tmp_path))
+    get = mock_session.get.side_effect
+
+    def experimenter_fixtures(url, headers=None):
+        response = get(url)
+        response.status_code = 200
+        response.headers = {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+        return response
+
+    mock_session.get.side_effect = experimenter_fixtures
+    collection = ExperimentCollection.from_experimenter(mock_session)
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+    mock_session.get.side_effect = lambda url, headers: FakeResponse(status_code=304)
+    assert ExperimentCollection.from_experimenter(mock_session) == collection
+    mock_session.get.assert_any_call(
+        ExperimentCollection.EXPERIMENTER_API_URL_V1,
+        headers={"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"},
+    )
+
+
+def test_experiments_snapshot(experiment_collection, monkeypatch, tmp_path):
+    snapshot = str(tmp_path / "experiments.json")
+    experiment_collection.save_snapshot(snapshot)
+    assert ExperimentCollection.from_snapshot(snapshot) == experiment_collection
+
+    monkeypatch.setattr("jetstream.experimenter.EXPERIMENTS_SNAPSHOT", snapshot)
+    session = MagicMock()
+    assert ExperimentCollection.from_experimenter(session) == experiment_collection
+    session.get.assert_not_called()
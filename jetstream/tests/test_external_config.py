@@ -8,6 +8,7 @@ from unittest.mock import Mock, patch
 
 import pytest
 import toml
+from git import Repo
 
 from jetstream.config import AnalysisSpec, OutcomeSpec
 from jetstream.external_config import (
@@ -15,7 +16,9 @@ from jetstream.external_config import (
     ExternalConfigCollection,
     ExternalDefaultConfig,
     ExternalOutcome,
+    _last_commits,
     entity_from_path,
+    mirror_repo,
     validate_config_settings,
 )
 
@@ -117,6 +120,87 @@ class TestExternalConfig:
         assert Analysis.validate.called_once()
 
 
+class TestConfigMirror:
+    @staticmethod
+    def _commit(repo, path, text):
+        file = Path(repo.working_tree_dir) / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(text)
+        repo.index.add([path])
+        repo.index.commit(f"Update {path}")
+
+    @pytest.fixture
+    def origin(self, tmp_path):
+        repo = Repo.init(tmp_path / "origin", initial_branch="main")
+        self._commit(repo, "my_cool_experiment.toml", "[experiment]\nenrollment_period = 7\n")
+        self._commit(
+            repo, "outcomes/fenix/my_outcome.toml", 'friendly_name = "Outcome"\ndescription = ""\n'
+        )
+        self._commit(repo, "defaults/fenix.toml", "[experiment]\nenrollment_period = 3\n")
+        return repo
+
+    def test_mirror_repo(self, origin, tmp_path):
+        mirror = mirror_repo(origin.working_tree_dir, tmp_path / "mirror")
+        assert (tmp_path / "mirror" / "my_cool_experiment.toml").exists()
+
+        self._commit(origin, "new_experiment.toml", "")
+        mirror = mirror_repo(origin.working_tree_dir, tmp_path / "mirror")
+        assert mirror.head.commit.hexsha == origin.head.commit.hexsha
+        assert (tmp_path / "mirror" / "new_experiment.toml").exists()
+
+    def test_mirror_repo_recovers_from_broken_mirror(self, origin, tmp_path):
+        (tmp_path / "mirror" / ".git").mkdir(parents=True)
+        mirror = mirror_repo(origin.working_tree_dir, tmp_path / "mirror")
+        assert mirror.head.commit.hexsha == origin.head.commit.hexsha
+
+    def test_from_repo(self, origin):
+        external_configs = ExternalConfigCollection.from_repo(origin)
+
+        spec = external_configs.spec_for_experiment("my_cool_experiment")
+        assert spec.experiment.enrollment_period == 7
+        assert [o.slug for o in external_configs.outcomes] == ["my_outcome"]
+        assert external_configs.outcomes[0].commit_hash
+        assert [d.slug for d in external_configs.defaults] == ["fenix"]
+
+        # specs parsed from the same blob aren't shared between collections
+        other = ExternalConfigCollection.from_repo(origin)
+        assert other.spec_for_experiment("my_cool_experiment") == spec
+        assert other.spec_for_experiment("my_cool_experiment") is not spec
+
+    def test_last_commits(self, origin):
+        self._commit(origin, "defaults/fenix.toml", "[experiment]\nenrollment_period = 4\n")
+        self._commit(origin, "expérience.toml", "")
+        last_commits = _last_commits(origin)
+
+        assert set(last_commits) == {
+            "my_cool_experiment.toml",
+            "expérience.toml",
+            "outcomes/fenix/my_outcome.toml",
+            "defaults/fenix.toml",
+        }
+        for path, (committed_date, hexsha) in last_commits.items():
+            commit = next(origin.iter_commits("main", paths=path))
+            assert (committed_date, hexsha) == (commit.committed_date, commit.hexsha)
+        assert last_commits["expérience.toml"][1] == origin.head.commit.hexsha
+
+    def test_from_github_repo_is_memoized(self, origin, monkeypatch, tmp_path):
+        monkeypatch.setattr("jetstream.external_config._external_configs", None)
+        monkeypatch.setattr("jetstream.external_config.CONFIG_MIRROR_DIRECTORY", tmp_path / "m")
+        monkeypatch.setattr(
+            ExternalConfigCollection, "JETSTREAM_CONFIG_URL", origin.working_tree_dir
+        )
+
+        external_configs = ExternalConfigCollection.from_github_repo()
+        assert external_configs.spec_for_experiment("my_cool_experiment")
+        assert ExternalConfigCollection.from_github_repo() is external_configs
+
+        # new commits to the config repository are picked up
+        self._commit(origin, "new_experiment.toml", "")
+        updated = ExternalConfigCollection.from_github_repo()
+        assert updated is not external_configs
+        assert updated.spec_for_experiment("new_experiment")
+
+
 @pytest.mark.parametrize(
     "test_input,expected",
     (
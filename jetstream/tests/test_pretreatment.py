@@ -74,3 +74,36 @@ class TestPreTreatment:
         ex1 = pt.apply(example_data, "a")
         assert ex1.loc[1, "a"] == 0
         assert np.isnan(ex1.loc[1, "b"])
+
+    def test_apply_pre_treatments(self):
+        values = np.random.default_rng(0).exponential(size=1000)
+        values[::10] = np.nan
+        df = pd.DataFrame({"branch": ["a", "b"] * 500, "value": values, "other": 1})
+        pre_treatments = [
+            pre_treatment.ZeroFill(),
+            pre_treatment.Log(),
+            pre_treatment.RemoveIndefinites(),
+            pre_treatment.CensorHighestValues(0.9),
+        ]
+
+        expected = df[["branch", "value"]]
+        for pt in pre_treatments:
+            expected = pt.apply(expected, "value")
+        treated = pre_treatment.apply_pre_treatments(pre_treatments, df, "value")
+        pd.testing.assert_frame_equal(treated, expected)
+        assert df["value"].isna().sum() == 100
+
+    def test_apply_pre_treatments_nullable_values(self):
+        df = pd.DataFrame({"branch": ["a"] * 3, "value": pd.array([1, None, 3], dtype="Int64")})
+        treated = pre_treatment.apply_pre_treatments([pre_treatment.RemoveNulls()], df, "value")
+        assert treated["value"].tolist() == [1.0, 3.0]
+        assert treated["value"].dtype == np.float64
+        assert treated.index.tolist() == [0, 2]
+
+    @pytest.mark.parametrize("dtype", ["float32", "Float32"])
+    def test_apply_pre_treatments_keeps_precision(self, dtype):
+        df = pd.DataFrame({"branch": ["a"] * 3, "value": pd.array([1, None, 3], dtype=dtype)})
+        pre_treatments = [pre_treatment.RemoveNulls(), pre_treatment.Log()]
+        treated = pre_treatment.apply_pre_treatments(pre_treatments, df, "value")
+        assert treated["value"].dtype == np.float32
+        assert treated["value"].tolist() == pytest.approx([0, np.log10(3)])
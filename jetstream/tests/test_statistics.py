@@ -1,20 +1,40 @@
 import json
 from pathlib import Path
+from unittest.mock import Mock
 
 import jsonschema
 import numpy as np
 import pandas as pd
 import pytest
+from mozanalysis.bayesian_stats import compare_samples
 from mozanalysis.bayesian_stats.bayesian_bootstrap import get_bootstrap_samples
+from mozanalysis.experiment import AnalysisBasis
+from statsmodels.distributions.empirical_distribution import ECDF
 
+import jetstream.statistics
+from jetstream.metric import Metric
+from jetstream.pre_treatment import Log, RemoveNulls
 from jetstream.statistics import (
     Binomial,
     BootstrapMean,
     Count,
+    Deciles,
     EmpiricalCDF,
     KernelDensityEstimate,
+    PoissonBootstrapDeciles,
+    PoissonBootstrapMean,
     StatisticResult,
+    StatisticResultCollection,
+    Summary,
+    TreatedColumnCache,
     _make_grid,
+    _poisson_resample_quantiles,
+    _resample_means,
+    _resample_quantiles,
+    _sample_blocks,
+    _summarize_samples,
+    bootstrap_means,
+    compute_statistics,
 )
 
 
@@ -39,6 +59,94 @@ class TestStatistics:
         assert treatment_result.point < control_result.point
         assert treatment_result.lower and treatment_result.upper
 
+    def test_bootstrap_means_batch(self, experiments):
+        test_data = pd.DataFrame(
+            {
+                "branch": ["a"] * 100 + ["b"] * 100,
+                "a": np.arange(200, dtype="float"),
+                "b": np.arange(200, dtype="float") * 2,
+            }
+        )
+        summaries = [
+            Summary(Metric("a", None, ""), BootstrapMean(num_samples=50, drop_highest=0)),
+            Summary(Metric("b", None, ""), BootstrapMean(num_samples=50, drop_highest=0)),
+        ]
+        result = bootstrap_means(test_data, summaries, experiments[0], seed=42).data
+        a = [r for r in result if r.metric == "a" and r.comparison is None]
+        b = [r for r in result if r.metric == "b" and r.comparison is None]
+        assert {r.branch for r in a} == {"a", "b"}
+        for result_a, result_b in zip(a, b):
+            assert result_a.branch == result_b.branch
+            # b is a multiple of a and both are resampled with the same weights
+            assert result_b.point == pytest.approx(2 * result_a.point)
+            assert result_b.lower == pytest.approx(2 * result_a.lower)
+
+        single = BootstrapMean(num_samples=50, drop_highest=0).transform(
+            test_data, "a", "b", experiments[0], seed=42
+        )
+        assert [r.point for r in single.data if r.comparison is None] == pytest.approx(
+            [r.point for r in a]
+        )
+
+    def test_bootstrap_means_of_value_counts(self, experiments):
+        rng = np.random.default_rng(0)
+        test_data = pd.DataFrame(
+            {
+                "branch": ["a"] * 1000 + ["b"] * 1000,
+                "value": np.concatenate([rng.poisson(2, 1000), rng.poisson(3, 1000)]),
+            }
+        )
+        statistic = BootstrapMean(num_samples=1000, drop_highest=0)
+        samples = _resample_means(
+            test_data.branch.to_numpy(),
+            [(np.arange(2000), test_data.value.to_numpy(dtype=float), None)],
+            1000,
+            np.random.default_rng(1),
+        )
+        for branch, branch_samples in samples.items():
+            values = test_data.value[test_data.branch == branch]
+            assert branch_samples[:, 0].mean() == pytest.approx(values.mean(), rel=0.01)
+            assert branch_samples[:, 0].std() == pytest.approx(
+                values.std() / np.sqrt(len(values)), rel=0.1
+            )
+
+        result = statistic.transform(test_data, "value", "a", experiments[0]).data
+        individual = {r.branch: r.point for r in result if r.comparison is None}
+        assert individual == pytest.approx({"a": 2, "b": 3}, rel=0.1)
+
+    def test_bootstrap_means_batch_pre_treatments(self, experiments):
+        test_data = pd.DataFrame(
+            {
+                "branch": ["a"] * 10 + ["b"] * 10,
+                "a": [np.nan] + list(np.arange(1, 20, dtype="float")),
+            }
+        )
+        summary = Summary(
+            Metric("a", None, ""),
+            BootstrapMean(num_samples=10),
+            [RemoveNulls(), Log()],
+        )
+        result = bootstrap_means(test_data, [summary], experiments[0]).data
+        individual = {r.branch: r for r in result if r.comparison is None}
+        assert individual["a"].upper <= np.log10(9)
+        assert individual["b"].lower >= 1
+
+        untreated = Summary(Metric("a", None, ""), BootstrapMean(num_samples=10))
+        assert bootstrap_means(test_data, [untreated], experiments[0]).data == []
+
+    def test_compute_statistics(self, experiments):
+        test_data = pd.DataFrame(
+            {"branch": ["b"] * 10 + ["a"] * 10, "value": list(range(20))},
+        )
+        metric = Metric("value", None, "")
+        result = compute_statistics(
+            [Summary(metric, BootstrapMean(num_samples=10)), Summary(metric, Count())],
+            test_data,
+            experiments[0],
+        ).data
+        assert {r.statistic for r in result} == {"mean", "count"}
+        assert len([r for r in result if r.comparison == "difference"]) == 1
+
     def test_binomial(self):
         stat = Binomial()
         test_data = pd.DataFrame(
@@ -67,6 +175,43 @@ class TestStatistics:
         assert [r.point for r in result if r.branch == "treatment"] == [20]
         assert [r.point for r in result if r.branch == "control"] == [10]
 
+    def test_binomial_from_aggregates(self, experiments):
+        stat = Binomial()
+        aggregates = pd.DataFrame(
+            {"num_enrollments": [10, 10], "num_conversions": [3, 5]}, index=["a", "b"]
+        )
+        result = stat.apply_aggregates(aggregates, "value", experiments[0])
+        individual = {r.branch: r.point for r in result.data if r.comparison is None}
+        assert individual["a"] == pytest.approx(0.3, abs=0.05)
+        assert individual["b"] == pytest.approx(0.5, abs=0.05)
+
+        difference = [r for r in result.data if r.comparison == "difference"][0]
+        assert difference.branch == "a"
+        assert difference.comparison_to_branch == "b"
+        assert difference.point == pytest.approx(-0.2, abs=0.05)
+
+    def test_binomial_from_aggregates_rejects_invalid_values(self, experiments):
+        stat = Binomial()
+        aggregates = pd.DataFrame(
+            {"num_enrollments": [10, 10], "num_conversions": [3, 5], "num_invalid": [0, 1]},
+            index=["a", "b"],
+        )
+        assert stat.apply_aggregates(aggregates, "value", experiments[0]).data == []
+
+    def test_count_from_aggregates(self, experiments):
+        summary = Summary(Metric("value", None, ""), Count())
+        assert summary.supports_aggregates()
+        aggregates = pd.DataFrame({"num_enrollments": [20, 10]}, index=["a", "b"])
+        result = summary.run_aggregates(aggregates, experiments[0]).data
+        assert [r.point for r in result if r.branch == "a"] == [20]
+        assert [r.point for r in result if r.branch == "b"] == [10]
+
+    def test_supports_aggregates(self):
+        metric = Metric("value", None, "")
+        assert Summary(metric, Binomial(), [RemoveNulls()]).supports_aggregates()
+        assert not Summary(metric, Binomial(), [Log()]).supports_aggregates()
+        assert not Summary(metric, BootstrapMean()).supports_aggregates()
+
     def test_binomial_no_reference_branch(self, experiments):
         stat = Binomial()
         test_data = pd.DataFrame(
@@ -103,9 +248,79 @@ class TestStatistics:
         assert ("control", "foo", "difference") in comparison_branches
         assert ("control", "foo", "relative_uplift") in comparison_branches
 
+    @pytest.mark.parametrize(
+        "statistic,resample",
+        [
+            (BootstrapMean(num_samples=10), "_resample_means"),
+            (Deciles(num_samples=10), "_resample_quantiles"),
+        ],
+    )
+    def test_bootstrap_branches_once(self, experiments, monkeypatch, statistic, resample):
+        resample_mock = Mock(wraps=getattr(jetstream.statistics, resample))
+        monkeypatch.setattr(jetstream.statistics, resample, resample_mock)
+        test_data = pd.DataFrame(
+            {
+                "branch": ["a", "b", "c"] * 100,
+                "value": np.random.default_rng(0).exponential(size=300),
+            }
+        )
+        result = statistic.apply(test_data, "value", experiments[1]).data
+
+        assert {(r.branch, r.comparison_to_branch) for r in result if r.comparison} == {
+            ("b", "a"),
+            ("c", "a"),
+            ("c", "b"),
+        }
+        # every branch is bootstrapped once for all reference branches
+        expected_calls = 1 if resample == "_resample_means" else 3
+        assert resample_mock.call_count == expected_calls
+
+    @pytest.mark.parametrize("statistic", [BootstrapMean(num_samples=10), Deciles(num_samples=10)])
+    def test_no_reference_branch_rows(self, experiments, statistic):
+        test_data = pd.DataFrame(
+            {
+                "branch": ["a", "b", "c"] * 100,
+                "value": np.random.default_rng(0).exponential(size=300),
+            }
+        )
+        assert experiments[1].reference_branch is None
+        result = statistic.apply(test_data, "value", experiments[1]).data
+
+        # every branch is the reference of the following branches in turn
+        expected = []
+        df = test_data
+        for reference_branch in ["a", "b", "c"]:
+            expected += statistic.transform(df, "value", reference_branch, experiments[1]).data
+            df = df[df.branch != reference_branch]
+        assert len(result) == len(expected)
+        assert {(r.branch, r.comparison, r.comparison_to_branch) for r in result} == {
+            (r.branch, r.comparison, r.comparison_to_branch) for r in expected
+        }
+
+    @pytest.mark.parametrize(
+        "statistic",
+        [
+            Binomial(),
+            BootstrapMean(num_samples=10),
+            Count(),
+            Deciles(num_samples=10),
+            EmpiricalCDF(),
+        ],
+    )
+    def test_categorical_branches(self, experiments, statistic):
+        test_data = pd.DataFrame(
+            {
+                "branch": pd.Categorical(["a"] * 10 + ["b"] * 10, categories=["a", "b", "c"]),
+                "value": np.array([0, 1] * 10, dtype="float32"),
+            }
+        )
+        result = statistic.apply(test_data, "value", experiments[1]).data
+        assert result
+        assert {r.branch for r in result} == {"a", "b"}
+
     @pytest.mark.parametrize("geometric", [True, False])
     def test_make_grid_makes_a_grid(self, wine, geometric):
-        result = _make_grid(wine["ash"], 256, geometric)
+        result = _make_grid(np.sort(wine["ash"]), 256, geometric)
         assert result.grid.shape == (256,)
         assert result.geometric is geometric
         assert result.message is None
@@ -113,12 +328,12 @@ class TestStatistics:
     def test_make_grid_handles_negatives(self, wine):
         ash = wine["ash"].copy()
         ash.iloc[0] = -1
-        result = _make_grid(ash, 256, True)
+        result = _make_grid(np.sort(ash), 256, True)
         assert result.geometric is False
         assert result.grid.shape == (256,)
         assert result.message is not None
 
-        result = _make_grid(ash, 256, False)
+        result = _make_grid(np.sort(ash), 256, False)
         assert result.geometric is False
         assert result.grid.shape == (256,)
         assert result.message is None
@@ -128,13 +343,13 @@ class TestStatistics:
     def test_make_grid_handles_zeros(self, wine):
         ash = wine["ash"].copy()
         ash.iloc[0] = 0
-        result = _make_grid(ash, 256, True)
+        result = _make_grid(np.sort(ash), 256, True)
         assert result.geometric is True
         assert result.grid.shape == (256,)
         assert result.message is None
         assert result.grid.min() > 0
 
-        result = _make_grid(ash, 256, False)
+        result = _make_grid(np.sort(ash), 256, False)
         assert result.geometric is False
         assert result.grid.shape == (256,)
         assert result.message is None
@@ -171,6 +386,222 @@ class TestStatistics:
 
         assert stat.name() == "empirical_cdf"
 
+    def test_ecdf_matches_statsmodels(self, wine, experiments):
+        result = EmpiricalCDF().transform(wine, "ash", "*", experiments[0]).data
+        for branch, group in wine.groupby("branch"):
+            branch_results = [r for r in result if r.branch == branch]
+            f = ECDF(group["ash"])
+            assert [r.point for r in branch_results] == pytest.approx(
+                f([float(r.parameter) for r in branch_results])
+            )
+
+    def test_resample_quantiles(self):
+        values = np.sort(np.random.default_rng(0).exponential(3, 1001))
+        quantiles = Deciles.DECILES
+        samples = _resample_quantiles(values, quantiles, 50, np.random.default_rng(1))
+
+        # same as taking the quantiles of the resampled values
+        draws = np.random.default_rng(1).integers(0, len(values), (50, len(values)))
+        assert samples == pytest.approx(np.quantile(values[draws], quantiles, axis=1).T)
+
+    def test_resample_quantiles_of_value_counts(self):
+        values = np.sort(np.random.default_rng(0).poisson(3, 1001).astype(float))
+        distinct, counts = np.unique(values, return_counts=True)
+        quantiles = Deciles.DECILES
+        samples = _resample_quantiles(values, quantiles, 50, np.random.default_rng(1))
+
+        # same as taking the quantiles of values with resampled counts
+        resampled_counts = np.random.default_rng(1).multinomial(
+            len(values), counts / len(values), size=50
+        )
+        expected = [np.quantile(np.repeat(distinct, c), quantiles) for c in resampled_counts]
+        assert samples == pytest.approx(np.array(expected))
+
+    def test_summarize_samples_matches_mozanalysis(self):
+        rng = np.random.default_rng(0)
+        samples = {branch: rng.normal(i, 1, (200, 9)) for i, branch in enumerate("abc")}
+        result = _summarize_samples(samples, "value", "deciles", "b", 0.9, Deciles.DECILES)
+
+        labels = [f"{decile:.1}" for decile in Deciles.DECILES]
+        quantiles = ((1 - 0.9) / 2, 1 - (1 - 0.9) / 2)
+        ma_result = compare_samples(
+            {branch: pd.DataFrame(s, columns=labels) for branch, s in samples.items()},
+            "b",
+            individual_summary_quantiles=quantiles,
+            comparative_summary_quantiles=quantiles,
+        )
+
+        assert len(result) == 9 * 7
+        for r in result.data:
+            label = f"{float(r.parameter):.1}"
+            if r.comparison is None:
+                expected = ma_result["individual"][r.branch].loc[label]
+                point = expected["mean"]
+            else:
+                assert r.comparison_to_branch == "b"
+                uplift = "abs_uplift" if r.comparison == "difference" else "rel_uplift"
+                expected = ma_result["comparative"][r.branch][uplift].loc[label]
+                point = expected["exp"]
+            assert r.point == pytest.approx(point)
+            assert r.lower == pytest.approx(expected[str(quantiles[0])])
+            assert r.upper == pytest.approx(expected[str(quantiles[1])])
+
+    def test_resample_means_memory_budget(self, monkeypatch):
+        monkeypatch.setattr(jetstream.statistics, "BOOTSTRAP_MEMORY_BYTES", 8 * 1000)
+        rng = np.random.default_rng(0)
+        n = 2000
+        values = rng.exponential(size=n)
+        columns = [(np.arange(n), values, None), (np.arange(0, n, 2), values[::2], None)]
+        branches = np.array(["a"] * n)
+
+        draws = Mock(wraps=np.random.default_rng(1))
+        samples = _resample_means(branches, columns, 20, draws)["a"]
+
+        shapes = [c.args[0] for c in draws.standard_exponential.call_args_list]
+        assert len(shapes) > 1
+        assert all(size * rows * 8 <= 8 * 1000 for size, rows in shapes)
+        # every sample draws a weight for every row
+        assert sum(size * rows for size, rows in shapes) == 20 * n
+
+        # the blocks make up the weights of all samples and rows
+        reference = np.random.default_rng(1)
+        weights = np.empty((20, n))
+        sample, row = 0, 0
+        for size, rows in shapes:
+            block = np.s_[sample : sample + size, row : row + rows]  # noqa: E203
+            weights[block] = reference.standard_exponential((size, rows))
+            row += rows
+            if row == n:
+                sample, row = sample + size, 0
+        assert samples[:, 0] == pytest.approx(weights @ values / weights.sum(axis=1))
+        assert samples[:, 1] == pytest.approx(
+            weights[:, ::2] @ values[::2] / weights[:, ::2].sum(axis=1)
+        )
+
+    def test_sample_blocks(self, monkeypatch):
+        monkeypatch.setattr(jetstream.statistics, "BOOTSTRAP_MEMORY_BYTES", 1000)
+        assert list(_sample_blocks(25, 100)) == [slice(0, 10), slice(10, 20), slice(20, 25)]
+        assert list(_sample_blocks(3, 5000)) == [slice(0, 1), slice(1, 2), slice(2, 3)]
+        assert list(_sample_blocks(3, 1)) == [slice(0, 3)]
+
+    @pytest.mark.parametrize("low_cardinality", [True, False])
+    def test_bootstrap_independent_of_memory_budget(
+        self, experiments, monkeypatch, low_cardinality
+    ):
+        rng = np.random.default_rng(0)
+        values = rng.poisson(2, 400) if low_cardinality else rng.exponential(2, 400)
+        test_data = pd.DataFrame({"branch": ["a", "b"] * 200, "value": values})
+        summaries = [Summary(Metric("value", None, ""), BootstrapMean(num_samples=100))]
+
+        def results():
+            return [
+                (r.point, r.lower, r.upper)
+                for r in bootstrap_means(test_data, summaries, experiments[0], seed=1).data
+                + Deciles(num_samples=100)
+                .transform(test_data, "value", "a", experiments[0], seed=1)
+                .data
+            ]
+
+        expected = results()
+        monkeypatch.setattr(jetstream.statistics, "BOOTSTRAP_MEMORY_BYTES", 10000)
+        assert results() == [pytest.approx(r) for r in expected]
+
+    @pytest.mark.parametrize("statistic", [PoissonBootstrapMean, PoissonBootstrapDeciles])
+    def test_poisson_bootstrap(self, experiments, statistic):
+        rng = np.random.default_rng(0)
+        test_data = pd.DataFrame(
+            {"branch": ["control", "treatment"] * 500, "value": rng.exponential(2, 1000)}
+        )
+        result = statistic(num_samples=500).transform(
+            test_data, "value", "control", experiments[0], seed=1
+        )
+
+        for r in result.data:
+            if r.comparison is None:
+                values = test_data.value[test_data.branch == r.branch]
+                expected = values.mean() if r.parameter is None else values.quantile(r.parameter)
+                assert r.lower < expected < r.upper
+        assert {r.comparison for r in result.data} == {None, "difference", "relative_uplift"}
+
+    @pytest.mark.parametrize("statistic", [PoissonBootstrapMean, PoissonBootstrapDeciles])
+    def test_poisson_bootstrap_partitions(self, experiments, statistic):
+        test_data = pd.DataFrame(
+            {"branch": ["a", "b"] * 500, "value": np.random.default_rng(0).poisson(3, 1000)}
+        )
+        stat = statistic(num_samples=100)
+        prepared = stat.prepare(test_data, "value")
+        seeds = np.random.SeedSequence(1).spawn(3)
+        samples = stat.merge(
+            [stat.resample_partition(prepared, i, 3, seed) for i, seed in enumerate(seeds)]
+        )
+
+        assert set(samples) == {"a", "b"}
+        assert all(len(s) == 100 for s in samples.values())
+        result = stat.apply_samples(samples, "value", experiments[0]).data
+        assert {r.branch for r in result} == {"a", "b"}
+
+    def test_poisson_resample_quantiles(self):
+        values = np.sort(np.random.default_rng(0).exponential(3, 1001))
+        quantiles = Deciles.DECILES
+        samples = _poisson_resample_quantiles(values, quantiles, 50, np.random.default_rng(1))
+
+        # same as taking the quantiles of every value repeated by its Poisson weight
+        weights = np.random.default_rng(1).poisson(np.ones(len(values)), (50, len(values)))
+        expected = [np.quantile(np.repeat(values, w), quantiles) for w in weights]
+        assert samples == pytest.approx(np.array(expected))
+
+    def test_distribution_statistics_share_sorted_values(self, wine, experiments, monkeypatch):
+        sorted_branch_values = Mock(wraps=jetstream.statistics._sorted_branch_values)
+        monkeypatch.setattr(jetstream.statistics, "_sorted_branch_values", sorted_branch_values)
+        summaries = [
+            Summary(Metric("ash", None, ""), Deciles(num_samples=10)),
+            Summary(Metric("ash", None, ""), EmpiricalCDF()),
+            Summary(Metric("ash", None, ""), KernelDensityEstimate()),
+            Summary(Metric("ash", None, ""), EmpiricalCDF(), [Log()]),
+        ]
+        result = compute_statistics(summaries, wine, experiments[1]).data
+
+        assert {r.statistic for r in result} == {
+            "deciles",
+            "empirical_cdf",
+            "kernel_density_estimate",
+        }
+        assert sorted_branch_values.call_count == 2
+
+    def test_summaries_share_treated_columns(self, wine, experiments, monkeypatch):
+        apply_pre_treatments = Mock(wraps=jetstream.statistics.apply_pre_treatments)
+        monkeypatch.setattr(jetstream.statistics, "apply_pre_treatments", apply_pre_treatments)
+        ash = Metric("ash", None, "")
+        summaries = [
+            Summary(ash, BootstrapMean(num_samples=10), [RemoveNulls(), Log()]),
+            Summary(ash, Deciles(num_samples=10), [RemoveNulls(), Log()]),
+            Summary(ash, KernelDensityEstimate(), [RemoveNulls(), Log()]),
+            Summary(ash, EmpiricalCDF(), [RemoveNulls()]),
+        ]
+        result = compute_statistics(summaries, wine, experiments[1]).data
+
+        assert {r.statistic for r in result} == {
+            "mean",
+            "deciles",
+            "kernel_density_estimate",
+            "empirical_cdf",
+        }
+        assert apply_pre_treatments.call_count == 2
+
+    def test_treated_column_cache_evicts_done_columns(self, wine):
+        summaries = [
+            Summary(Metric("ash", None, ""), Deciles(), [Log()]),
+            Summary(Metric("ash", None, ""), EmpiricalCDF(), [Log()]),
+        ]
+        cache = TreatedColumnCache(wine, summaries)
+        treated = cache.get(summaries[0])
+        assert cache.get(summaries[1]) is treated
+
+        cache.done(summaries[0])
+        assert cache.get(summaries[1]) is treated
+        cache.done(summaries[1])
+        assert cache.get(summaries[1]) is not treated
+
     def test_statistic_result_rejects_invalid_types(self):
         args = {"metric": "foo", "statistic": "bar", "branch": "baz"}
         StatisticResult(**args)
@@ -192,6 +623,66 @@ class TestStatistics:
             get_bootstrap_samples(df)
 
 
+class TestStatisticResultCollection:
+    def _collection(self):
+        return StatisticResultCollection.from_columns(
+            metric="value",
+            statistic="empirical_cdf",
+            branch=["a", "a", "b"],
+            parameter=[0.1, 0.25, 1 / 3],
+            point=[1, np.inf, np.nan],
+        )
+
+    def test_from_columns(self):
+        collection = self._collection()
+        assert len(collection) == 3
+        assert [r.branch for r in collection.data] == ["a", "a", "b"]
+        assert [r.point for r in collection.data] == [1, np.inf, None]
+        assert collection.data[0].comparison is None
+        assert collection.data[0].parameter == pytest.approx(0.1)
+
+        with pytest.raises(ValueError):
+            StatisticResultCollection.from_columns(metric="value", branch=["a"], point=["3"])
+        with pytest.raises(ValueError):
+            StatisticResultCollection.from_columns(branch=["a", "b"], point=[1, 2, 3])
+
+    def test_rows(self):
+        rows = [
+            StatisticResult(metric="value", statistic="count", branch="a", point=3),
+            StatisticResult(metric="value", statistic="count", branch="b", parameter="0.5"),
+        ]
+        assert StatisticResultCollection(rows).data == rows
+        assert StatisticResultCollection([]).data == []
+
+    def test_concat_and_set(self):
+        collection = StatisticResultCollection.concat([self._collection(), self._collection()])
+        collection.extend(StatisticResultCollection([])).set_segment("all").set_analysis_basis(
+            AnalysisBasis.ENROLLMENTS
+        )
+        assert len(collection) == 6
+        assert {r.segment for r in collection.data} == {"all"}
+        assert {r.analysis_basis for r in collection.data} == {"enrollments"}
+
+    def test_to_dict(self):
+        result = self._collection().to_dict()["data"]
+        assert [r["parameter"] for r in result] == ["0.1", "0.25", "0.333333"]
+        assert [r["point"] for r in result] == [1, None, None]
+        assert list(result[0]) == [f.name for f in StatisticResult.__attrs_attrs__]
+
+    def test_to_arrow(self):
+        table = self._collection().set_sample_rate(0.1).to_arrow()
+        assert table.column_names == [f.name for f in StatisticResult.bq_schema]
+        assert table.num_rows == 3
+        assert [str(p) for p in table["parameter"].to_pylist()] == [
+            "0.100000000",
+            "0.250000000",
+            "0.333333000",
+        ]
+        assert table["point"].to_pylist() == [1, None, None]
+        assert table["comparison"].null_count == 3
+        assert table["sample_rate"].to_pylist() == [0.1] * 3
+
+
 class TestStatisticExport:
     def test_data_schema(self):
         schema = json.loads((Path(__file__).parent / "data/Statistics_v1.0.json").read_text())
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from jetstream.metric import Metric
+from jetstream.pre_treatment import CensorHighestValues, RemoveNulls
+from jetstream.statistics import (
+    Binomial,
+    BootstrapMean,
+    Count,
+    Deciles,
+    EmpiricalCDF,
+    KernelDensityEstimate,
+    PoissonBootstrapDeciles,
+    Summary,
+    bootstrap_means,
+)
+from jetstream.streaming import QuantileSketch, stream_statistics
+
+
+@pytest.fixture()
+def metrics():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame(
+        {
+            "branch": rng.choice(["a", "b"], n),
+            "value": rng.exponential(1, n),
+            "converted": rng.choice([True, False], n),
+            "new_users": rng.choice([True, False, None], n),
+        }
+    )
+
+
+def _batches(df, size=300):
+    return lambda: (
+        df.iloc[start:].head(size).reset_index(drop=True) for start in range(0, len(df), size)
+    )
+
+
+class TestQuantileSketch:
+    def test_quantiles(self):
+        values = np.random.default_rng(0).exponential(10, 10000)
+        sketch = QuantileSketch()
+        sketch.add(values)
+        sketch.add(-values)
+        values = np.concatenate([values, -values])
+        for q in (0.01, 0.3, 0.7, 0.995):
+            assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.01)
+
+    def test_merge(self):
+        values = np.arange(-100, 1000, dtype=float)
+        sketch, other = QuantileSketch(), QuantileSketch()
+        sketch.add(values[:500])
+        other.add(values[500:])
+        sketch.merge(other)
+
+        expected = QuantileSketch()
+        expected.add(values)
+        assert sketch == expected
+
+    def test_value_counts(self):
+        sketch = QuantileSketch()
+        sketch.add(np.array([-2.0, -2.0, 0.0, 1.0, 5.0, 5.0, 5.0]))
+        values, counts = sketch.value_counts()
+
+        assert values == pytest.approx([-2, 0, 1, 5], rel=0.002)
+        assert list(counts) == [2, 1, 1, 3]
+
+    def test_non_finite_values(self):
+        sketch = QuantileSketch()
+        sketch.add(np.array([np.inf, -np.inf, np.nan, 1.0, 2.0]))
+
+        assert sketch.count == 2
+        values, counts = sketch.value_counts()
+        assert values == pytest.approx([1, 2], rel=0.002)
+        assert sketch.quantile(1) == pytest.approx(2, rel=0.002)
+
+
+class TestStreamStatistics:
+    def test_bootstrap_mean(self, metrics, experiments):
+        summaries = [
+            Summary(Metric("value", None, ""), BootstrapMean(num_samples=500)),
+            Summary(Metric("value", None, ""), BootstrapMean(num_samples=500, drop_highest=0)),
+        ]
+        streamed = stream_statistics(
+            _batches(metrics), summaries, ["all"], experiments[0], seed=1
+        ).data
+        expected = bootstrap_means(metrics, summaries, experiments[0], seed=1).data
+
+        assert len(streamed) == len(expected)
+        for s, e in zip(streamed, expected):
+            assert (s.branch, s.comparison, s.segment) == (e.branch, e.comparison, "all")
+            assert s.point == pytest.approx(e.point, rel=0.05, abs=0.05)
+
+    def test_aggregates(self, metrics, experiments):
+        summaries = [
+            Summary(Metric("converted", None, ""), Binomial(), [RemoveNulls()]),
+            Summary(Metric("spam", None, ""), Count()),
+        ]
+        streamed = stream_statistics(
+            _batches(metrics), summaries, ["all", "new_users"], experiments[0]
+        ).data
+
+        counts = {(r.segment, r.branch): r.point for r in streamed if r.statistic == "count"}
+        new_users = metrics[metrics["new_users"].fillna(False).astype(bool)]
+        assert counts[("all", "a")] == (metrics.branch == "a").sum()
+        assert counts[("new_users", "b")] == (new_users.branch == "b").sum()
+
+        binomial = [r for r in streamed if r.statistic == "binomial" and r.comparison is None]
+        expected = Binomial().transform(metrics, "converted", "b", experiments[0]).data
+        assert {(r.branch, r.point) for r in binomial if r.segment == "all"} == {
+            (r.branch, r.point) for r in expected if r.comparison is None
+        }
+
+    @pytest.mark.parametrize("statistic", [Deciles, PoissonBootstrapDeciles])
+    def test_deciles(self, metrics, experiments, statistic):
+        summaries = [Summary(Metric("value", None, ""), statistic(num_samples=500))]
+        streamed = stream_statistics(_batches(metrics), summaries, ["all"], experiments[0]).data
+        expected = summaries[0].run(metrics, experiments[0]).data
+
+        def key(r):
+            return (r.branch, r.comparison or "", r.parameter)
+
+        assert len(streamed) == len(expected)
+        for s, e in zip(sorted(streamed, key=key), sorted(expected, key=key)):
+            assert (s.branch, s.comparison, s.parameter) == (e.branch, e.comparison, e.parameter)
+            assert s.point == pytest.approx(e.point, rel=0.05, abs=0.05)
+
+    def test_empirical_cdf(self, metrics, experiments):
+        summaries = [Summary(Metric("value", None, ""), EmpiricalCDF())]
+        streamed = stream_statistics(_batches(metrics), summaries, ["all"], experiments[0]).data
+        expected = summaries[0].run(metrics, experiments[0]).data
+
+        assert len(streamed) == len(expected)
+        for s, e in zip(
+            sorted(streamed, key=lambda r: r.branch), sorted(expected, key=lambda r: r.branch)
+        ):
+            assert s.branch == e.branch
+            assert float(s.parameter) == pytest.approx(float(e.parameter), rel=0.01)
+            assert s.point == pytest.approx(e.point, abs=0.01)
+
+    def test_empirical_cdf_at_streamed_parameters(self, metrics, experiments):
+        summaries = [Summary(Metric("value", None, ""), EmpiricalCDF())]
+        streamed = stream_statistics(_batches(metrics), summaries, ["all"], experiments[0]).data
+
+        # the grid differs from the one on all values, but the streamed ECDF matches the
+        # ECDF of all values at its own parameters
+        for r in streamed:
+            values = metrics.value[metrics.branch == r.branch]
+            expected = (values <= float(r.parameter)).mean()
+            assert r.point == pytest.approx(expected, abs=0.01)
+
+    def test_unsupported_summaries_fail(self, metrics, experiments, caplog):
+        summaries = [
+            Summary(Metric("value", None, ""), BootstrapMean(), [CensorHighestValues()]),
+            Summary(Metric("value", None, ""), KernelDensityEstimate()),
+        ]
+        assert not any(summary.supports_streaming() for summary in summaries)
+        assert stream_statistics(_batches(metrics), summaries, ["all"], experiments[0]).data == []
+        errors = [r for r in caplog.records if r.levelname == "ERROR"]
+        assert [r.message for r in errors] == [
+            "Error while computing statistic bootstrap_mean for metric value: "
+            + "Not supported for experiments whose metrics are streamed",
+            "Error while computing statistic kernel_density_estimate for metric value: "
+            + "Not supported for experiments whose metrics are streamed",
+        ]
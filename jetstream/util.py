@@ -5,12 +5,17 @@ import time
 from contextlib import contextmanager
 from datetime import timedelta
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional
 
-from requests import Session
+import google.cloud.storage as storage
+from requests import Response, Session
 
 logger = logging.getLogger(__name__)
 
+# delay before the first retry; doubles with every retry
+RETRY_BACKOFF_SECONDS = 1
+RETRY_BACKOFF_MAX_SECONDS = 30
+
 # based on https://stackoverflow.com/a/22726782
 
 
@@ -27,6 +32,21 @@ def TemporaryDirectory():
         shutil.rmtree(name)
 
 
+def read_file(path: str) -> bytes:
+    """Reads a local file or a `gs://` URI."""
+    if path.startswith("gs://"):
+        return storage.Blob.from_string(path, client=storage.Client()).download_as_bytes()
+    return Path(path).read_bytes()
+
+
+def write_file(path: str, data: bytes) -> None:
+    """Writes a local file or a `gs://` URI."""
+    if path.startswith("gs://"):
+        storage.Blob.from_string(path, client=storage.Client()).upload_from_string(data)
+    else:
+        Path(path).write_bytes(data)
+
+
 def inclusive_date_range(start_date, end_date):
     """Generator for a range of dates, includes end_date."""
     for n in range(int((end_date - start_date).days) + 1):
@@ -34,19 +54,32 @@ def inclusive_date_range(start_date, end_date):
 
 
 def retry_get(
-    session: Session, url: str, max_retries: int, user_agent: Optional[str] = None
+    session: Session,
+    url: str,
+    max_retries: int,
+    user_agent: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    handle_response: Optional[Callable[[Response], Any]] = None,
 ) -> Any:
-    for _i in range(max_retries):
+    """
+    Fetches `url`, retrying with exponential backoff on errors.
+
+    Returns the JSON response, or what `handle_response` returns for the response;
+    exceptions raised by `handle_response` cause retries.
+    """
+    for i in range(max_retries):
         try:
             if user_agent:
                 session.headers.update({"user-agent": user_agent})
 
-            blob = session.get(url).json()
+            response = session.get(url, headers=headers) if headers else session.get(url)
+            blob = handle_response(response) if handle_response else response.json()
             break
         except Exception as e:
             print(e)
             logger.info(f"Error fetching from {url}. Retrying...")
-            time.sleep(1)
+            if i < max_retries - 1:
+                time.sleep(min(RETRY_BACKOFF_SECONDS * 2**i, RETRY_BACKOFF_MAX_SECONDS))
     else:
         exception = RetryLimitExceededException(f"Too many retries for {url}")
 